@@ -1,13 +1,24 @@
 # app/api/v1/endpoints.py
 # -----------------------------------------------------------
 # /v1/process  → PDF + soru listesi alır, pipeline’i arka planda çalıştırır
+# /v1/jobs     → aynı girdiyle iş kuyruğa alınır; durum GET /v1/jobs/{id}
+# /v1/process/stream → aşama ilerlemesi + her cevap geldiği anda (SSE)
+# /v1/search   → soruyu raporlar arası global indekste arar (kapalıysa 503)
+# /v1/reports/{id} (DELETE) → raporun dosyalarını ve indeks kayıtlarını siler
+# ?trace=true (process / jobs) → çalıştırmanın Chrome trace'i yanıtta döner
+# Aynı rapor (PDF adı) için iş sürerken yeni yükleme / silme → 409
 # -----------------------------------------------------------
 
 from __future__ import annotations
 
+import asyncio
 import json
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from uuid import uuid4
 
 
 from fastapi import (
@@ -15,9 +26,10 @@ from fastapi import (
     UploadFile,
     File,
     Form,
-    #BackgroundTasks,
     HTTPException,
+    Query,
 )
+from fastapi.responses import StreamingResponse
 
 # ----- şema ve servis içe aktarımları ----------------------
 from ...models.schemas import (
@@ -25,8 +37,18 @@ from ...models.schemas import (
     ProcessResponse,
     PreProcessResponse,
     ProcessResult,
+    JobResponse,
+    JobStatusResponse,
+    SearchRequest,
+    SearchHit,
+    SearchResponse,
+    DeleteResponse,
 )
-from ...services.pipeline_runner import run_pipeline  # uçtan uca pipeline
+from ...services import jobs, state
+from ...pipeline import global_index, serving
+from ...pipeline.embedding_cache import encode_cached
+from ...pipeline.model_registry import get_model
+from ...core import tracing
 from ...core.config import get_settings
 
 # -----------------------------------------------------------
@@ -35,16 +57,14 @@ router = APIRouter(prefix="/v1", tags=["pipeline"])
 # -----------------------------------------------------------
 
 
-# ==========  /process  =====================================
-@router.post("/process", response_model=ProcessResponse)
-async def process_report(
-    #bg: BackgroundTasks,
-    questions: str = Form(..., description="JSON list of QuestionRequest"),
-    pdf_file: UploadFile = File(..., description="PDF file to analyse"),
-):
-    """Arka planda run_pipeline’ı tetikler, anında işlem kimliği döndürür."""
+# Aynı rapor için "aktif iş var mı" kontrolü, dosya yazımı ve kuyruğa alma
+# (ve DELETE) tek kritik bölgede: ikinci yükleme çalışan işin PDF'ini ve
+# workspace'ini ezemez.
+_report_lock = threading.Lock()
 
-    
+
+async def _read_inputs(questions: str, pdf_file: UploadFile) -> tuple[list, str, bytes]:
+    """Soru listesini ve PDF adını doğrular; (sorular, dosya adı, PDF baytları) döndürür."""
 
     # 1) Soru listesi doğrulaması
     try:
@@ -57,65 +77,308 @@ async def process_report(
     if not pdf_file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only .pdf files are supported")
 
-    # 3) Dosyaları kaydet
+    return questions_data, pdf_file.filename, await pdf_file.read()
+
+
+def _write_inputs(questions_data: list, filename: str, data: bytes) -> tuple[Path, Path]:
+    """PDF + soruları user_uploads'a yazar (_report_lock altında çağrılır)."""
     upload_dir = Path("user_uploads")
     upload_dir.mkdir(parents=True, exist_ok=True)
 
-    pdf_path = upload_dir / pdf_file.filename
-    pdf_path.write_bytes(await pdf_file.read())
+    pdf_path = upload_dir / filename
+    pdf_path.write_bytes(data)
 
-    questions_path = upload_dir / "questions.json"
+    # eşzamanlı istekler birbirinin soru dosyasını ezmesin
+    questions_path = upload_dir / f"questions_{pdf_path.stem}_{time.time_ns()}.json"
     questions_path.write_text(
         json.dumps(questions_data, ensure_ascii=False, indent=2), encoding="utf-8"
     )
-
-    # 4) Basit işlem kimliği (memory state tutulmuyor)
-    job_id = str(uuid4())
-    report_id = pdf_path.stem
+    return pdf_path, questions_path
 
 
-    # 5) Pipeline’i arka planda başlat
-    '''
-    bg.add_task(
-        run_pipeline,
-        pdf_path=pdf_path,
-        questions_path=questions_path,
-        report_id=report_id,
-        send_to_gpt=True,
+def _to_result(a: dict) -> ProcessResult:
+    """answer_<id>.json içeriğini ProcessResult'a çevirir."""
+    if a.get("status", "ok") != "ok":               # LLM çağrısı başarısız
+        return ProcessResult(
+            question=a.get("soru", ""),
+            answer="",
+            status="answer_failed",
+            error=a.get("error") or "LLM request failed",
+        )
+    status = "answer_found" if a.get("cevap") and "bilgi bulunamadı" not in a.get("cevap", "").lower() else "answer_notfound"
+    return ProcessResult(
+        question=a.get("soru", ""),
+        answer=a.get("cevap", ""),
+        status=status
     )
-    '''
 
-    run_pipeline(
-        pdf_path=pdf_path,
-        questions_path=questions_path,
-        report_id=report_id,
-        send_to_gpt=True,  # varsayılan olarak cevap al
-    )
 
-    # 6) Yanıt – cevapları oku ve results alanını doldur
-    answers_dir = Path("workspace") / report_id / "ANSWERS"
+def _answer_files(report_id: str) -> list[Path]:
+    answers_dir = Path(st.workspace_root) / report_id / "ANSWERS"
+    if not answers_dir.exists():
+        return []
+    return sorted(answers_dir.glob("answer_*.json"),
+                  key=lambda p: int(p.stem.split("_")[1]))
+
+
+def _collect_results(report_id: str) -> list[ProcessResult]:
+    """ANSWERS klasöründeki cevapları okur."""
     results = []
+    for answer_file in _answer_files(report_id):
+        with open(answer_file, "r", encoding="utf-8") as f:
+            results.append(_to_result(json.load(f)))
+    return results
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+_TRACE_QUERY = Query(False, description="Record the run and return its Chrome trace (trace.json)")
+
+
+def _trace(report_id: str) -> dict | None:
+    return tracing.load(Path(st.workspace_root) / report_id)
+
+
+def _submit(questions_data: list, filename: str, data: bytes, **kwargs) -> tuple[str, str, Future]:
+    """Girdileri yazar ve işi kuyruğa alır; (report_id, job_id, Future) döndürür.
+
+    Rapor için kuyrukta bekleyen veya çalışan iş varsa 409 döner.
+    """
+    report_id = Path(filename).stem
+    with _report_lock:
+        if state.active_for(report_id):
+            raise HTTPException(409, f"Report '{report_id}' has a queued or running job")
+        pdf_path, questions_path = _write_inputs(questions_data, filename, data)
+        try:
+            job_id, future = jobs.submit(pdf_path, questions_path, report_id=report_id, **kwargs)
+        except jobs.QueueFullError as exc:
+            raise HTTPException(503, str(exc))
+    return report_id, job_id, future
+
+
+async def _submit_async(questions: str, pdf_file: UploadFile, **kwargs) -> tuple[str, str, Future, list]:
+    questions_data, filename, data = await _read_inputs(questions, pdf_file)
+    # kilit DELETE ile paylaşılıyor; event loop'u bekletmemek için thread'de
+    report_id, job_id, future = await asyncio.to_thread(_submit, questions_data, filename, data, **kwargs)
+    return report_id, job_id, future, questions_data
+
+
+# ==========  /process  =====================================
+@router.post("/process", response_model=ProcessResponse)
+async def process_report(
+    questions: str = Form(..., description="JSON list of QuestionRequest"),
+    pdf_file: UploadFile = File(..., description="PDF file to analyse"),
+    trace: bool = _TRACE_QUERY,
+):
+    """Pipeline'ı worker havuzunda çalıştırır, bitince tüm cevapları döndürür."""
+
+    # Event loop bloklanmaz; pipeline havuzdaki bir thread'de çalışır
+    report_id, _, future, questions_data = await _submit_async(questions, pdf_file, trace=trace or None)
+    try:
+        await asyncio.wrap_future(future)
+    except Exception as exc:
+        raise HTTPException(500, f"Pipeline failed: {exc}") from exc
+
+    # Yanıt – cevapları oku ve results alanını doldur
+    results = _collect_results(report_id)
 
-    
-    if answers_dir.exists():
-        for answer_file in sorted(answers_dir.glob("answer_*.json")):
-            with open(answer_file, "r", encoding="utf-8") as f:
-                a = json.load(f)
-                status = "answer_found" if a.get("cevap") and "bilgi bulunamadı" not in a.get("cevap", "").lower() else "answer_notfound"
-                results.append(ProcessResult(
-                    question=a.get("soru", ""),
-                    answer=a.get("cevap", ""),
-                    status=status
-                ))
-    
     return ProcessResponse(
-        job_id=job_id,
-        report_id=report_id,
         count=len(questions_data),
-        status="completed" if results else "processing",
         results=results,
+        trace=_trace(report_id) if trace else None,
     )
 
+
+@router.post("/process/stream")
+async def process_report_stream(
+    questions: str = Form(..., description="JSON list of QuestionRequest"),
+    pdf_file: UploadFile = File(..., description="PDF file to analyse"),
+):
+    """
+    /process ile aynı girdiyi alır; sonuçları Server-Sent Events olarak akıtır.
+
+    Olaylar: ``job`` (kimlik), ``stage`` (aşama başladı), ``answer``
+    (ProcessResult + id, cevap yazıldığı anda), ``done`` veya ``error``.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    # pipeline thread'inden event loop'a güvenli aktarım
+    def push(event: str, data: dict) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def on_answer(qid: int, answer: dict) -> None:
+        push("answer", {"id": qid, **_to_result(answer).model_dump()})
+
+    report_id, job_id, future, _ = await _submit_async(
+        questions, pdf_file,
+        on_stage=lambda stage: push("stage", {"stage": stage}),
+        on_answer=on_answer,
+    )
+    future.add_done_callback(lambda _: push("_finished", {}))
+
+    async def events():
+        yield _sse("job", {"job_id": job_id, "report_id": report_id})
+        sent: set[int] = set()
+        while True:
+            event, data = await queue.get()
+            if event == "_finished":
+                break
+            if event == "answer":
+                sent.add(data["id"])
+            yield _sse(event, data)
+
+        exc = future.exception()
+        if exc is not None:
+            yield _sse("error", {"detail": str(exc)})
+            return
+
+        # önbellekten atlanan cevap aşaması callback üretmez; dosyadan tamamla
+        for answer_file in _answer_files(report_id):
+            qid = int(answer_file.stem.split("_")[1])
+            if qid not in sent:
+                with open(answer_file, "r", encoding="utf-8") as f:
+                    sent.add(qid)
+                    yield _sse("answer", {"id": qid, **_to_result(json.load(f)).model_dump()})
+        yield _sse("done", {"count": len(sent)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ==========  /jobs  ========================================
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(
+    questions: str = Form(..., description="JSON list of QuestionRequest"),
+    pdf_file: UploadFile = File(..., description="PDF file to analyse"),
+    trace: bool = _TRACE_QUERY,
+):
+    """Pipeline'ı kuyruğa ekler ve beklemeden iş kimliği döndürür."""
+
+    report_id, job_id, _, _ = await _submit_async(questions, pdf_file, trace=trace or None)
+    return JobResponse(job_id=job_id, report_id=report_id, status="queued")
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def job_status(job_id: str,
+               trace: bool = Query(False, description="Include the Chrome trace once the job has finished")):
+    """İşin durumunu, o anki aşamasını ve o ana kadar gelen cevapları döndürür."""
+
+    job = state.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Job '{job_id}' not found")
+
+    # Cevap aşamasından önce ANSWERS'ta yalnızca önceki çalıştırmanın dosyaları olabilir
+    results = []
+    if job.get("stage") in ("send_answers", "done"):
+        results = _collect_results(job["report_id"])
+    return JobStatusResponse(
+        job_id=job_id,
+        report_id=job["report_id"],
+        status=job["status"],
+        stage=job.get("stage"),
+        results=results,
+        count=len(results),
+        error=job.get("error"),
+        trace=_trace(job["report_id"]) if trace and job["status"] in ("completed", "failed") else None,
+    )
+
+# ==========  /search  ======================================
+@router.post("/search", response_model=SearchResponse)
+def search_reports(req: SearchRequest):
+    """Soruyu tüm raporlarda ya da seçilen rapor/kategori alt kümesinde arar.
+
+    Global indeks kapalıysa 503 döner (boş sonuç "eşleşme yok" sanılırdı);
+    indeks klasörü de oluşturulmaz.
+    """
+    if not global_index.enabled():
+        raise HTTPException(503, "Global index is disabled; set GLOBAL_INDEX=1 to enable /v1/search")
+
+    gi = global_index.get_global_index()
+    model_name = gi.model_name or st.embed_model
+    emb, _ = encode_cached(get_model(model_name), model_name, [req.question])
+    hits = gi.search(emb, req.top_k, report_ids=req.report_ids,
+                     categories=req.categories)[0]
+
+    results = []
+    for hit in hits:
+        try:
+            store = serving.get_store(str(Path(st.workspace_root) / hit["report_id"]))
+            chunk = store.chunk(hit["category"], hit["chunk_index"])
+        except (OSError, IndexError, KeyError, ValueError):  # workspace silinmiş olabilir
+            chunk = {}
+        results.append(SearchHit(
+            **hit,
+            chunk_text=chunk.get("chunk_text"),
+            page_start=chunk.get("page_start"),
+            page_end=chunk.get("page_end"),
+        ))
+    return SearchResponse(results=results, count=len(results))
+
+
+# ==========  /reports  =====================================
+def _questions_files(upload_dir: Path, report_id: str) -> list[Path]:
+    """Yalnızca bu raporun soru dosyaları: questions_<id>_<ns>.json.
+
+    Glob (``questions_<id>_*``) ``<id>_`` ile başlayan başka raporların
+    dosyalarını da yakalardı (ör. ``rapor`` → ``questions_rapor_2023_<ns>``).
+    """
+    if not upload_dir.is_dir():
+        return []
+    pattern = re.compile(rf"questions_{re.escape(report_id)}_\d+\.json")
+    return [p for p in upload_dir.iterdir() if pattern.fullmatch(p.name)]
+
+
+@router.delete("/reports/{report_id}", response_model=DeleteResponse)
+def delete_report(report_id: str):
+    """
+    Raporu siler: önce global indeksten (mezar taşı – aramalardan anında
+    çıkar, sıkıştırma arka planda), sonra workspace klasörünü ve yüklenen
+    PDF / soru dosyalarını.
+    """
+    if report_id in ("", ".", "..") or report_id.startswith("_") or any(c in report_id for c in "/\\"):
+        raise HTTPException(400, f"Invalid report id '{report_id}'")
+    with _report_lock:                              # silme sırasında aynı rapora iş eklenemez
+        if state.active_for(report_id):
+            raise HTTPException(409, f"Report '{report_id}' has a queued or running job")
+
+        removed_vectors = 0
+        if global_index.enabled():
+            removed_vectors = global_index.get_global_index().delete_report(report_id)
+
+        upload_dir = Path("user_uploads")
+        targets = [Path(st.workspace_root) / report_id,
+                   upload_dir / f"{report_id}.pdf",
+                   UPLOAD_DIR / f"{report_id}.pdf",
+                   *_questions_files(upload_dir, report_id)]
+
+        # önbellek referanslarını bırak: boştaki eşlemler hemen kapanır; süren bir
+        # aramanın tuttuğu eşlem (Windows'ta silmeyi engeller) bitince kapanır
+        serving.evict(str(targets[0]))
+
+        removed_files = []
+        try:
+            for path in targets:
+                if path.is_dir():
+                    serving.retry_while_mapped(lambda p=path: shutil.rmtree(p))
+                elif path.is_file():
+                    serving.retry_while_mapped(path.unlink)
+                else:
+                    continue
+                removed_files.append(str(path))
+        except OSError as exc:
+            raise HTTPException(500, f"Failed to delete report files: {exc}") from exc
+
+        if not removed_files and not removed_vectors:
+            raise HTTPException(404, f"Report '{report_id}' not found")
+
+    return DeleteResponse(report_id=report_id, status="completed",
+                          removed_vectors=removed_vectors, removed_files=removed_files)
+
+
 # ==========  /process  =====================================
 # Hedef dizin tek yerde dursun
 UPLOAD_DIR = Path(r"C:\Users\user\Desktop\RD_PROJECT\r_d_backend\user_uploads")
@@ -158,8 +421,6 @@ async def preprocess_report(
             status_code=500,
             detail=f"Failed to save PDF: {str(exc)}",
         ) from exc
-    
-    # (todo) yeni bir endpint ekleneck silme için filename alır input return status
 
 
     
@@ -9,7 +9,27 @@ from pydantic_settings import BaseSettings  # ← yeni import
 class Settings(BaseSettings):
     workspace_root: str = "workspace"
     embed_model: str
+    embed_device: Optional[str] = None      # "cpu", "cuda" … boşsa otomatik
+    embed_model_ttl: float = 0.0            # saniye; 0 → model hiç bırakılmaz
+    embed_model_max_mb: float = 0.0         # yüklü modeller için bellek bütçesi; 0 → sınırsız
     topk: int = 10
+    faiss_index_type: str = "flat"          # flat | hnsw | ivf_flat | ivf_pq
+    faiss_nlist: int = 0                    # IVF hücre sayısı; 0 → 4·√n
+    faiss_nprobe: int = 8                   # IVF aramada bakılan hücre
+    faiss_pq_m: int = 16                    # PQ alt vektör sayısı (dim'i bölmeli)
+    faiss_pq_nbits: int = 8
+    faiss_hnsw_m: int = 32
+    faiss_ef_construction: int = 200
+    faiss_ef_search: int = 64
+    faiss_train_size: int = 0               # IVF eğitim örneği; 0 → otomatik
+    faiss_mmap: bool = True                 # sunumda indeksleri mmap ile aç
+    serving_cache_size: int = 64            # süreçte açık tutulan indeks/depo sayısı
+    global_index: bool = False              # raporları global indekse de ekle
+    global_index_shards: int = 4
+    global_index_compact_ratio: float = 0.2 # mezar taşı oranı → arka planda sıkıştırma
+    job_workers: int = 2                    # aynı anda çalışan pipeline sayısı
+    job_queue_max: int = 16                 # kuyrukta bekleyebilecek en fazla iş
+    llm_model: str = "gpt-4o-mini"          # prompt bütçesi, tokenizer ve istek modeli
     outer_api_url: Optional[str] = None
     outer_api_token: Optional[str] = None
     openai_api_key: str
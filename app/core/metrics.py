@@ -0,0 +1,252 @@
+"""
+metrics.py
+──────────
+Süreç içi, bağımlılıksız Prometheus metrikleri.
+
+Sayaç (Counter), gösterge (Gauge) ve histogram (Histogram) değerleri
+bellekte tutulur; `/metrics` uç noktası `render()` çıktısını Prometheus
+metin biçiminde (0.0.4) döndürür. Harici toplayıcı ya da ek paket
+gerekmez; Prometheus/VictoriaMetrics doğrudan bu adresi kazıyabilir.
+
+    STAGE_SECONDS.observe(1.7, stage="create_chunks")
+    with FAISS_SEARCH_SECONDS.time(index="genel"):
+        index.search(...)
+
+Tüm metrikler thread-güvenlidir. Değerler süreç başınadır; birden çok
+uvicorn worker'ı varsa her biri kendi değerlerini yayınlar.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Saniye cinsinden varsayılan kovalar (10 ms … 10 dk)
+TIME_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiketler {self.labelnames} olmalı, {tuple(labels)} verildi")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(line + "\n" for line in self._samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Değer kazıma anında fn() ile okunur (etiketsiz göstergeler için)."""
+        self._function = fn
+
+    def _samples(self):
+        if self._function is not None:
+            yield f"{self.name} {_fmt(self._function())}"
+            return
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # anahtar → [kova sayaçları…, toplam, adet]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = f'le="{_fmt(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_fmt(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(row[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(row[-1])}"
+
+
+def render() -> str:
+    return "".join(m.render() for m in list(_registry))
+
+
+class MetricsMiddleware:
+    """Her HTTP isteğinin süresini yol şablonuyla (/v1/jobs/{job_id}) kaydeder.
+
+    Saf ASGI: akış (SSE) yanıtlarında süre son parçaya kadar ölçülür.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - t0, method=scope["method"],
+                                 route=route, status=str(status["code"]))
+
+
+# ------------------------------------------------------------------
+#  Uygulama metrikleri
+# ------------------------------------------------------------------
+# Pipeline
+STAGE_SECONDS = Histogram(
+    "rd_pipeline_stage_duration_seconds", "run_pipeline aşama süresi (atlanan aşamalar hariç)",
+    ["stage"])
+STAGE_SKIPPED = Counter(
+    "rd_pipeline_stage_skipped_total", "Parmak izi değişmediği için atlanan aşamalar", ["stage"])
+
+# Embedding
+EMBED_BATCH_SIZE = Histogram(
+    "rd_embedding_batch_texts", "encode_cached çağrısı başına metin sayısı", [], SIZE_BUCKETS)
+EMBED_SECONDS = Histogram(
+    "rd_embedding_encode_seconds", "Modelle encode süresi (yalnızca önbellekte olmayanlar)", [])
+EMBED_THROUGHPUT = Histogram(
+    "rd_embedding_texts_per_second", "Modelle encode hızı (metin/sn)", [], RATE_BUCKETS)
+EMBED_TEXTS = Counter(
+    "rd_embedding_texts_total", "Embedding istenen metinler", ["source"])      # cache | model
+
+# FAISS
+FAISS_SEARCH_SECONDS = Histogram(
+    "rd_faiss_search_seconds", "FAISS arama çağrısı süresi", ["index"], FAST_BUCKETS)
+
+# LLM
+LLM_SECONDS = Histogram(
+    "rd_llm_request_duration_seconds", "LLM isteği süresi (yeniden denemeler dahil)", ["status"])
+LLM_REQUESTS = Counter(
+    "rd_llm_requests_total", "LLM istekleri – sonuç ve kaynağa göre", ["status"])   # ok | error | cache | resume
+LLM_TOKENS = Counter(
+    "rd_llm_tokens_total", "LLM'in bildirdiği token kullanımı", ["kind"])        # prompt | completion
+
+# İşler
+JOBS_QUEUED = Gauge("rd_jobs_queue_depth", "Kuyrukta bekleyen (henüz başlamamış) işler")
+JOBS_IN_FLIGHT = Gauge("rd_jobs_in_flight", "Şu anda çalışan pipeline işleri")
+JOBS_FINISHED = Counter("rd_jobs_finished_total", "Biten işler", ["status"])    # completed | failed
+
+# HTTP
+HTTP_SECONDS = Histogram(
+    "rd_http_request_duration_seconds", "API isteği süresi", ["method", "route", "status"],
+    FAST_BUCKETS + (5, 10, 30, 60))
@@ -0,0 +1,206 @@
+"""
+tracing.py
+──────────
+Çalıştırma başına hafif iz (trace) kaydı; Chrome trace biçiminde
+(`trace.json`) dışa aktarılır – chrome://tracing veya ui.perfetto.dev ile
+açılır.
+
+    with tracing.start_trace("run_pipeline", report_id="rapor2023") as tr:
+        with tracing.span("create_faiss"):
+            with tracing.span("embed", dataset="genel") as sp:
+                ...
+                sp.set(chunks=1200, cache_hits=800)
+    tr.save("workspace/rapor2023/trace.json")
+
+• Etkin iz ve açık span `contextvars` ile taşınır: iç içe span'ler kendi
+  thread'inin satırında üst span'in altına yerleşir; asyncio görevleri
+  bağlamı kopyaladığından görev içindeki span'ler de doğru iz'e düşer.
+• Eşzamanlı işler (ör. aynı anda giden LLM istekleri) `track=` ile async
+  olay olarak yazılır; Perfetto bunları üst üste binmeden ayrı satırlara
+  dizer.
+• Etkin iz yoksa `span()` hiçbir şey kaydetmez; modüller izleme açık mı
+  diye bakmadan span açabilir.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+TRACE_FILE = "trace.json"
+
+
+def _clean(value: Any) -> Any:
+    """Öznitelikleri JSON'a yazılabilir hâle getirir."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _clean(v) for k, v in value.items()}
+    if hasattr(value, "item"):                  # numpy skalerleri
+        return value.item()
+    return str(value)
+
+
+class Span:
+    __slots__ = ("trace", "name", "attrs", "track", "start_ns")
+
+    def __init__(self, trace: "Trace", name: str, attrs: Dict[str, Any], track: str | None):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.track = track
+        self.start_ns = time.perf_counter_ns()
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+_trace: ContextVar["Trace | None"] = ContextVar("trace", default=None)
+_span: ContextVar["Span | None"] = ContextVar("span", default=None)
+
+
+class Trace:
+    """Bir çalıştırmanın olayları (thread-güvenli)."""
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter_ns()
+        self.wall_start = time.time()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _ts(self, ns: int) -> float:
+        return (ns - self.t0) / 1000            # Chrome: mikrosaniye
+
+    def _record(self, span: Span, end_ns: int) -> None:
+        args = _clean(span.attrs)
+        base = {"name": span.name, "pid": self.pid}
+        if span.track is None:
+            thread = threading.current_thread()
+            tid = thread.native_id or thread.ident
+            events = [{**base, "ph": "X", "tid": tid, "ts": self._ts(span.start_ns),
+                       "dur": (end_ns - span.start_ns) / 1000, "args": args}]
+        else:
+            tid = 0
+            span_id = next(self._ids)
+            common = {**base, "cat": span.track, "id": span_id, "tid": tid}
+            events = [{**common, "ph": "b", "ts": self._ts(span.start_ns), "args": args},
+                      {**common, "ph": "e", "ts": self._ts(end_ns)}]
+        with self._lock:
+            if span.track is None and tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            self._events.extend(events)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                 "args": {"name": self.name}}]
+        meta += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                  "args": {"name": name}} for tid, name in threads.items()]
+        return {
+            "traceEvents": meta + sorted(events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"name": self.name, "started_at": self.wall_start, **_clean(self.attrs)},
+        }
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+
+def current() -> Trace | None:
+    return _trace.get()
+
+
+@contextmanager
+def start_trace(name: str, **attrs) -> Iterator[Trace]:
+    """Bu bağlamda yeni bir iz başlatır; kök span `name` adını taşır."""
+    trace = Trace(name, **attrs)
+    token = _trace.set(trace)
+    try:
+        with span(name, **attrs):
+            yield trace
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def span(name: str, *, track: str | None = None, **attrs) -> Iterator[Span | _NoopSpan]:
+    """
+    İç içe span. `track` verilirse async olay olarak o kategoriye yazılır
+    (eşzamanlı, iç içe olmayan işler için). Hata olursa `error` özniteliği
+    eklenir ve hata yeniden fırlatılır.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield _NOOP
+        return
+    sp = Span(trace, name, dict(attrs), track)
+    token = _span.set(sp)
+    try:
+        yield sp
+    except BaseException as exc:
+        sp.attrs["error"] = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _span.reset(token)
+        trace._record(sp, time.perf_counter_ns())
+
+
+@contextmanager
+def record(path: str | Path, name: str, *, enabled: bool = True, **attrs) -> Iterator[Trace | None]:
+    """start_trace + çıkışta (hata olsa da) `path`'e kaydet; enabled=False → no-op."""
+    if not enabled:
+        yield None
+        return
+    trace = None
+    try:
+        with start_trace(name, **attrs) as trace:
+            yield trace
+    finally:
+        if trace is not None:                   # kök span kapandıktan sonra
+            trace.save(path)
+
+
+def set_attrs(**attrs) -> None:
+    """Açık span'e öznitelik ekler (iz yoksa yok sayılır)."""
+    sp = _span.get()
+    if sp is not None:
+        sp.set(**attrs)
+
+
+def load(workspace_dir: str | Path) -> Dict[str, Any] | None:
+    """Workspace'teki son trace.json (yoksa None)."""
+    path = Path(workspace_dir) / TRACE_FILE
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
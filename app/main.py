@@ -1,14 +1,65 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from .api.v1.endpoints import router as v1_router
 from .core import logging_config   # noqa: F401  (yalnızca import yeter)
+from .core.config import get_settings
+from .core import metrics
+from .pipeline.model_registry import registry
+from .pipeline import global_index, index_factory, prompt_packer, serving
+from .pipeline.pdf_to_text import shutdown_pools
+
+
+def configure_services():
+    """Settings'i (`.env` dahil) modül düzeyi ayarlara aktar: FAISS indeks
+    tipi, serving önbelleği, global indeks ve prompt bütçesinin modeli."""
+    st = get_settings()
+    index_factory.configure(
+        type=st.faiss_index_type, nlist=st.faiss_nlist, nprobe=st.faiss_nprobe,
+        pq_m=st.faiss_pq_m, pq_nbits=st.faiss_pq_nbits, hnsw_m=st.faiss_hnsw_m,
+        ef_construction=st.faiss_ef_construction, ef_search=st.faiss_ef_search,
+        train_size=st.faiss_train_size,
+    )
+    serving.configure(mmap=st.faiss_mmap, cache_size=st.serving_cache_size)
+    global_index.configure(enabled=st.global_index, shards=st.global_index_shards,
+                           compact_ratio=st.global_index_compact_ratio)
+    prompt_packer.configure(model=st.llm_model)
+
+def warm_up_models():
+    """Embedding modelini açılışta bir kez yükle; ilk istek beklemesin."""
+    st = get_settings()
+    registry.configure(ttl=st.embed_model_ttl, max_mb=st.embed_model_max_mb)
+    registry.warm_up([st.embed_model], device=st.embed_device)
+    registry.start_janitor()
 
+def stop_pdf_workers():
+    """PDF çıkarma süreç havuzlarını kapat."""
+    shutdown_pools()
 
-app = FastAPI(title="R&D Pipeline API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Açılış: servis ayarları, sonra modeller; kapanış: süreç havuzları."""
+    configure_services()
+    warm_up_models()
+    try:
+        yield
+    finally:
+        stop_pdf_workers()
+
+
+app = FastAPI(title="R&D Pipeline API", version="0.1.0", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.get("/ping")
 def ping():
     return {"msg": "pong"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus metin biçiminde süreç içi metrikler (aşama, embedding, FAISS, LLM, iş kuyruğu)."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(v1_router)
 
 for r in app.routes:
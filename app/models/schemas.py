@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import Any, Dict, List, Literal
 from pydantic import BaseModel, Field
 
 class QuestionRequest(BaseModel):
@@ -14,15 +14,58 @@ class ProcessResult(BaseModel):
     """Schema for individual process result"""
     question: str = Field(..., description="The question text")
     answer: str = Field(..., description="The answer text")
-    status: Literal["answer_found", "answer_notfound"] = Field(..., description="Status of the answer")
+    status: Literal["answer_found", "answer_notfound", "answer_failed"] = Field(..., description="Status of the answer")
+    error: str | None = Field(None, description="LLM error if the answer could not be generated")
 
 class ProcessResponse(BaseModel):
     """Schema for process response"""
     results: List[ProcessResult] = Field(..., description="List of processed results")
     count: int = Field(..., description="Number of results")
+    trace: Dict[str, Any] | None = Field(None, description="Chrome trace of the run (only with ?trace=true)")
+
+class JobResponse(BaseModel):
+    """Schema for job submission response"""
+    job_id: str = Field(..., description="Job identifier")
+    report_id: str = Field(..., description="Report (workspace) identifier")
+    status: Literal["queued", "processing", "completed", "failed"] = Field(..., description="Job status")
+
+class JobStatusResponse(JobResponse):
+    """Schema for job status response"""
+    stage: str | None = Field(None, description="Current pipeline stage")
+    results: List[ProcessResult] = Field(default_factory=list, description="Answers produced so far")
+    count: int = Field(0, description="Number of results so far")
+    error: str | None = Field(None, description="Error message if the job failed")
+    trace: Dict[str, Any] | None = Field(None, description="Chrome trace of the run (only with ?trace=true)")
+
+class SearchRequest(BaseModel):
+    """Schema for cross-report search request"""
+    question: str = Field(..., description="The question text")
+    top_k: int = Field(10, ge=1, le=200, description="Number of chunks to return")
+    report_ids: List[str] | None = Field(None, description="Restrict search to these reports")
+    categories: List[Literal["genel", "ozel", "mevzuat"]] | None = Field(None, description="Restrict search to these chunk categories")
+
+class SearchHit(BaseModel):
+    """Schema for a single cross-report search hit"""
+    report_id: str = Field(..., description="Report (workspace) identifier")
+    category: str = Field(..., description="Chunk category")
+    chunk_index: int = Field(..., description="Chunk row in the report's category index (0-based)")
+    score: float = Field(..., description="Inner-product similarity")
+    chunk_text: str | None = Field(None, description="Chunk text")
+    page_start: int | None = Field(None, description="First page of the chunk")
+    page_end: int | None = Field(None, description="Last page of the chunk")
+
+class SearchResponse(BaseModel):
+    """Schema for cross-report search response"""
+    results: List[SearchHit] = Field(..., description="Hits ordered by score")
+    count: int = Field(..., description="Number of hits")
 
 class PreProcessResponse(BaseModel):
     """Schema for pre-process response"""
     status: Literal["completed", "failed"] = Field(..., description="Status of the pre-process operation")
 
-# todo: delete resopomse objesi oluşturuulur preprocessresponse ile aynı olabilir.
+class DeleteResponse(BaseModel):
+    """Schema for report delete response"""
+    report_id: str = Field(..., description="Report (workspace) identifier")
+    status: Literal["completed", "failed"] = Field(..., description="Status of the delete operation")
+    removed_vectors: int = Field(0, description="Vectors removed from the global index")
+    removed_files: List[str] = Field(default_factory=list, description="Workspace and upload paths that were deleted")
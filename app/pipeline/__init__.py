@@ -4,25 +4,41 @@ app.pipeline package
 PDF ► TXT ► CID temizle ► Chunk ► Embedding-FAISS ► Retrieval ► Prompt
 """
 from . import (
+    model_registry,
+    embedding_cache,
     init_workspace,
     pdf_to_text,
     cid_cleaner,
     chunk_creator,
+    chunk_store,
+    index_factory,
     faiss_creator,
+    serving,
+    global_index,
     soru_yordam_embedder,
     search_faiss_top_chunks,
     expand_top10_chunks,
+    passage_merger,
+    prompt_packer,
     gpt_prompt_builder,   # eski gpt_amacalismiyor
 )
 
 __all__ = [
+    "model_registry",
+    "embedding_cache",
     "init_workspace",
     "pdf_to_text",
     "cid_cleaner",
     "chunk_creator",
+    "chunk_store",
+    "index_factory",
     "faiss_creator",
+    "serving",
+    "global_index",
     "soru_yordam_embedder",
     "search_faiss_top_chunks",
     "expand_top10_chunks",
+    "passage_merger",
+    "prompt_packer",
     "gpt_prompt_builder",
 ]
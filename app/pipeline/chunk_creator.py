@@ -2,13 +2,18 @@
 chunk_creator.py
 ────────────────
 Bir temizlenmiş .txt dosyasını 3 farklı kategoriye göre cümle cümle bölerek chunk'lar üretir.
-Her chunk JSON olarak kaydedilir.
+Cümleler tek bir tabloya, chunk'lar bu tabloya cümle aralığı olarak
+`ChunkStore` deposuna kaydedilir. Metin akış halinde işlenir; bellek
+kullanımı rapor uzunluğundan bağımsızdır.
 """
 
 import os
 import re
 import json
-from tqdm import tqdm
+import time
+
+from ..core import tracing
+from .chunk_store import ChunkStoreWriter
 
 CHUNK_CONFIG = {
     "genel":   {"size": 5, "overlap": 3},
@@ -18,30 +23,107 @@ CHUNK_CONFIG = {
 
 HEADER_PATTERN = re.compile(r"^\d+(\.\d+)*(\s+|$)")
 
+# Cümle sınırı: . ! ? + boşluk + büyük harf (büyük harf tüketilmez)
+_BOUNDARY = re.compile(r"[.!?]\s+(?=[A-ZÇĞİÖŞÜ])")
+# "Dr." "vb." "md." gibi 1-4 harflik kısaltmalar (öncesinde kelime karakteri yok)
+_ABBREV   = re.compile(r"(?<!\w)[A-Za-zÇĞİÖŞÜçğıöşü]{1,4}$")
+
+BLOCK_CHARS = 1 << 18     # okuma bloğu (karakter); tepe bellek bununla sınırlı
+
+
+def _keep(sentence):
+    if HEADER_PATTERN.match(sentence) and len(sentence.split()) <= 10:
+        return True
+    return len(sentence) > 10
+
+
+def iter_sentences(blocks):
+    """
+    Metin bloklarından cümleleri artımlı olarak üretir.
+
+    Yields
+    ------
+    (cümle, start, end) : cümle '\n' → ' ' yapılmış ve kırpılmış halidir;
+    start/end temiz metindeki [başlangıç, bitiş) karakter ofsetleridir.
+
+    Bellekte yalnızca henüz bitmemiş cümle tutulur. Son bulunan sınırdan
+    sonraki kısım bir sonraki blokla birlikte yeniden taranır; böylece blok
+    sonunda yarım kalan boşluk / büyük harf sınırı kaçırılmaz.
+    """
+    buf, base = "", 0           # base: buf[0]'ın metindeki ofseti
+
+    def _emit(seg_start, seg_end):
+        flat = buf[seg_start:seg_end].replace("\n", " ")
+        sentence = flat.strip()
+        if sentence and _keep(sentence):
+            lead = len(flat) - len(flat.lstrip())
+            start = base + seg_start + lead
+            return sentence, start, start + len(sentence)
+        return None
+
+    for block in blocks:
+        buf += block
+        seg_start = 0
+        for m in _BOUNDARY.finditer(buf):
+            dot = m.start()
+            # kısaltma en fazla 4 harf; lookbehind pos öncesini de görür
+            if buf[dot] == "." and _ABBREV.search(buf, max(seg_start, dot - 5), dot):
+                continue
+            out = _emit(seg_start, dot + 1)
+            if out:
+                yield out
+            seg_start = m.end()
+        buf = buf[seg_start:]
+        base += seg_start
+
+    out = _emit(0, len(buf))
+    if out:
+        yield out
+
+
+def _iter_blocks(f, size=BLOCK_CHARS):
+    while True:
+        block = f.read(size)
+        if not block:
+            return
+        yield block
+
+
 def smart_sentence_split(text):
-    text = text.replace('\n', ' ')
-    text = re.sub(r'(?<=\d)\.(?=\d)', '__DOT__', text)
-    text = re.sub(r'\b([A-Za-zÇĞİÖŞÜçğıöşü]{1,4})\.', r'\1__DOT__', text)
-
-    raw_sentences = re.split(r'(?<=[.!?])\s+(?=[A-ZÇĞİÖŞÜ])', text)
-    cleaned = []
-
-    for s in raw_sentences:
-        s = s.replace('__DOT__', '.').strip()
-        if HEADER_PATTERN.match(s) and len(s.split()) <= 10:
-            cleaned.append(s)
-        elif len(s) > 10:
-            cleaned.append(s)
-
-    return cleaned
-
-def chunk_sentences(sentences, size, overlap):
-    chunks = []
-    for i in range(0, len(sentences), size - overlap):
-        chunk = sentences[i:i + size]
-        if chunk:
-            chunks.append(chunk)
-    return chunks
+    return [s for s, _, _ in iter_sentences([text])]
+
+
+def chunk_spans(n_sentences, size, overlap):
+    """Kayan pencerelerin [başlangıç, bitiş) cümle aralıkları."""
+    return [(i, min(i + size, n_sentences))
+            for i in range(0, n_sentences, size - overlap)]
+
+
+class _RollingWindows:
+    """
+    Tek geçişte tüm kategorilerin pencerelerini üretir (chunk_spans ile aynı
+    sonuç). Her yeni cümlede dolan pencereler hemen verilir; akış bitince
+    yarım kalan pencereler son cümlede kapatılır.
+    """
+
+    def __init__(self, config):
+        self.windows = {c: (cfg["size"], cfg["size"] - cfg["overlap"]) for c, cfg in config.items()}
+        self.next_start = {c: 0 for c in config}
+        self.n = 0
+
+    def push(self):
+        self.n += 1
+        for category, (size, step) in self.windows.items():
+            start = self.next_start[category]
+            if start + size == self.n:
+                yield category, start, self.n
+                self.next_start[category] = start + step
+
+    def finish(self):
+        for category, (size, step) in self.windows.items():
+            for start in range(self.next_start[category], self.n, step):
+                yield category, start, self.n
+
 
 def create_chunks(clean_txt_path: str, workspace_dir: str) -> str:
     """
@@ -54,41 +136,42 @@ def create_chunks(clean_txt_path: str, workspace_dir: str) -> str:
 
     Returns
     -------
-    str : Üretilen chunk klasörünün tam yolu
+    str : Üretilen chunk klasörünün (ChunkStore kökü) tam yolu
+
+    Metin bloklar halinde okunur; cümleler ve üç kategorinin pencereleri
+    tek geçişte doğrudan ChunkStore'a yazılır.
     """
     if not os.path.isfile(clean_txt_path):
         raise FileNotFoundError(clean_txt_path)
 
-    with open(clean_txt_path, "r", encoding="utf-8") as f:
-        text = f.read()
-
-    base_name    = os.path.splitext(os.path.basename(clean_txt_path))[0]
-    sentences    = smart_sentence_split(text)
-    chunk_root   = os.path.join(workspace_dir, "chunks")
-    os.makedirs(chunk_root, exist_ok=True)
-
-    for category, config in CHUNK_CONFIG.items():
-        cat_dir = os.path.join(chunk_root, category)
-        os.makedirs(cat_dir, exist_ok=True)
-
-        chunks = chunk_sentences(sentences, config["size"], config["overlap"])
-
-        for i, chunk in enumerate(chunks):
-            chunk_text = " ".join(chunk)
-            metadata = {
-                "source_file": os.path.basename(clean_txt_path),
-                "category": category,
-                "chunk_index": i + 1,
-                "chunk_text": chunk_text,
-                "char_len": len(chunk_text),
-                "sentence_count": len(chunk)
-            }
-
-            file_path = os.path.join(cat_dir, f"{category}_chunk_{i+1}.json")
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-
-    print(f"✅ Chunklar üretildi → {chunk_root}")
+    chunk_root = os.path.join(workspace_dir, "chunks")
+
+    # clean_txt'in yazdığı sayfa sınırları (varsa)
+    pages_path = os.path.splitext(clean_txt_path)[0] + ".pages.json"
+    page_starts = None
+    if os.path.isfile(pages_path):
+        with open(pages_path, encoding="utf-8") as f:
+            page_starts = [p["start"] for p in json.load(f)]
+
+    t0 = time.perf_counter()
+    windows = _RollingWindows(CHUNK_CONFIG)
+    counts = dict.fromkeys(CHUNK_CONFIG, 0)
+    with open(clean_txt_path, "r", encoding="utf-8") as f, \
+         ChunkStoreWriter(workspace_dir, os.path.basename(clean_txt_path),
+                          CHUNK_CONFIG, page_starts) as writer:
+        for sentence, start, end in iter_sentences(_iter_blocks(f)):
+            writer.add_sentence(sentence, start, end)
+            for span in windows.push():
+                writer.add_span(*span)
+                counts[span[0]] += 1
+        for span in windows.finish():
+            writer.add_span(*span)
+            counts[span[0]] += 1
+    elapsed = time.perf_counter() - t0
+    tracing.set_attrs(sentences=windows.n, chunks=counts)
+
+    print(f"✅ Chunklar üretildi → {chunk_root} "
+          f"({windows.n} cümle, {windows.n / max(elapsed, 1e-9):,.0f} cümle/sn)")
     return chunk_root
 
 
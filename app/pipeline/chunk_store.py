@@ -0,0 +1,335 @@
+"""
+chunk_store.py
+──────────────
+Rapor başına tek, kompakt chunk deposu.
+
+Düzen (workspace/<rapor>/chunks/):
+    manifest.json     → kaynak dosya, CHUNK_CONFIG, sayılar, sayfa başlangıçları
+    sentences.jsonl   → ortak cümle tablosu (satır başına bir cümle ve
+                        temiz metindeki [start, end) karakter ofseti)
+    sentences.idx.npy → int64 (n+1,) dizi; her satırın dosyadaki bayt ofseti
+    <kategori>.npy    → int32 (n, 2) dizi; her chunk için [ilk_cümle, son_cümle)
+
+Chunk metni kopyalanmaz; üç kategori de aynı cümle tablosuna aralık olarak
+başvurur. Tüm aşamalar chunk metnine `ChunkStore` üzerinden, chunk
+indeksiyle (= FAISS satırı, 0 tabanlı) erişir.
+
+Okuma mmap ile yapılır: tek bir chunk istendiğinde yalnızca onun cümle
+satırları çözülür (top-k isabet için birkaç satır). Dosyalar geçici adla
+yazılıp yerine taşınır; açık eşlemler eski sürümü görmeye devam eder.
+Ofset indeksi olmayan (önceki sürümde yazılmış) depolarda satır başları
+ilk erişimde bir kez taranır.
+
+Eski düzendeki workspace'ler (kategori başına chunk JSON dosyaları ve
+faiss/metadata_<kategori>.json) salt-okunur olarak desteklenir.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import re
+import threading
+from array import array
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+SENTENCES = "sentences.jsonl"
+SENTENCE_INDEX = "sentences.idx.npy"
+
+
+def _load_npy(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
+
+
+def _scan_line_starts(buf) -> np.ndarray:
+    starts = [0]
+    pos = buf.find(b"\n")
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = buf.find(b"\n", pos + 1)
+    if starts[-1] != len(buf):          # son satırda \n yoksa
+        starts.append(len(buf))
+    return np.asarray(starts, dtype=np.int64)
+
+
+class ChunkStore:
+    def __init__(self, workspace_dir: str):
+        self.workspace_dir = workspace_dir
+        self.root = os.path.join(workspace_dir, "chunks")
+        self._manifest: dict | None = None
+        self._sentences: List[str] | None = None
+        self._offsets: List[Tuple[int, int]] | None = None
+        self._spans: Dict[str, np.ndarray] = {}
+        self._legacy: Dict[str, List[dict]] = {}
+        # (mmap, satır başları) – tek atamayla kurulur, okuyucular yarımını göremez
+        self._lines_pair: Tuple[mmap.mmap | bytes, np.ndarray] | None = None
+        self._open_lock = threading.Lock()     # paylaşılan nesne: ilk açılış tek thread'de
+
+        manifest_path = os.path.join(self.root, MANIFEST)
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                self._manifest = json.load(f)
+
+    # ------------------------------------------------------------------
+    #  Yazma
+    # ------------------------------------------------------------------
+    @classmethod
+    def write(cls, workspace_dir: str, source_file: str, sentences: Sequence[str],
+              spans: Dict[str, Sequence[Tuple[int, int]]], config: dict,
+              offsets: Sequence[Tuple[int, int]] | None = None,
+              page_starts: Sequence[int] | None = None) -> "ChunkStore":
+        with ChunkStoreWriter(workspace_dir, source_file, config, page_starts) as w:
+            for i, s in enumerate(sentences):
+                w.add_sentence(s, *(offsets[i] if offsets is not None else (None, None)))
+            for category, cat_spans in spans.items():
+                for start, end in cat_spans:
+                    w.add_span(category, start, end)
+        return cls(workspace_dir)
+
+    # ------------------------------------------------------------------
+    #  Okuma
+    # ------------------------------------------------------------------
+    @property
+    def source_file(self) -> str | None:
+        return self._manifest["source_file"] if self._manifest else None
+
+    def _lines(self) -> Tuple[mmap.mmap | bytes, np.ndarray]:
+        lines = self._lines_pair
+        if lines is None:
+            with self._open_lock:
+                lines = self._lines_pair
+                if lines is None:
+                    path = os.path.join(self.root, SENTENCES)
+                    with open(path, "rb") as f:
+                        size = os.fstat(f.fileno()).st_size
+                        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+                    index_path = os.path.join(self.root, SENTENCE_INDEX)
+                    starts = _load_npy(index_path) if os.path.isfile(index_path) else _scan_line_starts(buf)
+                    lines = self._lines_pair = (buf, starts)
+        return lines
+
+    def _row(self, i: int) -> dict:
+        buf, starts = self._lines()
+        return json.loads(buf[starts[i]:starts[i + 1]])
+
+    def _load_sentences(self) -> None:
+        sentences, offsets = [], []
+        for i in range(len(self._lines()[1]) - 1):
+            row = self._row(i)
+            sentences.append(row["text"])
+            offsets.append((row.get("start", -1), row.get("end", -1)))
+        self._sentences, self._offsets = sentences, offsets
+
+    def close(self) -> None:
+        """mmap'i hemen bırakır. Yalnızca nesnenin tek sahibi çağırmalı;
+        `serving` önbelleğindeki paylaşılan depolar kapatılmaz."""
+        with self._open_lock:
+            if self._lines_pair is not None and isinstance(self._lines_pair[0], mmap.mmap):
+                self._lines_pair[0].close()
+            self._lines_pair = self._sentences = self._offsets = None
+            self._spans.clear()
+
+    @property
+    def sentences(self) -> List[str]:
+        if self._sentences is None:
+            self._load_sentences()
+        return self._sentences
+
+    @property
+    def offsets(self) -> List[Tuple[int, int]]:
+        """Cümlelerin temiz metindeki [start, end) ofsetleri (-1 → bilinmiyor)."""
+        if self._offsets is None:
+            self._load_sentences()
+        return self._offsets
+
+    def page_of(self, char_offset: int) -> int | None:
+        """Temiz metindeki bir ofsetin sayfa numarası (1 tabanlı)."""
+        pages = self._manifest.get("pages") if self._manifest else None
+        if not pages or char_offset < 0:
+            return None
+        return max(1, bisect.bisect_right(pages, char_offset))
+
+    def spans(self, category: str) -> np.ndarray:
+        if category not in self._spans:
+            self._spans[category] = _load_npy(os.path.join(self.root, f"{category}.npy"))
+        return self._spans[category]
+
+    def count(self, category: str) -> int:
+        if self._manifest is None:
+            return len(self._legacy_chunks(category))
+        return int(self._manifest["chunks"].get(category, 0))
+
+    def text(self, category: str, idx: int) -> str:
+        if self._manifest is None:
+            return self._legacy_chunks(category)[idx]["chunk_text"]
+        start, end = (int(x) for x in self.spans(category)[idx])
+        return self.span_text(start, end)
+
+    def span_text(self, start: int, end: int) -> str:
+        """[start, end) cümlelerinin metni – chunk'lardan bağımsız bir aralık için."""
+        return " ".join(row["text"] for row in self._span_rows(start, end))
+
+    def _span_rows(self, start: int, end: int) -> List[dict]:
+        """[start, end) cümle satırları – tüm tablo yüklüyse oradan, değilse tek tek."""
+        if self._sentences is not None:
+            return [{"text": self._sentences[i], "start": self._offsets[i][0],
+                     "end": self._offsets[i][1]} for i in range(start, end)]
+        return [self._row(i) for i in range(start, end)]
+
+    def _page_range(self, char_start: int, char_end: int) -> Tuple[int | None, int | None]:
+        return self.page_of(char_start), self.page_of(max(char_start, char_end - 1))
+
+    def span_pages(self, start: int, end: int) -> Tuple[int | None, int | None]:
+        """[start, end) cümlelerinin (ilk, son) sayfası; ofset/sayfa yoksa None."""
+        if end <= start:
+            return None, None
+        char_start = self._span_rows(start, start + 1)[0].get("start", -1)
+        char_end = self._span_rows(end - 1, end)[0].get("end", -1)
+        if char_start < 0 or char_end < 0:
+            return None, None
+        return self._page_range(char_start, char_end)
+
+    def chunk(self, category: str, idx: int) -> dict:
+        """Eski chunk JSON'u ile aynı alanları taşıyan sözlük (idx 0 tabanlı)."""
+        if self._manifest is None:
+            return dict(self._legacy_chunks(category)[idx])
+        start, end = (int(x) for x in self.spans(category)[idx])
+        rows = self._span_rows(start, end)
+        text = " ".join(row["text"] for row in rows)
+        char_start = rows[0].get("start", -1) if rows else -1
+        char_end = rows[-1].get("end", -1) if rows else -1
+        chunk = {
+            "source_file": self.source_file,
+            "category": category,
+            "chunk_index": idx + 1,
+            "chunk_text": text,
+            "char_len": len(text),
+            "sentence_count": end - start,
+            "sentence_start": start,
+            "sentence_end": end,
+        }
+        if char_start >= 0 and char_end >= 0:
+            page_start, page_end = self._page_range(char_start, char_end)
+            chunk.update(char_start=char_start, char_end=char_end,
+                         page_start=page_start, page_end=page_end)
+        return chunk
+
+    def texts(self, category: str) -> List[str]:
+        """Kategorinin tüm chunk metinleri (embedding için; tabloyu bir kez çözer)."""
+        if self._manifest is None:
+            return [c["chunk_text"] for c in self._legacy_chunks(category)]
+        sentences = self.sentences
+        return [" ".join(sentences[s:e]) for s, e in self.spans(category).tolist()]
+
+    def iter_chunks(self, category: str) -> Iterator[dict]:
+        for i in range(self.count(category)):
+            yield self.chunk(category, i)
+
+    # ------------------------------------------------------------------
+    #  Eski düzen (chunks/<kategori>/*.json)
+    # ------------------------------------------------------------------
+    def _legacy_chunks(self, category: str) -> List[dict]:
+        if category in self._legacy:
+            return self._legacy[category]
+
+        # FAISS satır sırası metadata dosyasında saklıydı
+        meta_path = os.path.join(self.workspace_dir, "faiss", f"metadata_{category}.json")
+        if os.path.isfile(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                chunks = json.load(f)
+        else:
+            cat_dir = os.path.join(self.root, category)
+            files = [f for f in os.listdir(cat_dir) if f.endswith(".json")] if os.path.isdir(cat_dir) else []
+            files.sort(key=lambda f: int(re.search(r"(\d+)\.json$", f).group(1)))
+            chunks = []
+            for fname in files:
+                with open(os.path.join(cat_dir, fname), encoding="utf-8") as f:
+                    chunks.append(json.load(f))
+
+        self._legacy[category] = chunks
+        return chunks
+
+
+class ChunkStoreWriter:
+    """
+    ChunkStore'u akış halinde yazar: cümleler geldikçe sentences.jsonl'e
+    eklenir, satır ofsetleri ve chunk aralıkları kompakt dizilerde birikir.
+    Bellekte cümle metni tutulmaz. Dosyalar `close()`'ta yerine taşınır.
+
+        with ChunkStoreWriter(ws, "rapor.txt", CHUNK_CONFIG) as w:
+            w.add_sentence("...", 0, 42)
+            w.add_span("genel", 0, 5)
+    """
+
+    def __init__(self, workspace_dir: str, source_file: str, config: dict,
+                 page_starts: Sequence[int] | None = None):
+        self.workspace_dir = workspace_dir
+        self.root = os.path.join(workspace_dir, "chunks")
+        os.makedirs(self.root, exist_ok=True)
+        self.source_file = source_file
+        self.config = config
+        self.page_starts = page_starts
+        self.n_sentences = 0
+        self._spans: Dict[str, array] = {c: array("i") for c in config}
+        self._line_starts = array("q", [0])
+        self._tmp: List[Tuple[str, str]] = []
+        self._f = open(self._tmp_path(SENTENCES), "wb")
+
+    def _tmp_path(self, name: str) -> str:
+        final = os.path.join(self.root, name)
+        self._tmp.append((final + ".tmp", final))
+        return final + ".tmp"
+
+    def add_sentence(self, text: str, start: int | None = None, end: int | None = None) -> int:
+        row = {"text": text}
+        if start is not None:
+            row["start"], row["end"] = start, end
+        line = (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+        self._f.write(line)
+        self._line_starts.append(self._line_starts[-1] + len(line))
+        self.n_sentences += 1
+        return self.n_sentences - 1
+
+    def add_span(self, category: str, start: int, end: int) -> None:
+        self._spans.setdefault(category, array("i")).extend((start, end))
+
+    def close(self) -> None:
+        self._f.close()
+        with open(self._tmp_path(SENTENCE_INDEX), "wb") as f:
+            np.save(f, np.frombuffer(self._line_starts, dtype=np.int64))
+        for category, flat in self._spans.items():
+            arr = np.frombuffer(flat, dtype=np.int32).reshape(-1, 2) if flat \
+                else np.empty((0, 2), dtype=np.int32)
+            with open(self._tmp_path(f"{category}.npy"), "wb") as f:
+                np.save(f, arr)
+        manifest = {
+            "source_file": self.source_file,
+            "config": self.config,
+            "sentences": self.n_sentences,
+            "chunks": {c: len(flat) // 2 for c, flat in self._spans.items()},
+            "pages": list(self.page_starts) if self.page_starts else None,
+        }
+        with open(self._tmp_path(MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # manifest en son: okuyucu yeni manifesti görünce diğer dosyalar hazırdır
+        from .serving import retry_while_mapped    # serving bu modülü içe aktarır
+        for tmp, final in self._tmp:
+            retry_while_mapped(lambda t=tmp, f=final: os.replace(t, f))
+
+    def __enter__(self) -> "ChunkStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            for tmp, _ in self._tmp:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
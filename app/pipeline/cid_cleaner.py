@@ -1,5 +1,7 @@
 import os
 import re
+import json
+from collections import Counter
 
 # —— CID → karakter eşlemeleri
 CID_MAP = {
@@ -23,12 +25,69 @@ CID_MAP = {
     'cid:110': 'ğ',
 }
 
-CID_PATTERN = re.compile(r'\(cid:\d+\)')
+# Tek derlenmiş desen; eşleme sözlükten callback ile yapılır (tek geçiş)
+CID_PATTERN = re.compile(r'\(cid:(\d+)\)')
+_CID_MAX_LEN = 16                 # "(cid:" + rakamlar + ")" için yeterli üst sınır
+BLOCK_CHARS  = 1 << 20            # akış okuyucusunun blok boyu (karakter)
+
+
+class CidTranslator:
+    """
+    CID belirteçlerini tek geçişte çevirir; bilinmeyen CID'leri sayar.
+
+    `feed()` blok blok çağrılabilir: bir blok bir belirtecin ortasında
+    biterse son "(" sonrası kuyruk bir sonraki bloğa devredilir.
+    """
+
+    def __init__(self):
+        self.unknown: Counter = Counter()
+        self._carry = ""
+
+    def _lookup(self, m: re.Match) -> str:
+        key = f"cid:{m.group(1)}"
+        repl = CID_MAP.get(key)
+        if repl is None:
+            self.unknown[key] += 1
+            return ""
+        return repl
+
+    def translate(self, text: str) -> str:
+        return CID_PATTERN.sub(self._lookup, text)
+
+    def feed(self, block: str) -> str:
+        text = self._carry + block
+        cut = text.rfind("(")
+        # tamamlanmamış olabilecek belirteç → sonraki bloğa
+        if cut != -1 and ")" not in text[cut:] and len(text) - cut < _CID_MAX_LEN:
+            self._carry, text = text[cut:], text[:cut]
+        else:
+            self._carry = ""
+        return self.translate(text)
+
+    def flush(self) -> str:
+        text, self._carry = self._carry, ""
+        return self.translate(text)
+
 
 def fix_cids(text: str) -> str:
-    for cid, repl in CID_MAP.items():
-        text = text.replace(f"({cid})", repl)
-    return CID_PATTERN.sub("", text)
+    return CidTranslator().translate(text)
+
+
+def _copy_translated(src, dst, n_chars: int, tr: CidTranslator) -> int:
+    """src'den n_chars karakteri çevirip dst'ye yazar; yazılan uzunluğu döndürür."""
+    written = 0
+    while n_chars > 0:
+        block = src.read(min(BLOCK_CHARS, n_chars))
+        if not block:
+            break
+        n_chars -= len(block)
+        out = tr.feed(block)
+        dst.write(out)
+        written += len(out)
+    out = tr.flush()
+    dst.write(out)
+    return written + len(out)
+
 
 def clean_txt(raw_txt_path: str, workspace_dir: str) -> str:
     """
@@ -43,6 +102,12 @@ def clean_txt(raw_txt_path: str, workspace_dir: str) -> str:
     -------
     str
         Temizlenmiş .txt dosyasının tam yolu
+
+    Metin bloklar halinde okunup yazılır (bellek kullanımı rapor boyundan
+    bağımsız). pdf_to_txt sayfa sınırlarını yazdıysa (``<ad>.pages.json``)
+    temizlenmiş metindeki sayfa ofsetleri de aynı biçimde ``clean_txt``
+    altına yazılır. Eşlemesi olmayan CID'lerin histogramı
+    ``<ad>.unknown_cids.json`` dosyasına kaydedilir.
     """
     if not os.path.isfile(raw_txt_path):
         raise FileNotFoundError(raw_txt_path)
@@ -52,16 +117,44 @@ def clean_txt(raw_txt_path: str, workspace_dir: str) -> str:
 
     base_name  = os.path.basename(raw_txt_path)
     clean_path = os.path.join(out_dir, base_name)
+    stem       = os.path.splitext(clean_path)[0]
+
+    raw_pages_path = os.path.splitext(raw_txt_path)[0] + ".pages.json"
+    if os.path.isfile(raw_pages_path):
+        with open(raw_pages_path, encoding="utf-8") as f:
+            raw_pages = json.load(f)
+    else:
+        raw_pages = None
 
-    with open(raw_txt_path, "r", encoding="utf-8") as f:
-        raw_text = f.read()
+    tr = CidTranslator()
+    with open(raw_txt_path, "r", encoding="utf-8") as src, \
+         open(clean_path, "w", encoding="utf-8") as dst:
+        if raw_pages:
+            # CID belirteçleri satır aşmaz → sayfa sayfa temizlemek tüm metni
+            # temizlemekle aynıdır; böylece yeni sayfa ofsetleri de elde edilir
+            clean_pages, pos, offset = [], 0, 0
+            for page in raw_pages:
+                src.read(page["start"] - pos)          # sayfa arası "\n"
+                if clean_pages:
+                    dst.write("\n")
+                    offset += 1
+                n = _copy_translated(src, dst, page["end"] - page["start"], tr)
+                clean_pages.append({"page": page["page"], "start": offset, "end": offset + n})
+                offset += n
+                pos = page["end"]
 
-    cleaned = fix_cids(raw_text)
+            with open(stem + ".pages.json", "w", encoding="utf-8") as f:
+                json.dump(clean_pages, f)
+        else:
+            _copy_translated(src, dst, float("inf"), tr)
 
-    with open(clean_path, "w", encoding="utf-8") as f:
-        f.write(cleaned)
+    with open(stem + ".unknown_cids.json", "w", encoding="utf-8") as f:
+        json.dump(dict(tr.unknown.most_common()), f, ensure_ascii=False, indent=2)
 
     print(f"🧹 CID temizlendi → {clean_path}")
+    if tr.unknown:
+        top = ", ".join(f"{k}×{v}" for k, v in tr.unknown.most_common(5))
+        print(f"⚠️ Eşlemesi olmayan {len(tr.unknown)} CID ({sum(tr.unknown.values())} adet): {top}")
     return clean_path
 
 
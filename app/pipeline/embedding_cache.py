@@ -0,0 +1,182 @@
+"""
+embedding_cache.py
+──────────────────
+Raporlar arası paylaşılan, içerik adresli kalıcı embedding önbelleği.
+
+Anahtar  : (model adı, normalize edilmiş metnin sha1 özeti)
+Depolama : SQLite (tek dosya); vektörler float32 ham bayt (BLOB) olarak
+Tahliye  : toplam boyut EMBED_CACHE_MAX_MB'yi aşınca en eski kullanılanlar (LRU)
+
+`encode_cached()` yalnızca önbellekte bulunmayan metinleri `model.encode`'a
+gönderir ve isabet istatistiklerini döndürür.
+
+Ortam Değişkenleri
+------------------
+EMBED_CACHE         : "0" → önbellek kapalı
+EMBED_CACHE_DIR     : önbellek klasörü (varsayılan: cache)
+EMBED_CACHE_MAX_MB  : boyut üst sınırı (varsayılan: 1024)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ..core import metrics
+from .model_registry import DEFAULT_MODEL
+
+_WS = re.compile(r"\s+")
+_BATCH = 500          # SQLite parametre sınırının altında kal
+
+
+def text_key(text: str) -> str:
+    """Boşluk/Unicode farklarından bağımsız metin özeti."""
+    norm = _WS.sub(" ", unicodedata.normalize("NFC", text)).strip()
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, dim INTEGER NOT NULL,"
+            " vec BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS emb_lru ON emb(last_used)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache":
+        root = os.getenv("EMBED_CACHE_DIR", "cache")
+        max_mb = float(os.getenv("EMBED_CACHE_MAX_MB", "1024"))
+        return cls(os.path.join(root, "embeddings.sqlite"), int(max_mb * 1024 * 1024))
+
+    # ------------------------------------------------------------------
+    #  Toplu okuma / yazma
+    # ------------------------------------------------------------------
+    def get_many(self, model_name: str, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _BATCH):
+                part = list(keys[i:i + _BATCH])
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM emb WHERE model = ? AND key IN ({marks})",
+                    [model_name, *part],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE emb SET last_used = ? WHERE model = ? AND key IN ({marks})",
+                        [now, model_name, *part],
+                    )
+            self._conn.commit()
+        return found
+
+    def put_many(self, model_name: str, items: Sequence[Tuple[str, np.ndarray]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(model_name, k, int(v.shape[0]), np.asarray(v, dtype=np.float32).tobytes(), now)
+                for k, v in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO emb VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self) -> None:
+        """Boyut sınırı aşıldıysa LRU sırasıyla siler (self._lock altında)."""
+        if self.max_bytes <= 0:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM emb").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)      # biraz pay bırak
+        freed, victims = 0, []
+        for model, key, size in self._conn.execute(
+                "SELECT model, key, LENGTH(vec) FROM emb ORDER BY last_used"):
+            victims.append((model, key))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM emb WHERE model = ? AND key = ?", victims)
+        self._conn.commit()
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache | None:
+    """Süreç genelinde tek önbellek; EMBED_CACHE=0 ise None."""
+    global _cache
+    if os.getenv("EMBED_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache.from_env()
+        return _cache
+
+
+def _encode(model: Any, texts: List[str], batch_size: int, **encode_kw) -> np.ndarray:
+    """model.encode + süre/hız metrikleri."""
+    t0 = time.perf_counter()
+    emb = model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                       normalize_embeddings=True, **encode_kw)
+    elapsed = time.perf_counter() - t0
+    metrics.EMBED_SECONDS.observe(elapsed)
+    metrics.EMBED_TEXTS.inc(len(texts), source="model")
+    if texts and elapsed > 0:
+        metrics.EMBED_THROUGHPUT.observe(len(texts) / elapsed)
+    return np.asarray(emb, dtype=np.float32)
+
+
+def encode_cached(model: Any, model_name: str | None, texts: List[str],
+                  batch_size: int = 32, **encode_kw) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Normalize edilmiş embedding matrisini ve {"hits", "misses"} istatistiğini döndürür.
+    Yalnızca önbellekte olmayan (ve kendi içinde tekrar etmeyen) metinler encode edilir.
+    """
+    model_name = model_name or os.getenv("EMBED_MODEL", DEFAULT_MODEL)
+    metrics.EMBED_BATCH_SIZE.observe(len(texts))
+    cache = get_cache()
+    if cache is None or not texts:
+        emb = _encode(model, texts, batch_size=batch_size, **encode_kw)
+        return emb, {"hits": 0, "misses": len(texts)}
+
+    keys = [text_key(t) for t in texts]
+    found = cache.get_many(model_name, list(dict.fromkeys(keys)))
+
+    # eksik anahtarlar – her benzersiz metin bir kez encode edilir
+    missing: Dict[str, str] = {}
+    for k, t in zip(keys, texts):
+        if k not in found and k not in missing:
+            missing[k] = t
+
+    if missing:
+        emb = _encode(model, list(missing.values()), batch_size=batch_size, **encode_kw)
+        new_items = list(zip(missing.keys(), emb))
+        cache.put_many(model_name, new_items)
+        found.update(new_items)
+
+    out = np.stack([found[k] for k in keys]).astype(np.float32, copy=False)
+    hits = sum(1 for k in keys if k not in missing)
+    metrics.EMBED_TEXTS.inc(hits, source="cache")
+    return out, {"hits": hits, "misses": len(keys) - hits}
@@ -5,24 +5,35 @@ Her soru için seçilmiş ilk 10 chunk'ın rapordaki orijinal bağlamını geni
 
 Girdi  : workspace/{rapor_id}/top10/<kategori>/soruX_top10.json
 Çıktı  : workspace/{rapor_id}/expanded/<kategori>/soruX_top10.json
+
+Chunk'lar temiz metindeki karakter ofsetlerini (char_start/char_end)
+taşıyorsa genişletme doğrudan dilimleme ile yapılır. Ofseti olmayan eski
+sonuçlarda chunk rapor başına bir kez kurulan `TextLocator` ile bulunur.
+
+Cümle aralığı olan chunk'lar (ChunkStore) tam cümlelere genişletilir:
+[char_start − EXPANSION_SIZE, char_end + EXPANSION_SIZE) aralığına değen
+cümleler cümle ofsetleri üzerinde ikili aramayla bulunur ve
+``expanded_sentence_start/_end`` olarak yazılır; ``expanded_text`` bu
+aralığın metnidir, ``expanded_page_start/_end`` ilk ve son cümlesinin
+sayfaları. `gpt_prompt_builder` prompt'u bu dosyalardan kurar,
+`passage_merger` genişlemiş aralıkları birleştirir.
 """
 
-import os, json, re, faiss
-from difflib import SequenceMatcher
+import bisect
+import os, json, re
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
+
+from ..core import metrics, tracing
+from .model_registry import get_model   # süreç genelinde paylaşılan model
+from .serving import get_index, get_store
+from .text_locator import TextLocator
 
 DATASETS = {
-    "genel":   {"index": "faiss_genel.index",   "meta": "metadata_genel.json"},
-    "mevzuat": {"index": "faiss_mevzuat.index", "meta": "metadata_mevzuat.json"},
-    "ozel":    {"index": "faiss_ozel.index",    "meta": "metadata_ozel.json"},
+    "genel":   {"index": "faiss_genel.index"},
+    "mevzuat": {"index": "faiss_mevzuat.index"},
+    "ozel":    {"index": "faiss_ozel.index"},
 }
 
-def _load_model(model_name: str | None = None) -> SentenceTransformer:
-    if model_name is None:
-        model_name = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-    return SentenceTransformer(model_name)
-
 # 📁 PATH AYARLARI sildimmmmmm
 
 # 🔧 HER KATEGORİYE ÖZEL GENİŞLETME MİKTARI
@@ -39,38 +50,88 @@ def normalize(text: str) -> str:
 def clean_text(text: str) -> str:
     return re.sub(r"\s+", " ", text.replace("\n", " ")).strip()
 
-def expand_text_snippet(chunk_text: str, full_text: str, extra_chars: int) -> str:
-    norm_chunk = normalize(chunk_text)
-    norm_full  = normalize(full_text)
-
-    idx = norm_full.find(norm_chunk)
-
-    if idx == -1:
-        # fuzzy fallback
-        best, best_idx = 0, -1
-        for i in range(0, len(norm_full) - len(norm_chunk), 100):
-            win = norm_full[i:i+len(norm_chunk)+100]
-            ratio = SequenceMatcher(None, norm_chunk, win).ratio()
-            if ratio > best:
-                best, best_idx = ratio, i
-        if best < 0.7:
-            return clean_text(chunk_text)
-        idx = best_idx
-
-    snippet = norm_full[idx:idx+50]
-    raw_idx = full_text.lower().find(snippet[:20].strip())
-    raw_idx = max(raw_idx, 0)
-
-    start = max(0, raw_idx - extra_chars)
-    end   = min(len(full_text), raw_idx + len(chunk_text) + extra_chars)
+def expand_by_offset(full_text: str, char_start: int, char_end: int, extra_chars: int) -> str:
+    start = max(0, char_start - extra_chars)
+    end   = min(len(full_text), char_end + extra_chars)
     return clean_text(full_text[start:end])
 
-
-def expand_chunk(workspace_dir):
+def expand_text_snippet(chunk_text: str, full_text: str, extra_chars: int,
+                        locator: TextLocator | None = None) -> str:
+    if locator is None:
+        locator = TextLocator(full_text)
+
+    span = locator.locate(chunk_text)
+    if span is None:
+        return clean_text(chunk_text)
+    return expand_by_offset(full_text, span[0], span[1], extra_chars)
+
+
+def expand_span(starts: list[int], ends: list[int], sentence_start: int, sentence_end: int,
+                extra_chars: int) -> tuple[int, int]:
+    """[sentence_start, sentence_end) aralığını iki yana ~extra_chars karaktere
+    değen tam cümlelerle genişletir (starts/ends: cümle ofsetleri, sıralı)."""
+    char_start = starts[sentence_start] - extra_chars
+    char_end = ends[sentence_end - 1] + extra_chars
+    return (min(sentence_start, bisect.bisect_right(ends, char_start)),
+            max(sentence_end, bisect.bisect_left(starts, char_end)))
+
+
+class _ReportCache:
+    """Kaynak metinleri rapor başına bir kez okur; locator ihtiyaç olunca kurulur."""
+
+    def __init__(self, txt_dir: str, store=None):
+        self.txt_dir = txt_dir
+        self.store = store
+        self._text: dict[str, str | None] = {}
+        self._locators: dict[str, TextLocator] = {}
+        self._bounds: tuple[list[int], list[int]] | None = None
+
+    def text(self, source_file: str) -> str | None:
+        if source_file not in self._text:
+            path = os.path.join(self.txt_dir, source_file)
+            if os.path.isfile(path):
+                with open(path, encoding="utf-8") as rf:
+                    self._text[source_file] = rf.read()
+            else:
+                print(f"❌ Kaynak metin yok: {source_file}")
+                self._text[source_file] = None
+        return self._text[source_file]
+
+    def locator(self, source_file: str) -> TextLocator:
+        if source_file not in self._locators:
+            self._locators[source_file] = TextLocator(self._text[source_file])
+        return self._locators[source_file]
+
+    def bounds(self, chunk: dict) -> tuple[list[int], list[int]] | None:
+        """Chunk'ın cümle tablosunun (başlangıç, bitiş) ofsetleri; yoksa None."""
+        store = self.store
+        if (store is None or not store.source_file or chunk.get("source_file") != store.source_file
+                or not isinstance(chunk.get("sentence_start"), int)):
+            return None
+        if self._bounds is None:
+            offsets = store.offsets
+            if any(start < 0 for start, _ in offsets):      # ofsetsiz eski depo
+                self._bounds = ([], [])
+            else:
+                self._bounds = ([s for s, _ in offsets], [e for _, e in offsets])
+        return self._bounds if self._bounds[0] else None
+
+
+def expand_chunk(workspace_dir, top_k: int | None = None):
+    """top10/ sonuçlarını expanded/'e genişletir; *top_k* verilirse yalnızca
+    güncel ``soruX_top<k>.json`` dosyaları (top10/ çalıştırmalar arasında
+    temizlenmez)."""
     TXT_DIR    = os.path.join(workspace_dir, "clean_txt")
     TOP10_DIR  = os.path.join(workspace_dir, "top10")
     EXPAND_DIR = os.path.join(workspace_dir, "expanded")
 
+    try:
+        store = get_store(workspace_dir)
+    except OSError:
+        store = None
+    reports = _ReportCache(TXT_DIR, store)
+    suffix = f"_top{top_k}.json" if top_k else ".json"
+
     for category, extra in EXPANSION_SIZE.items():
         in_dir  = os.path.join(TOP10_DIR, category)
         out_dir = os.path.join(EXPAND_DIR, category)
@@ -82,51 +143,68 @@ def expand_chunk(workspace_dir):
 
 
         for filename in tqdm(os.listdir(in_dir), desc=f"{category} expanding"):
-            if not filename.endswith(".json"):
+            if not filename.endswith(suffix):
                 continue
 
-            with open(os.path.join(in_dir, filename), encoding="utf-8") as f:
-                chunks = json.load(f)
-
-            for chunk in chunks:
-                source_txt = chunk.get("source_file")
-                report_path = os.path.join(TXT_DIR, source_txt)
-
-                if not os.path.isfile(report_path):
-                    print(f"❌ Kaynak metin yok: {source_txt}")
-                    chunk["expanded_text"] = clean_text(chunk["chunk_text"])
-                    continue
-
-                with open(report_path, encoding="utf-8") as rf:
-                    full_text = rf.read()
-
-                chunk["expanded_text"] = expand_text_snippet(chunk["chunk_text"], full_text, extra)
-
-            with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as wf:
-                json.dump(chunks, wf, ensure_ascii=False, indent=2)
+            with tracing.span("expand", dataset=category, file=filename) as sp:
+                with open(os.path.join(in_dir, filename), encoding="utf-8") as f:
+                    chunks = json.load(f)
+
+                scans = 0                           # ofseti olmayan → metinde arama
+                for chunk in chunks:
+                    bounds = reports.bounds(chunk)
+                    if bounds is not None:             # cümle tablosu: tam cümlelerle
+                        start, end = expand_span(*bounds, chunk["sentence_start"],
+                                                 chunk["sentence_end"], extra)
+                        chunk["expanded_sentence_start"] = start
+                        chunk["expanded_sentence_end"] = end
+                        chunk["expanded_text"] = store.span_text(start, end)
+                        page_start, page_end = store.span_pages(start, end)
+                        if page_start is not None:
+                            chunk["expanded_page_start"] = page_start
+                            chunk["expanded_page_end"] = page_end
+                        continue
+
+                    source_txt = chunk.get("source_file")
+                    full_text  = reports.text(source_txt) if source_txt else None
+                    if full_text is None:
+                        chunk["expanded_text"] = clean_text(chunk["chunk_text"])
+                    elif "char_start" in chunk and "char_end" in chunk:
+                        chunk["expanded_text"] = expand_by_offset(
+                            full_text, chunk["char_start"], chunk["char_end"], extra)
+                    else:
+                        scans += 1
+                        chunk["expanded_text"] = expand_text_snippet(
+                            chunk["chunk_text"], full_text, extra, reports.locator(source_txt))
+
+                with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as wf:
+                    json.dump(chunks, wf, ensure_ascii=False, indent=2)
+                sp.set(chunks=len(chunks), snippet_scans=scans)
 
     print(f"\n✅ Tüm genişletilmiş top-10 sonuçlar kaydedildi → {EXPAND_DIR}")
 
 def query(workspace_dir: str, question: str, top_k: int, model_name: str | None):
     """Tek bir soruya göre (tüm dataset’lerde) en iyi top-k chunk listesi döndür."""
-    model = _load_model(model_name)
+    model = get_model(model_name)
     emb   = model.encode([question], convert_to_numpy=True,
                          normalize_embeddings=True)
 
     faiss_dir = os.path.join(workspace_dir, "faiss")
+    store     = get_store(workspace_dir)
     out       = []
 
     for ds, files in DATASETS.items():
-        idx  = faiss.read_index(os.path.join(faiss_dir, files["index"]))
-        with open(os.path.join(faiss_dir, files["meta"]), encoding="utf-8") as f:
-            meta = json.load(f)
+        idx  = get_index(os.path.join(faiss_dir, files["index"]))
 
-        scores, idxs = idx.search(emb, top_k)
+        with metrics.FAISS_SEARCH_SECONDS.time(index=ds):
+            scores, idxs = idx.search(emb, top_k)
         for score, i in zip(scores[0], idxs[0]):
+            if i < 0:
+                continue
             out.append({
                 "dataset": ds,
                 "score"  : float(score),
-                **meta[int(i)]
+                **store.chunk(ds, int(i))
             })
 
     # en iyi skorlar; gerekirse dataset başına kısıtlaması uygulanabilir
@@ -135,6 +213,8 @@ def query(workspace_dir: str, question: str, top_k: int, model_name: str | None)
 
 
 if __name__ == "__main__":
-    expand_chunk(WORKSPACE)
+    import sys
+    expand_chunk(sys.argv[1] if len(sys.argv) > 1 else "workspace/rapor2023",
+                 int(sys.argv[2]) if len(sys.argv) > 2 else None)
     # Örnek kullanım: expand_chunk("workspace/rapor2023")
     # Bu fonksiyon, rapor2023 klasöründeki top10 sonuçlarını genişletir.
\ No newline at end of file
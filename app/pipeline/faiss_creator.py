@@ -1,78 +1,72 @@
 """
 faiss_creator.py
 ────────────────
-Bir rapora ait chunk JSON'larını okuyarak her kategori (genel, ozel, mevzuat)
-için embedding + FAISS index oluşturur.
+Bir rapora ait chunk deposunu (ChunkStore) okuyarak her kategori (genel,
+ozel, mevzuat) için embedding + FAISS index oluşturur. İndeksin i. satırı
+deponun i. chunk'ıdır; ayrıca metadata dosyası yazılmaz.
+
+İndeks tipi `index_factory` ile seçilir (flat / hnsw / ivf_flat / ivf_pq).
 """
 
 from __future__ import annotations
-import os, json, faiss, numpy as np
+import os
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
-
-DATASETS = ["genel", "ozel", "mevzuat"]
 
+from ..core import tracing
+from .model_registry import get_model   # süreç genelinde paylaşılan model
+from .embedding_cache import encode_cached
+from .chunk_store import ChunkStore
+from .index_factory import build_index, describe, save_index
 
-# --------------------------------------------------
-#  Ortak model‐yükleyici — .env → EMBED_MODEL okunur
-# --------------------------------------------------
-def _load_model(model_name: str | None = None) -> SentenceTransformer:
-    if model_name is None:                                # .env belirtilmediyse
-        model_name = os.getenv("EMBED_MODEL",
-                               "sentence-transformers/all-MiniLM-L6-v2")
-    return SentenceTransformer(model_name)
+DATASETS = ["genel", "ozel", "mevzuat"]
 
 
 def create_faiss_for_chunks(workspace_dir: str,
-                            model_name: str | None = None) -> None:
+                            model_name: str | None = None) -> dict:
     """
     workspace_dir :  workspace/raporXXXX klasörü
+
+    Embedding'ler kalıcı önbellekten okunur; yalnızca önbellekte olmayan
+    chunk'lar modele gönderilir. Dönen değer: {"hits": …, "misses": …}
     """
-    chunk_root = os.path.join(workspace_dir, "chunks")
+    store      = ChunkStore(workspace_dir)
     output_dir = os.path.join(workspace_dir, "faiss")
     os.makedirs(output_dir, exist_ok=True)
 
-    model = _load_model(model_name)
+    model = get_model(model_name)
+    stats = {"hits": 0, "misses": 0}
 
     for ds in DATASETS:
         print(f"\n🔧  {ds.upper()} için FAISS oluşturuluyor …")
 
-        ds_folder  = os.path.join(chunk_root, ds)
-        json_files = [f for f in os.listdir(ds_folder) if f.endswith(".json")]
-
-        metadata: list[dict] = []
-        texts:     list[str] = []
-
-        for jf in json_files:
-            with open(os.path.join(ds_folder, jf), encoding="utf-8") as f:
-                data = json.load(f)
-            metadata.append(data)
-            texts.append(data["chunk_text"])
+        texts = store.texts(ds)
 
         if not texts:
-            print(f"⚠️  Veri yok  →  {ds_folder}")
+            print(f"⚠️  Veri yok  →  {store.root} ({ds})")
             continue
 
-        # 🧠 Embedding
-        embeddings = model.encode(
-            texts,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-        )
+        # 🧠 Embedding (önbellek destekli)
+        with tracing.span("embed", dataset=ds, chunks=len(texts)) as sp:
+            embeddings, ds_stats = encode_cached(model, model_name, texts)
+            sp.set(cache_hits=ds_stats["hits"], cache_misses=ds_stats["misses"])
+        for key in stats:
+            stats[key] += ds_stats[key]
 
-        # 📈 FAISS index
-        dim   = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dim)
-        index.add(embeddings)
+        # 📈 FAISS index (tip: FAISS_INDEX_TYPE / Settings.faiss_index_type)
+        with tracing.span("faiss.build", dataset=ds, vectors=len(embeddings)) as sp:
+            index = build_index(embeddings)
+            sp.set(index=describe(index))
 
         # 📤 Kaydet
-        faiss.write_index(index,
-                          os.path.join(output_dir, f"faiss_{ds}.index"))
-        with open(os.path.join(output_dir, f"metadata_{ds}.json"),
-                  "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        save_index(index, os.path.join(output_dir, f"faiss_{ds}.index"))
+
+        print(f"✅  {ds} → {describe(index)}  →  {output_dir}")
 
-        print(f"✅  {ds} → index & metadata  →  {output_dir}")
+    total = stats["hits"] + stats["misses"]
+    if total:
+        print(f"💾  Embedding önbelleği: {stats['hits']}/{total} isabet "
+              f"(%{100 * stats['hits'] / total:.1f})")
+    return stats
 
 
 # --------------------------------------------------
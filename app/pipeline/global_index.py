@@ -0,0 +1,619 @@
+"""
+global_index.py
+───────────────
+Tüm raporları kapsayan, parçalı (sharded) global FAISS indeksi.
+
+Her vektör 64 bit bir kimlikle (IndexIDMap2) saklanır; kimliğin karşılığı
+olan (rapor, kategori, chunk indeksi) SQLite yan deposunda tutulur.
+Böylece bir soru tek arama çağrısıyla tüm raporlarda ya da seçilen
+rapor/kategori alt kümesinde aranabilir.
+
+Düzen (<WORKSPACE_ROOT>/_global/):
+    meta.sqlite      → vectors(id, report_id, category, chunk_index, shard)
+                       reports(report_id, shard, n_vectors, fingerprint, added)
+                       tombstones(id, shard)
+    shard_<i>.index  → IndexIDMap2(iç indeks)
+    lock             → süreçler arası yazma kilidi
+
+• Rapor → shard: crc32(report_id) % GLOBAL_INDEX_SHARDS; bir raporun tüm
+  vektörleri aynı shard'dadır, rapor filtresi ilgisiz shard'ları atlar.
+• Filtre: seçilen kimlikler `IDSelectorBatch` ile aramaya verilir.
+• Arama: shard'lar thread havuzunda paralel aranır (FAISS GIL'i bırakır),
+  sonuçlar skora göre birleştirilir.
+• Ekleme sırası: yan depo commit edilir, sonra shard atomik yazılır
+  (geçici dosya + os.replace), en son raporun parmak izi işlenir. Shard
+  hiçbir zaman yan depoda olmayan bir kimlik taşımaz.
+• Kilit: okuyucu/yazar kilidi. Aramalar (ve diğer okumalar) birbirini
+  beklemeden eşzamanlı çalışır; shard'ları yerinde değiştiren ekleme,
+  silme ve sıkıştırma kilidi tek başına alır.
+• Çok süreç (birden çok uvicorn worker'ı): yazmalar ayrıca `lock` dosyası
+  üzerinden süreçler arası özel kilit alır. Her süreç shard'ları kendi
+  belleğinde tutar; her okuma/yazma öncesi shard dosyasının damgasına
+  (mtime, boyut, inode) bakılır, başka süreç değiştirmişse yeniden
+  okunur. Mezar taşı önbelleği SQLite `data_version` değişince atılır.
+• İç indeks `index_factory` ile kurulur (flat / hnsw). Shard'lar artımlı
+  büyüdüğünden IVF tipleri burada flat'e düşer.
+
+Artımlı bakım
+-------------
+• Ekleme : yeni raporun vektörleri ilgili shard'a eklenir; diğer raporlara
+  dokunulmaz. Güncellenen raporun eski vektörleri mezar taşına çevrilir.
+• Silme  : vektörler FAISS'ten hemen silinmez; kimlikleri `tombstones`
+  tablosuna yazılır ve aramada `IDSelectorNot` ile dışlanır (O(1) silme).
+• Sıkıştırma: mezar taşı oranı GLOBAL_INDEX_COMPACT_RATIO'yu aşan shard'lar
+  arka planda gerçekten temizlenir (flat → remove_ids, hnsw → yeniden kurulum).
+
+chunk_indeks = raporun kategori indeksindeki FAISS satırı (0 tabanlı),
+yani `ChunkStore.chunk(kategori, chunk_index)` ile aynı.
+
+Ortam Değişkenleri
+------------------
+GLOBAL_INDEX          : "1"/"true" → pipeline her raporu global indekse ekler
+GLOBAL_INDEX_DIR      : varsayılan <WORKSPACE_ROOT>/_global
+GLOBAL_INDEX_SHARDS   : shard sayısı (varsayılan 4; sonradan değiştirilmez)
+GLOBAL_INDEX_COMPACT_RATIO : mezar taşı / vektör oranı eşiği (varsayılan 0.2)
+
+API sürecinde bu üçü açılışta Settings'ten (`.env` dahil) `configure` ile
+verilir; ortam değişkenleri yalnızca CLI / betik varsayılanıdır.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence
+
+import faiss
+import numpy as np
+
+from ..core import metrics
+from .index_factory import build_index, save_index
+
+CATEGORIES = ("genel", "ozel", "mevzuat")
+DEFAULT_SHARDS = 4
+DEFAULT_COMPACT_RATIO = 0.2
+
+_enabled = os.getenv("GLOBAL_INDEX", "0").strip().lower() in ("1", "true", "yes", "on")
+_n_shards = int(os.getenv("GLOBAL_INDEX_SHARDS", str(DEFAULT_SHARDS)))
+_compact_ratio = float(os.getenv("GLOBAL_INDEX_COMPACT_RATIO", str(DEFAULT_COMPACT_RATIO)))
+
+
+def _index_vectors(index: faiss.Index) -> np.ndarray:
+    """Rapor indeksindeki vektörleri satır sırasıyla geri okur."""
+    ivf = None
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        pass
+    if ivf is not None:
+        ivf.make_direct_map()        # IVF-PQ'da yaklaşık (kuantalanmış) vektör
+    return index.reconstruct_n(0, index.ntotal)
+
+
+class _RWLock:
+    """Çok okuyucu / tek yazar kilidi (yeniden girilemez).
+
+    Bekleyen yazar yeni okuyucuları durdurur; sürekli arama trafiği
+    eklemeyi aç bırakmaz.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _FileLock:
+    """Süreçler arası özel kilit (Unix: flock, Windows: msvcrt.locking)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+            self._fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:            # LK_LOCK ~10 sn dener; beklemeye devam
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+def _file_stamp(path: str) -> tuple | None:
+    """Dosya sürümü; os.replace yeni inode verdiğinden aynı saniyedeki yazmalar da ayrılır."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class GlobalIndex:
+    def __init__(self, root: str, n_shards: int = DEFAULT_SHARDS,
+                 compact_ratio: float = DEFAULT_COMPACT_RATIO):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.compact_ratio = compact_ratio
+        self._rw = _RWLock()
+        # okuyucular aynı anda çalışır; SQLite bağlantısı ve önbellekler
+        # (shard, mezar taşı) onların arasında bu kısa kilitle korunur
+        self._mutex = threading.Lock()
+        self._flock = _FileLock(os.path.join(root, "lock"))
+        self._conn = sqlite3.connect(os.path.join(root, "meta.sqlite"),
+                                     timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " report_id TEXT PRIMARY KEY, shard INTEGER NOT NULL,"
+            " n_vectors INTEGER NOT NULL, fingerprint TEXT, added REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, report_id TEXT NOT NULL, category TEXT NOT NULL,"
+            " chunk_index INTEGER NOT NULL, shard INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS vectors_report ON vectors(report_id);"
+            "CREATE INDEX IF NOT EXISTS vectors_category ON vectors(category);"
+            "CREATE TABLE IF NOT EXISTS tombstones (id INTEGER PRIMARY KEY, shard INTEGER NOT NULL);"
+        )
+        # shard sayısı ilk kurulumda sabitlenir
+        with self._flock:
+            stored = self._meta("n_shards")
+            self.n_shards = int(stored) if stored else n_shards
+            if not stored:
+                self._set_meta("n_shards", str(self.n_shards))
+            self._conn.commit()
+
+        self._shards: Dict[int, faiss.Index] = {}
+        self._stamps: Dict[int, tuple | None] = {}
+        self._tombs: Dict[int, np.ndarray] = {}
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._pool = ThreadPoolExecutor(max_workers=self.n_shards, thread_name_prefix="gindex")
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gindex-compact")
+
+    @classmethod
+    def from_config(cls) -> "GlobalIndex":
+        root = os.getenv("GLOBAL_INDEX_DIR") or os.path.join(
+            os.getenv("WORKSPACE_ROOT", "workspace"), "_global")
+        return cls(root, _n_shards, _compact_ratio)
+
+    # ------------------------------------------------------------------
+    #  Yardımcılar
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _reading(self):
+        """Kısa okuma: yazarları dışlar, diğer okuyucularla sırayla."""
+        with self._rw.read(), self._mutex:
+            self._refresh()
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """Yazma: süreç içinde tek başına + süreçler arası dosya kilidi."""
+        with self._rw.write(), self._flock:
+            self._refresh()
+            yield
+
+    def _refresh(self) -> None:
+        """(kilit altında) Başka süreçlerin yazdıklarını görünür kılar."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:          # başka bağlantı commit etmiş
+            self._data_version = version
+            self._tombs.clear()
+        for shard in list(self._shards):
+            if _file_stamp(self._shard_path(shard)) != self._stamps.get(shard):
+                del self._shards[shard]            # bir sonraki _shard() dosyadan okur
+
+    def _meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    @property
+    def model_name(self) -> str | None:
+        """Vektörleri üreten embedding modeli (sorgular da bununla embed edilmeli)."""
+        with self._reading():
+            return self._meta("model")
+
+    def shard_of(self, report_id: str) -> int:
+        return zlib.crc32(report_id.encode("utf-8")) % self.n_shards
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.root, f"shard_{shard}.index")
+
+    def _shard(self, shard: int, dim: int | None = None) -> faiss.Index | None:
+        if shard not in self._shards:
+            path = self._shard_path(shard)
+            stamp = _file_stamp(path)
+            if stamp is not None:
+                self._shards[shard] = faiss.read_index(path)
+                self._stamps[shard] = stamp
+            elif dim is not None:
+                inner = build_index(np.empty((0, dim), dtype="float32"))
+                self._shards[shard] = faiss.IndexIDMap2(inner)
+                self._stamps[shard] = None
+            else:
+                return None
+        return self._shards[shard]
+
+    def _save_shard(self, shard: int) -> None:
+        path = self._shard_path(shard)
+        save_index(self._shards[shard], path)
+        self._stamps[shard] = _file_stamp(path)
+
+    # ------------------------------------------------------------------
+    #  Raporlar
+    # ------------------------------------------------------------------
+    def reports(self) -> List[dict]:
+        with self._reading():
+            rows = self._conn.execute(
+                "SELECT report_id, shard, n_vectors, fingerprint, added FROM reports ORDER BY report_id"
+            ).fetchall()
+        return [dict(zip(("report_id", "shard", "n_vectors", "fingerprint", "added"), r)) for r in rows]
+
+    def fingerprint_of(self, report_id: str) -> str | None:
+        with self._reading():
+            row = self._conn.execute("SELECT fingerprint FROM reports WHERE report_id = ?",
+                                     (report_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_report(self, workspace_dir: str, report_id: str, *,
+                   model_name: str | None = None, fingerprint: str | None = None) -> int:
+        """Raporun kategori indekslerini global indekse ekler.
+
+        Aynı parmak izi zaten kayıtlıysa hiçbir şey yapmaz; farklıysa
+        raporun eski vektörleri mezar taşına çevrilir. Eklenen vektör
+        sayısını döndürür.
+        """
+        if fingerprint is not None and self.fingerprint_of(report_id) == fingerprint:
+            print(f"⏭️  Global indeks güncel: {report_id}")
+            return 0
+
+        faiss_dir = os.path.join(workspace_dir, "faiss")
+        blocks = []
+        for category in CATEGORIES:
+            path = os.path.join(faiss_dir, f"faiss_{category}.index")
+            if os.path.isfile(path):
+                vecs = _index_vectors(faiss.read_index(path))
+                if len(vecs):
+                    blocks.append((category, np.ascontiguousarray(vecs, dtype="float32")))
+        if not blocks:
+            print(f"⚠️  Global indekse eklenecek vektör yok: {faiss_dir}")
+            return 0
+
+        dim = blocks[0][1].shape[1]
+        with self._writing():
+            self._check_model(dim, model_name)
+            replaced = self._tombstone_report(report_id)
+
+            shard = self.shard_of(report_id)
+            index = self._shard(shard, dim)
+            total = 0
+            for category, vecs in blocks:
+                self._conn.executemany(
+                    "INSERT INTO vectors (report_id, category, chunk_index, shard) VALUES (?, ?, ?, ?)",
+                    [(report_id, category, i, shard) for i in range(len(vecs))],
+                )
+                # AUTOINCREMENT + kilit → kimlikler ardışık ve asla yeniden kullanılmaz
+                last = self._conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ids = np.arange(last - len(vecs) + 1, last + 1, dtype="int64")
+                index.add_with_ids(vecs, ids)
+                total += len(vecs)
+
+            # önce yan depo: shard'daki her kimliğin satırı kalıcı olmalı, yoksa
+            # geri alınan AUTOINCREMENT kimlikleri yeni satırlara verilebilir.
+            # Parmak izi shard yazıldıktan sonra işlenir; arada çökülürse
+            # rapor bir sonraki çağrıda yeniden eklenir.
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?)",
+                (report_id, shard, total, None, time.time()),
+            )
+            self._conn.commit()
+            self._save_shard(shard)                 # geçici dosya + os.replace
+            if fingerprint is not None:
+                self._conn.execute("UPDATE reports SET fingerprint = ? WHERE report_id = ?",
+                                   (fingerprint, report_id))
+                self._conn.commit()
+
+        print(f"🌐 Global indeks: {report_id} → shard {shard} ({total} vektör"
+              + (f", {replaced} eski vektör mezar taşı)" if replaced else ")"))
+        self.maybe_compact(shard)
+        return total
+
+    def delete_report(self, report_id: str) -> int:
+        """Raporu aramadan hemen çıkarır; vektörler sıkıştırmada silinir.
+
+        Mezar taşına çevrilen vektör sayısını döndürür (rapor yoksa 0).
+        """
+        with self._writing():
+            removed = self._tombstone_report(report_id)
+            self._conn.commit()
+        if removed:
+            print(f"🪦 Global indeks: {report_id} silindi ({removed} vektör)")
+            self.maybe_compact(self.shard_of(report_id))
+        return removed
+
+    def _check_model(self, dim: int, model_name: str | None) -> None:
+        stored_dim = self._meta("dim")
+        if stored_dim is None:
+            self._set_meta("dim", str(dim))
+            if model_name:
+                self._set_meta("model", model_name)
+            return
+        stored_model = self._meta("model")
+        if int(stored_dim) != dim or (model_name and stored_model and stored_model != model_name):
+            raise ValueError(
+                f"Global indeks {stored_model or '?'} ({stored_dim} boyut) ile kurulmuş; "
+                f"{model_name or '?'} ({dim} boyut) eklenemez"
+            )
+
+    def _tombstone_report(self, report_id: str) -> int:
+        """(yazma kilidi altında) Raporun vektörlerini yan depodan çıkarıp mezar taşı yapar."""
+        rows = self._conn.execute("SELECT id, shard FROM vectors WHERE report_id = ?",
+                                  (report_id,)).fetchall()
+        if rows:
+            self._conn.executemany("INSERT OR IGNORE INTO tombstones VALUES (?, ?)", rows)
+            for shard in {r[1] for r in rows}:
+                self._tombs.pop(shard, None)
+        self._conn.execute("DELETE FROM vectors WHERE report_id = ?", (report_id,))
+        self._conn.execute("DELETE FROM reports WHERE report_id = ?", (report_id,))
+        return len(rows)
+
+    def _tombstones(self, shard: int) -> np.ndarray:
+        """(kilit altında) Shard'ın henüz sıkıştırılmamış silinmiş kimlikleri."""
+        if shard not in self._tombs:
+            rows = self._conn.execute("SELECT id FROM tombstones WHERE shard = ?", (shard,)).fetchall()
+            self._tombs[shard] = np.array([r[0] for r in rows], dtype="int64")
+        return self._tombs[shard]
+
+    # ------------------------------------------------------------------
+    #  Sıkıştırma
+    # ------------------------------------------------------------------
+    def compact(self, shards: Iterable[int] | None = None) -> int:
+        """Mezar taşlı vektörleri FAISS shard'larından gerçekten siler."""
+        removed = 0
+        with self._writing():
+            for shard in (range(self.n_shards) if shards is None else shards):
+                drop = self._tombstones(shard)
+                index = self._shard(shard)
+                if not len(drop):
+                    continue
+                if index is not None:
+                    try:
+                        index.remove_ids(drop)
+                    except RuntimeError:       # HNSW silmeyi desteklemez → yeniden kur
+                        self._rebuild_shard(shard, drop)
+                    self._save_shard(shard)
+                self._conn.execute("DELETE FROM tombstones WHERE shard = ?", (shard,))
+                self._conn.commit()
+                self._tombs.pop(shard, None)
+                removed += len(drop)
+                print(f"🧹 Global indeks shard {shard} sıkıştırıldı ({len(drop)} vektör)")
+        return removed
+
+    def maybe_compact(self, shard: int) -> None:
+        """Mezar taşı oranı eşiği aştıysa shard'ı arka planda sıkıştırır."""
+        with self._reading():
+            index = self._shard(shard)
+            dead = len(self._tombstones(shard))
+            if not dead or index is None:
+                return
+            if dead < self.compact_ratio * max(index.ntotal, 1):
+                return
+        self._compactor.submit(self.compact, [shard])
+
+    def _rebuild_shard(self, shard: int, drop: np.ndarray) -> None:
+        old = self._shards[shard]
+        ids = faiss.vector_to_array(old.id_map)
+        keep = ~np.isin(ids, drop)
+        new = faiss.IndexIDMap2(build_index(np.empty((0, old.d), dtype="float32")))
+        if keep.any():
+            # IDMap2'nin iç indeksindeki satırlar id_map sırasındadır
+            vecs = old.index.reconstruct_n(0, old.ntotal)[keep]
+            new.add_with_ids(np.ascontiguousarray(vecs), ids[keep])
+        self._shards[shard] = new
+
+    def stats(self) -> List[dict]:
+        with self._reading():
+            out = []
+            for shard in range(self.n_shards):
+                index = self._shard(shard)
+                out.append({"shard": shard, "vectors": index.ntotal if index is not None else 0,
+                            "tombstones": int(len(self._tombstones(shard)))})
+            return out
+
+    # ------------------------------------------------------------------
+    #  Arama
+    # ------------------------------------------------------------------
+    def _selection(self, report_ids: Sequence[str] | None,
+                   categories: Sequence[str] | None) -> Dict[int, np.ndarray | None]:
+        """shard → izin verilen kimlikler (None → filtre yok).
+
+        Filtreli sorguda kimlikler yan depodan gelir; silinmiş raporlar orada
+        olmadığından mezar taşları zaten dışarıda kalır.
+        """
+        if not report_ids and not categories:
+            return {s: None for s in range(self.n_shards)}
+
+        where, args = [], []
+        if report_ids:
+            where.append(f"report_id IN ({','.join('?' * len(report_ids))})")
+            args += list(report_ids)
+        if categories:
+            where.append(f"category IN ({','.join('?' * len(categories))})")
+            args += list(categories)
+        rows = self._conn.execute(
+            f"SELECT shard, id FROM vectors WHERE {' AND '.join(where)}", args
+        ).fetchall()
+
+        by_shard: Dict[int, List[int]] = {}
+        for shard, vid in rows:
+            by_shard.setdefault(shard, []).append(vid)
+        return {s: np.array(ids, dtype="int64") for s, ids in by_shard.items()}
+
+    @staticmethod
+    def _search_shard(index: faiss.Index, queries: np.ndarray, k: int,
+                      ids: np.ndarray | None, tombs: np.ndarray | None):
+        if ids is None and (tombs is None or not len(tombs)):
+            return index.search(queries, k)
+        params = faiss.SearchParameters()
+        if ids is not None:
+            batch = faiss.IDSelectorBatch(ids)
+            params.sel = batch
+        else:
+            batch = faiss.IDSelectorBatch(tombs)
+            not_sel = faiss.IDSelectorNot(batch)   # batch referansı arama boyunca yaşamalı
+            params.sel = not_sel
+        return index.search(queries, k, params=params)
+
+    def search(self, queries: np.ndarray, k: int = 10, *,
+               report_ids: Sequence[str] | None = None,
+               categories: Sequence[str] | None = None) -> List[List[dict]]:
+        """Her sorgu için skora göre sıralı en iyi k sonuç.
+
+        Sonuç: [{"score", "report_id", "category", "chunk_index"}, …]
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype="float32")
+        # okuma kilidi: ekleme/sıkıştırma shard'ları arama sürerken değiştirmesin;
+        # eşzamanlı aramalar ve bir aramanın shard'ları paralel ilerler
+        with self._rw.read():
+            with self._mutex:
+                self._refresh()
+                selection = self._selection(report_ids, categories)
+                targets = [(self._shard(s), ids, None if ids is not None else self._tombstones(s))
+                           for s, ids in selection.items()]
+            targets = [t for t in targets
+                       if t[0] is not None and t[0].ntotal and (t[1] is None or len(t[1]))]
+            if not targets:
+                return [[] for _ in range(len(queries))]
+            with metrics.FAISS_SEARCH_SECONDS.time(index="global"):
+                parts = list(self._pool.map(
+                    lambda t: self._search_shard(t[0], queries, k, t[1], t[2]), targets))
+        scores = np.hstack([p[0] for p in parts])
+        ids = np.hstack([p[1] for p in parts])
+
+        # shard'lar arası birleştirme: sorgu başına skora göre ilk k
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        top_scores = np.take_along_axis(scores, order, axis=1)
+        top_ids = np.take_along_axis(ids, order, axis=1)
+
+        with self._reading():
+            meta = self._lookup(int(i) for i in top_ids.ravel() if i >= 0)
+        results = []
+        for q_scores, q_ids in zip(top_scores, top_ids):
+            hits = []
+            for score, vid in zip(q_scores, q_ids):
+                if vid < 0 or int(vid) not in meta:
+                    continue
+                hits.append({"score": float(score), **meta[int(vid)]})
+            results.append(hits)
+        return results
+
+    def _lookup(self, ids: Iterable[int]) -> Dict[int, dict]:
+        ids = list(set(ids))
+        out: Dict[int, dict] = {}
+        for i in range(0, len(ids), 900):          # SQLite parametre sınırı
+            batch = ids[i:i + 900]
+            rows = self._conn.execute(
+                f"SELECT id, report_id, category, chunk_index FROM vectors "
+                f"WHERE id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for vid, report_id, category, chunk_index in rows:
+                out[vid] = {"report_id": report_id, "category": category,
+                            "chunk_index": chunk_index}
+        return out
+
+
+_global: GlobalIndex | None = None
+_global_lock = threading.Lock()
+
+
+def get_global_index() -> GlobalIndex:
+    """Süreç genelinde tek global indeks."""
+    global _global
+    with _global_lock:
+        if _global is None:
+            _global = GlobalIndex.from_config()
+            # önceki süreçten sıkıştırılmadan kalan mezar taşları
+            for shard in range(_global.n_shards):
+                _global.maybe_compact(shard)
+        return _global
+
+
+def configure(*, enabled: bool | None = None, shards: int | None = None,
+              compact_ratio: float | None = None) -> None:
+    """Süreç ayarlarını değiştirir (ör. FastAPI açılışında Settings'ten).
+
+    Shard sayısı yalnızca yeni kurulan indekse uygulanır; mevcut indeks
+    kendi sayısını meta.sqlite'tan okur.
+    """
+    global _enabled, _n_shards, _compact_ratio
+    if enabled is not None:
+        _enabled = enabled
+    if shards is not None:
+        _n_shards = max(1, shards)
+    if compact_ratio is not None:
+        _compact_ratio = compact_ratio
+        with _global_lock:
+            if _global is not None:
+                _global.compact_ratio = compact_ratio
+
+
+def enabled() -> bool:
+    return _enabled
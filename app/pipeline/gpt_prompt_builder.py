@@ -2,34 +2,74 @@
 """
 Prompt Generator for R&D Center Evaluation
 -----------------------------------------
-• Reads **soru‑yordam** metadata and the **expanded** top‑10 chunk files.
+• Reads **soru‑yordam** metadata and the top‑k chunk files: the
+  ``expanded/`` copy written by `expand_chunk` (widened to whole sentences
+  around each hit) when it is not older than ``top10/``, else ``top10/``.
 • Builds a single prompt that ChatGPT can answer *strictly* from the chunks.
-• Indices (1…N) are only for citation; chunks are not ranked globally.
+• Chunks are ranked globally by score for packing; the prompt groups them
+  by dataset, best score first inside each section. Indices (1…N) are only
+  for citation.
 
-NEW (June 2025)
-~~~~~~~~~~~~~~~~
-Instead of sending the prompt to OpenAI, the script now creates one JSON
-file per question under ``<workspace>/PROMPTS``.  Each file is named
-``prompt_<id>.json`` and contains three keys:
+Output
+~~~~~~
+Instead of sending the prompt to OpenAI, the module writes one JSON
+record per question to ``<workspace>/PROMPTS/prompts.jsonl``:
 
-    ``{"soru": "…", "yordam": "…", "prompt": "…"}``
+    ``{"id": 1, "soru": "…", "yordam": "…", "prompt": "…", "passages": […], "token_stats": {…}}``
 
 Run from the project root:
 
->>> python generate_prompt.py /path/to/workspace
-
-All other behaviour (chunk selection, prompt formatting, etc.) is
-unchanged.
+>>> python -m app.pipeline.gpt_prompt_builder /path/to/workspace
+
+Prompts are rendered through the Jinja2 template
+``resources/prompt_template.j2`` (see *Batch build*).
+
+Passage merging
+~~~~~~~~~~~~~~~
+Retrieved chunks overlap heavily across datasets. Before numbering, they
+are reduced to non-overlapping sentence spans (`passage_merger`), so no
+sentence is sent twice. Each prompt record also notes which chunks ended
+up in which citation (``passages``) and the estimated token savings
+(``token_stats``).
+
+Token budget
+~~~~~~~~~~~~
+Candidates are ranked by their FAISS score across all datasets and packed
+until the model's token budget is full (`prompt_packer`). Chunks that do
+not fit are listed in ``token_stats["dropped"]``.
+
+Batch build
+~~~~~~~~~~~
+`generate_all_prompts` reads the question metadata and every top‑k file
+exactly once. Only ``soru<id>_top<top_k>.json`` is read: ``top10/`` is not
+cleared between runs, so files left by an earlier run with another k
+(e.g. ``soru1_top10.json`` next to the current ``soru1_top5.json``) are
+ignored. It renders all prompts through the precompiled Jinja2 template
+``resources/prompt_template.j2`` and writes them in one pass to
+``PROMPTS/prompts.jsonl`` (one record per line). The sender still accepts
+the older per-question ``prompt_<id>.json`` files.
+``PROMPT_TEMPLATE_VERSION`` contains a hash of the template, so editing
+it invalidates cached prompts and answers automatically.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
-from textwrap import dedent
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Tuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+
+from ..core import tracing
+from . import prompt_packer
+from .passage_merger import Passage, token_savings
+from .serving import get_store
 
 # ---------------------------------------------------------------------------
 # Configuration — adjust paths for your environment
@@ -37,12 +77,34 @@ from typing import Dict, List, Any
 
 DATASETS: List[str] = ["genel", "ozel", "mevzuat"]  # search folders
 MIN_CHUNK_CHARS = 30   # ignore very short/noisy snippets
-MAX_TOTAL_CHUNKS = 30   # hard cap in final prompt
+MAX_TOTAL_CHUNKS = 30   # hard cap on candidates (by score) before packing
+DEFAULT_TOP_K = 10      # same default as run_pipeline / ask_all (TOPK)
+
+TEMPLATE_DIR = Path(__file__).with_name("resources")
+TEMPLATE_NAME = "prompt_template.j2"
+PROMPTS_FILE = "prompts.jsonl"
+
+# Bump when chunk selection/packing in this module changes; edits to the
+# template itself are picked up through its content hash.
+_BUILDER_VERSION = "8"
+PROMPT_TEMPLATE_VERSION = (
+    f"{_BUILDER_VERSION}-"
+    f"{hashlib.sha256((TEMPLATE_DIR / TEMPLATE_NAME).read_bytes()).hexdigest()[:12]}"
+)
 
 # ---------------------------------------------------------------------------
 # Helper functions
 # ---------------------------------------------------------------------------
 
+def _resolve_top_k(top_k: int | None) -> int:
+    return top_k or int(os.getenv("TOPK", str(DEFAULT_TOP_K)))
+
+
+def _topk_name(question_id: int, top_k: int) -> str:
+    """File written by ``ask_all`` for one question (soru1_top10.json …)."""
+    return f"soru{question_id}_top{top_k}.json"
+
+
 def _load_questions(meta_path: Path) -> Dict[int, Dict[str, Any]]:
     """Return a dict {1: item1, 2: item2, ...} from the metadata file (no 'id' needed)."""
     with meta_path.open("r", encoding="utf-8") as f:
@@ -50,33 +112,169 @@ def _load_questions(meta_path: Path) -> Dict[int, Dict[str, Any]]:
     return {i + 1: item for i, item in enumerate(data)}
 
 
+def _filter_chunks(raw: List[Dict[str, Any]], dataset: str) -> List[Dict[str, Any]]:
+    """Keep decent snippets from one top‑k file, with score/span metadata.
 
-def _load_chunks(dataset: str, question_id: int, chunk_base: Path) -> List[Dict[str, Any]]:
-    """Load expanded top‑10 file for a dataset/question and filter decent snippets."""
-    fname = chunk_base / dataset / f"soru{question_id}_top10.json"
-    if not fname.exists():
-        return []
-
-    with fname.open("r", encoding="utf-8") as f:
-        raw = json.load(f)
-
+    Expanded entries (``expand_chunk``) contribute their widened text,
+    sentence span and page range; the length filter still applies to the
+    retrieved chunk.
+    """
     good: List[Dict[str, Any]] = []
     for item in raw:
         text = (item.get("chunk_text", "") or "").strip()
         if len(text) >= MIN_CHUNK_CHARS:
-            good.append({
-                "text": text,
+            chunk = {
+                "text": (item.get("expanded_text") or text).strip(),
                 "dataset": dataset,
-                "score": item.get("score")
-            })
+                "score": item.get("score"),
+                "rank": item.get("rank"),
+                "chunk_index": item.get("index"),
+                # sentence span & pages (absent in legacy workspaces)
+                **{k: item[k] for k in ("sentence_start", "sentence_end",
+                                        "page_start", "page_end") if k in item},
+            }
+            if "expanded_sentence_start" in item and "expanded_sentence_end" in item:
+                chunk["sentence_start"] = item["expanded_sentence_start"]
+                chunk["sentence_end"] = item["expanded_sentence_end"]
+            if "expanded_page_start" in item and "expanded_page_end" in item:
+                chunk["page_start"] = item["expanded_page_start"]
+                chunk["page_end"] = item["expanded_page_end"]
+            good.append(chunk)
     return good
 
 
-def generate_prompt(question_id: int, workspace_dir: Path, total_chunks: int = MAX_TOTAL_CHUNKS) -> str:
+def _source_path(workspace_dir: Path, dataset: str, name: str) -> Path:
+    """``expanded/`` copy of a top‑k file if it is at least as new, else ``top10/``."""
+    retrieved = workspace_dir / "top10" / dataset / name
+    expanded = workspace_dir / "expanded" / dataset / name
+    try:
+        if expanded.stat().st_mtime >= retrieved.stat().st_mtime:
+            return expanded
+    except FileNotFoundError:
+        pass
+    return retrieved
+
+
+def _load_chunks(dataset: str, question_id: int, workspace_dir: Path,
+                 top_k: int) -> List[Dict[str, Any]]:
+    """Load the top‑k file for a dataset/question and filter decent snippets."""
+    path = _source_path(workspace_dir, dataset, _topk_name(question_id, top_k))
+    if not path.is_file():
+        return []
+
+    with path.open("r", encoding="utf-8") as f:
+        return _filter_chunks(json.load(f), dataset)
+
+
+def _load_all_chunks(workspace_dir: Path, top_k: int) -> Dict[int, List[Dict[str, Any]]]:
+    """One directory scan per dataset: {question_id: chunks of all datasets}."""
+    topk_file = re.compile(rf"soru(\d+)_top{top_k}\.json$")
+    by_question: Dict[int, List[Dict[str, Any]]] = {}
+    for ds in DATASETS:
+        ds_dir = workspace_dir / "top10" / ds
+        if not ds_dir.is_dir():
+            continue
+        for name in sorted(os.listdir(ds_dir)):
+            m = topk_file.match(name)
+            if m is None:
+                continue
+            with _source_path(workspace_dir, ds, name).open("r", encoding="utf-8") as f:
+                by_question.setdefault(int(m.group(1)), []).extend(_filter_chunks(json.load(f), ds))
+    return by_question
+
+
+def _span_text(workspace_dir: Path):
+    """Sentence-table accessor for merging, or None for legacy workspaces."""
+    try:
+        store = get_store(str(workspace_dir))
+    except OSError:
+        return None
+    return store.span_text if store.source_file else None
+
+
+@lru_cache(maxsize=1)
+def _template() -> Template:
+    """Compiled once per process."""
+    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)),
+                      undefined=StrictUndefined, trim_blocks=True,
+                      lstrip_blocks=True, autoescape=False)
+    return env.get_template(TEMPLATE_NAME)
+
+
+def _ordered(passages: List[Passage]) -> List[Passage]:
+    """Display/citation order: dataset sections, best score first inside each."""
+    return [p for ds in DATASETS for p in passages if p.dataset == ds]
+
+
+def _passage_line(passage: Passage) -> str:
+    """What one passage adds to the prompt (widest citation number assumed)."""
+    return f"({MAX_TOTAL_CHUNKS}) {passage.text}\n"
+
+
+def _render(question_id: int, soru: str, yordam: str, passages: List[Passage]) -> str:
+    """Full prompt text; citation (n) = position in `_ordered(passages)`."""
+    sections, index = [], 1
+    for ds in DATASETS:
+        items = []
+        for p in passages:
+            if p.dataset == ds:
+                items.append((index, p.text))
+                index += 1
+        if items:
+            sections.append((ds, items))
+
+    return _template().render(question_id=question_id, soru=soru, yordam=yordam,
+                              sections=sections, count=index - 1).strip()
+
+
+def _build_prompt(question_id: int, soru: str, yordam: str,
+                  chunks: List[Dict[str, Any]], span_text: Callable[[int, int], str] | None,
+                  total_chunks: int = MAX_TOTAL_CHUNKS, model: str | None = None
+                  ) -> Tuple[str, List[Passage], Dict[str, Any]]:
+    """Prompt text, the numbered passages (index = position + 1) and token stats.
+
+    *model* sets the token budget and tokenizer (default: LLM_MODEL).
+    """
+    model = model or prompt_packer.current_model()
+
+    # global ranking by FAISS score (files without scores keep file order)
+    chunks = sorted(chunks, key=lambda c: c["score"] if c.get("score") is not None else float("-inf"),
+                    reverse=True)
+    capped = chunks[total_chunks:]
+    chunks = chunks[:total_chunks]
+
+    # --- pack into the token budget (overlaps merged into passages) ---------
+    passages, kept, dropped, prompt_tokens = prompt_packer.pack(
+        chunks, span_text,
+        lambda ps: _render(question_id, soru, yordam, _ordered(ps)),
+        passage_text=_passage_line, model=model)
+    numbered = _ordered(passages)
+    prompt = _render(question_id, soru, yordam, numbered)
+
+    stats: Dict[str, Any] = token_savings(kept, passages,
+                                          lambda text: prompt_packer.count_tokens(text, model))
+    stats.update(
+        prompt_tokens=prompt_tokens,
+        model=model,
+        budget=prompt_packer.token_budget(model),
+        tokenizer=prompt_packer.tokenizer_name(model),
+        dropped=[_dropped(c, "budget") for c in dropped]
+                + [_dropped(c, "max_chunks") for c in capped],
+    )
+    return prompt, numbered, stats
+
+
+def _dropped(chunk: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    return {**{k: chunk[k] for k in ("dataset", "rank", "chunk_index", "score")
+               if chunk.get(k) is not None}, "reason": reason}
+
+
+def generate_prompt(question_id: int, workspace_dir: Path, total_chunks: int = MAX_TOTAL_CHUNKS,
+                    top_k: int | None = None) -> str:
     """Return the complete evaluation prompt for the given *question_id*."""
 
     question_path = workspace_dir / "faiss" / "metadata_soru_yordam.json"
-    chunk_base = workspace_dir / "top10"
+    top_k = _resolve_top_k(top_k)
 
     # --- fetch soru & yordam ------------------------------------------------
     questions = _load_questions(question_path)
@@ -84,89 +282,75 @@ def generate_prompt(question_id: int, workspace_dir: Path, total_chunks: int = M
         raise ValueError(f"Question id {question_id} not found in metadata")
 
     meta = questions[question_id]
-    soru = meta["soru"].strip()
-    yordam = meta["yordam"].strip()
 
     # --- gather chunks from all datasets ------------------------------------
     chunks: List[Dict[str, Any]] = []
     for ds in DATASETS:
-        chunks.extend(_load_chunks(ds, question_id, chunk_base))
+        chunks.extend(_load_chunks(ds, question_id, workspace_dir, top_k))
 
-    # cap (preserve original order – no global ranking available)
-    chunks = chunks[:total_chunks]
-
-    # --- build text sections ------------------------------------------------
-    prompt_lines: List[str] = []
-    index = 1
-    for ds in DATASETS:
-        ds_chunks = [c for c in chunks if c["dataset"] == ds]
-        if not ds_chunks:
-            continue
-        prompt_lines.append(f"{{<{ds}>= {ds}}}")
-        for c in ds_chunks:
-            prompt_lines.append(f"({index}) {c['text']}")
-            c["index"] = index
-            index += 1
-
-    section_text = "\n".join(prompt_lines)
-
-    # --- craft final prompt --------------------------------------------------
-    prompt = dedent(f"""
-    SYSTEM:
-    You are an expert evaluator of R‑D centre activity reports.
-    You must answer strictly and **only** from the chunks the user provides.
-    If the chunks don’t contain enough evidence, reply exactly with
-    “Bilgi bulunamadı.” – nothing else.
-
-    USER:
-    ### SORU {question_id}
-    {soru}
-
-    ### YORDAM {question_id}
-    {yordam}
-
-    ### KAYNAK METİNLER
-    Aşağıda soruyla ilişkili en fazla {index-1} metin parçası bulunuyor (sırasız).
-    **Tamamını okuyun** ve ardından **özlü** bir yanıt verin. Yanıtınız:
-    • Yordamda listelenen *her* kriteri değerlendirir;
-      – Karşılanan hususları kısaca onaylar,
-      – Eksik hususları belirtir ve gerekirse öneri sunar.
-    • Dayandığınız parçaların numaralarını **[3]**, **[7]** gibi gösterir.
-    • Türkçe yazılır.
-    Eğer uygun parça yoksa yalnızca “Bilgi bulunamadı.” yazın.
-
-    {section_text}
-    """).strip()
-
-    return prompt
+    return _build_prompt(question_id, meta["soru"].strip(), meta["yordam"].strip(),
+                         chunks, _span_text(workspace_dir), total_chunks)[0]
 
 # ---------------------------------------------------------------------------
 # Bulk generation helper
 # ---------------------------------------------------------------------------
 
-def generate_all_prompts(workspace_dir: Path) -> None:
-    """Generate and save prompt files for **all** questions in the workspace."""
+def generate_all_prompts(workspace_dir: Path, top_k: int | None = None,
+                         model: str | None = None) -> None:
+    """Generate all prompts in one pass and save them to ``PROMPTS/prompts.jsonl``.
+
+    *top_k* must match the ``ask_all`` run whose files are read (default: TOPK).
+    *model* must be the model the prompts are sent to (default: LLM_MODEL).
+    """
 
     #meta_path = Path("user_uploads/questions.json")
     meta_path = workspace_dir / "faiss" / "metadata_soru_yordam.json"
     questions = _load_questions(meta_path)
+    all_chunks = _load_all_chunks(workspace_dir, _resolve_top_k(top_k))
+    span_text = _span_text(workspace_dir)
 
     out_dir = workspace_dir / "PROMPTS"
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    lines: List[str] = []
+    saved_total = before_total = 0
     for qid in sorted(questions):
-        prompt_text = generate_prompt(qid, workspace_dir)
         record = questions[qid]
-        out_json = {
+        soru, yordam = record["soru"].strip(), record["yordam"].strip()
+        with tracing.span("prompt", question_id=qid) as sp:
+            prompt_text, passages, stats = _build_prompt(qid, soru, yordam,
+                                                         all_chunks.get(qid, []), span_text,
+                                                         model=model)
+            sp.set(chunks=stats["chunks"], passages=stats["passages"],
+                   prompt_tokens=stats["prompt_tokens"], dropped=len(stats["dropped"]))
+        lines.append(json.dumps({
             "id": qid,
-            "soru": record["soru"].strip(),
-            "yordam": record["yordam"].strip(),
-            "prompt": prompt_text
-        }
-        outfile = out_dir / f"prompt_{qid}.json"
-        with outfile.open("w", encoding="utf-8") as f:
-            json.dump(out_json, f, ensure_ascii=False, indent=2)
-        print(f"✓ saved {outfile.relative_to(workspace_dir)}")
+            "soru": soru,
+            "yordam": yordam,
+            "prompt": prompt_text,
+            "passages": [p.as_dict(i) for i, p in enumerate(passages, 1)],
+            "token_stats": stats,
+        }, ensure_ascii=False))
+
+        saved_total += stats["tokens_saved"]
+        before_total += stats["tokens_before"]
+        pct = 100 * stats["tokens_saved"] / stats["tokens_before"] if stats["tokens_before"] else 0
+        print(f"✓ prompt {qid} "
+              f"({stats['chunks']} chunks → {stats['passages']} passages, "
+              f"~{stats['tokens_saved']} tokens saved, {pct:.0f}%; "
+              f"{stats['prompt_tokens']}/{stats['budget']} tokens, "
+              f"{len(stats['dropped'])} dropped)")
+
+    outfile = out_dir / PROMPTS_FILE
+    tmp = outfile.with_suffix(".tmp")
+    tmp.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+    os.replace(tmp, outfile)
+    print(f"✓ saved {len(lines)} prompts → {outfile.relative_to(workspace_dir)} "
+          f"(template {PROMPT_TEMPLATE_VERSION})")
+
+    if before_total:
+        print(f"✂️  Passage merge saved ~{saved_total} of ~{before_total} chunk tokens "
+              f"({100 * saved_total / before_total:.0f}%)")
 
 # ---------------------------------------------------------------------------
 # CLI entry‑point
@@ -175,6 +359,8 @@ def generate_all_prompts(workspace_dir: Path) -> None:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate evaluation prompts for ALL questions.")
     parser.add_argument("workspace", type=str, help="Root of the project workspace (contains faiss/, expanded/ etc.)")
+    parser.add_argument("--topk", dest="top_k", type=int, default=None,
+                        help="k of the top-k files to read (default: TOPK or 10)")
     args = parser.parse_args()
 
     root = Path(args.workspace).expanduser().resolve()
@@ -182,6 +368,6 @@ if __name__ == "__main__":
         sys.exit(f"Error: workspace directory '{root}' does not exist")
 
     try:
-        generate_all_prompts(root)
+        generate_all_prompts(root, top_k=args.top_k)
     except Exception as exc:
         sys.exit(f"Error: {exc}")
@@ -0,0 +1,229 @@
+"""
+index_factory.py
+────────────────
+Yapılandırılabilir FAISS indeks fabrikası. Tüm indeksler iç çarpım
+(normalize embedding → kosinüs) metriğini kullanır.
+
+Tipler
+------
+flat      : IndexFlatIP – tam arama (varsayılan, tek rapor için yeterli)
+hnsw      : IndexHNSWFlat – eğitim gerektirmez; efSearch ile hız/isabet ayarı
+ivf_flat  : IndexIVFFlat – k-means ile nlist hücre; nprobe hücre aranır
+ivf_pq    : IndexIVFPQ – IVF + ürün kuantalama (pq_m alt vektör × pq_nbits)
+
+IVF tipleri eğitim ister. Eğitim örneği en fazla `train_size` vektördür
+(0 → min(n, 256·nlist)). nlist, hücre başına en az 39 vektör kalacak
+şekilde küçültülür. Çok az vektör varsa (ör. soru-yordam indeksi) Flat
+indekse düşülür. pq_m, boyutu (dim) tam bölen en büyük değere
+indirilir.
+
+Ortam Değişkenleri (Settings alanlarıyla aynı adlar)
+-----------------------------------------------------
+FAISS_INDEX_TYPE      : flat | hnsw | ivf_flat | ivf_pq
+FAISS_NLIST           : IVF hücre sayısı; 0 → 4·√n
+FAISS_NPROBE          : aramada bakılacak IVF hücresi
+FAISS_PQ_M            : PQ alt vektör sayısı
+FAISS_PQ_NBITS        : alt vektör başına bit
+FAISS_HNSW_M          : HNSW komşu sayısı
+FAISS_EF_CONSTRUCTION : HNSW kurulum derinliği
+FAISS_EF_SEARCH       : HNSW arama derinliği
+FAISS_TRAIN_SIZE      : IVF eğitim örneği üst sınırı; 0 → otomatik
+
+NPROBE ve EF_SEARCH arama zamanı parametreleridir (`SEARCH_FIELDS`):
+pipeline bunları aramaya açıkça geçirir, indeks parmak izine katmaz.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import asdict, dataclass, replace
+
+import faiss
+import numpy as np
+
+from .serving import retry_while_mapped
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+MIN_POINTS_PER_CENTROID = 39      # faiss k-means uyarı eşiği
+SEARCH_FIELDS = ("nprobe", "ef_search")   # indeksle kaydedilir ama aramada ezilebilir
+
+
+@dataclass
+class IndexSpec:
+    type: str = "flat"
+    nlist: int = 0
+    nprobe: int = 8
+    pq_m: int = 16
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    train_size: int = 0
+
+    def __post_init__(self):
+        self.type = self.type.lower()
+        if self.type not in INDEX_TYPES:
+            raise ValueError(f"Bilinmeyen FAISS indeks tipi: {self.type!r} ({', '.join(INDEX_TYPES)})")
+
+    @classmethod
+    def from_env(cls) -> "IndexSpec":
+        def _int(name: str, default: int) -> int:
+            return int(os.getenv(name, str(default)) or default)
+
+        return cls(
+            type=os.getenv("FAISS_INDEX_TYPE", "flat") or "flat",
+            nlist=_int("FAISS_NLIST", 0),
+            nprobe=_int("FAISS_NPROBE", 8),
+            pq_m=_int("FAISS_PQ_M", 16),
+            pq_nbits=_int("FAISS_PQ_NBITS", 8),
+            hnsw_m=_int("FAISS_HNSW_M", 32),
+            ef_construction=_int("FAISS_EF_CONSTRUCTION", 200),
+            ef_search=_int("FAISS_EF_SEARCH", 64),
+            train_size=_int("FAISS_TRAIN_SIZE", 0),
+        )
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    def build_dict(self) -> dict:
+        """Yalnızca kurulumu etkileyen alanlar (indeks parmak izi için)."""
+        return {k: v for k, v in asdict(self).items() if k not in SEARCH_FIELDS}
+
+    def search_dict(self) -> dict:
+        """Arama zamanı alanları; değişmeleri indeksi yeniden kurdurmaz."""
+        return {k: getattr(self, k) for k in SEARCH_FIELDS}
+
+
+_spec: IndexSpec | None = None
+
+
+def configure(**fields) -> IndexSpec:
+    """Süreç geneli varsayılanı değiştirir (ör. FastAPI açılışında Settings'ten)."""
+    global _spec
+    _spec = replace(current_spec(), **fields)
+    return _spec
+
+
+def current_spec() -> IndexSpec:
+    global _spec
+    if _spec is None:
+        _spec = IndexSpec.from_env()
+    return _spec
+
+
+# ------------------------------------------------------------------
+#  Kurulum
+# ------------------------------------------------------------------
+def _pq_m_for(dim: int, wanted: int) -> int:
+    """dim'i tam bölen, wanted'dan büyük olmayan en büyük m."""
+    for m in range(min(wanted, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(x: np.ndarray, size: int, seed: int = 1234) -> np.ndarray:
+    if size >= len(x):
+        return x
+    rng = np.random.default_rng(seed)
+    return x[np.sort(rng.choice(len(x), size, replace=False))]
+
+
+def build_index(embeddings: np.ndarray, spec: IndexSpec | None = None) -> faiss.Index:
+    """Embedding matrisinden (n, dim) seçilen tipte doldurulmuş indeks kurar."""
+    spec = spec or current_spec()
+    x = np.ascontiguousarray(embeddings, dtype="float32")
+    n, dim = x.shape
+
+    kind = spec.type
+    if kind in ("ivf_flat", "ivf_pq") and n < 2 * MIN_POINTS_PER_CENTROID:
+        print(f"ℹ️  {n} vektör IVF için az → flat")
+        kind = "flat"
+    if kind == "ivf_pq" and n < 2 ** spec.pq_nbits:
+        print(f"ℹ️  {n} vektör PQ eğitimi için az (≥{2 ** spec.pq_nbits}) → ivf_flat")
+        kind = "ivf_flat"
+
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = spec.ef_construction
+        index.hnsw.efSearch = spec.ef_search
+
+    else:
+        nlist = spec.nlist or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // MIN_POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlatIP(dim)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            m = _pq_m_for(dim, spec.pq_m)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, spec.pq_nbits,
+                                     faiss.METRIC_INNER_PRODUCT)
+        train_size = spec.train_size or max(256 * nlist, 2 ** spec.pq_nbits)
+        index.train(_training_sample(x, min(n, train_size)))
+        index.nprobe = min(spec.nprobe, nlist)
+
+    index.add(x)
+    return index
+
+
+def save_index(index: faiss.Index, path: str) -> None:
+    """İndeksi geçici dosyaya yazıp yerine taşır.
+
+    Aynı dosyayı mmap ile açmış okuyucular (`serving`) eski sürümü görmeye
+    devam eder; yerinde yeniden yazma onların sayfalarını bozardı.
+    """
+    tmp = path + ".tmp"
+    faiss.write_index(index, tmp)
+    retry_while_mapped(lambda: os.replace(tmp, path))   # Windows: süren arama eşlemi bırakana dek
+
+
+# ------------------------------------------------------------------
+#  Arama parametreleri
+# ------------------------------------------------------------------
+def set_search_params(index: faiss.Index, *, nprobe: int | None = None,
+                      ef_search: int | None = None) -> faiss.Index:
+    """Diskten okunan indekse arama zamanı parametrelerini uygular.
+
+    Parametre verilmezse indeksle kaydedilmiş değerler geçerli kalır;
+    indeks tipine uymayan parametre sessizce yok sayılır.
+    """
+    if nprobe is not None:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = min(nprobe, ivf.nlist)
+        except RuntimeError:
+            pass
+    if ef_search is not None:
+        real = faiss.downcast_index(index)
+        if hasattr(real, "hnsw"):
+            real.hnsw.efSearch = ef_search
+    return index
+
+
+def search_params(index: faiss.Index, *, nprobe: int | None = None,
+                  ef_search: int | None = None) -> faiss.SearchParameters | None:
+    """Tek arama çağrısına özel parametre nesnesi (`index.search(..., params=)`).
+
+    `set_search_params`'ın aksine indeksi değiştirmez; süreçte paylaşılan
+    (önbellekteki) indeksler farklı isteklerde farklı değerlerle aranabilir.
+    """
+    real = faiss.downcast_index(index)
+    if nprobe is not None and hasattr(real, "nlist"):
+        return faiss.SearchParametersIVF(nprobe=min(nprobe, real.nlist))
+    if ef_search is not None and hasattr(real, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
+def describe(index: faiss.Index) -> str:
+    real = faiss.downcast_index(index)
+    name = type(real).__name__
+    if hasattr(real, "nlist"):
+        return f"{name}(nlist={real.nlist}, nprobe={real.nprobe})"
+    if hasattr(real, "hnsw"):
+        return f"{name}(M={real.hnsw.nb_neighbors(1)}, efSearch={real.hnsw.efSearch})"
+    return name
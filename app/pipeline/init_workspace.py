@@ -16,9 +16,7 @@ def init_workspace(report_name: str, root="workspace"):
     subdirs = [
         "raw_txt",
         "clean_txt",
-        "chunks/genel",
-        "chunks/ozel",
-        "chunks/mevzuat",
+        "chunks",
         "faiss",
         "top10/genel",
         "top10/ozel",
@@ -0,0 +1,110 @@
+"""
+llm_cache.py
+────────────
+İçerik adresli, kalıcı LLM yanıt önbelleği.
+
+Anahtar  : sha256(messages + model + temperature)
+Depolama : SQLite (tek dosya), yalnızca başarılı yanıtlar
+Tahliye  : LLM_CACHE_TTL saniyeden eski kayıtlar silinir
+
+Ortam Değişkenleri
+------------------
+LLM_CACHE       : "0" → önbellek kapalı
+LLM_CACHE_DIR   : önbellek klasörü (varsayılan: cache)
+LLM_CACHE_TTL   : saniye (varsayılan: 30 gün); 0 → süresiz
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+DEFAULT_TTL = 30 * 24 * 3600
+
+
+def request_key(messages: List[Dict[str, str]], model: str, temperature: float) -> str:
+    payload = json.dumps({"messages": messages, "model": model, "temperature": temperature},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL,"
+            " response TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.evict_expired()
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        root = os.getenv("LLM_CACHE_DIR", "cache")
+        ttl = float(os.getenv("LLM_CACHE_TTL", str(DEFAULT_TTL)))
+        return cls(os.path.join(root, "llm_responses.sqlite"), ttl)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl > 0 and row[1] < time.time() - self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, model, response, time.time()),
+            )
+            self._conn.commit()
+
+    def evict_expired(self) -> int:
+        if self.ttl <= 0:
+            return 0
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE created < ?",
+                                     (time.time() - self.ttl,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+_cache: LLMCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache | None:
+    """Süreç genelinde tek önbellek; LLM_CACHE=0 ise None."""
+    global _cache
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache.from_env()
+        return _cache
@@ -0,0 +1,211 @@
+"""
+model_registry.py
+─────────────────
+Süreç genelinde paylaşılan embedding model kayıt defteri.
+
+Her (model adı, cihaz) çifti süreç başına **bir kez** yüklenir; pipeline
+modülleri modeli doğrudan `SentenceTransformer(...)` ile değil,
+`get_model()` üzerinden alır.
+
+• Thread-safe: aynı model için eşzamanlı istekler tek bir yüklemeyi bekler.
+• Warm-up: FastAPI açılışında `registry.warm_up()` çağrılabilir.
+• Boşaltma: TTL (son kullanımdan beri geçen süre) veya bellek bütçesi
+  aşıldığında en eski kullanılan modeller bellekten atılır.
+
+Ortam Değişkenleri
+------------------
+EMBED_MODEL         : varsayılan model adı
+EMBED_DEVICE        : "cpu", "cuda", "mps" … (boşsa otomatik)
+EMBED_MODEL_TTL     : saniye; 0 → süresiz tut
+EMBED_MODEL_MAX_MB  : yüklü modellerin toplam bütçesi; 0 → sınırsız
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from ..core import tracing
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+_Key = Tuple[str, str]   # (model_name, device)
+
+
+@dataclass
+class _Entry:
+    model: Any
+    size_bytes: int
+    last_used: float
+
+
+def _model_size(model: Any) -> int:
+    """Parametrelerin kapladığı yaklaşık bellek (byte)."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return 0
+
+
+def _default_loader(model_name: str, device: str | None) -> Any:
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+class ModelRegistry:
+    """(model adı, cihaz) → yüklü model eşlemesi."""
+
+    def __init__(self, *, ttl: float = 0.0, max_bytes: int = 0, loader=_default_loader):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._loader = loader
+        self._entries: Dict[_Key, _Entry] = {}
+        self._load_locks: Dict[_Key, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._janitor: threading.Thread | None = None
+
+    @classmethod
+    def from_env(cls) -> "ModelRegistry":
+        return cls(
+            ttl=float(os.getenv("EMBED_MODEL_TTL", "0") or 0),
+            max_bytes=int(float(os.getenv("EMBED_MODEL_MAX_MB", "0") or 0) * 1024 * 1024),
+        )
+
+    def configure(self, *, ttl: float | None = None, max_mb: float | None = None) -> None:
+        if ttl is not None:
+            self.ttl = ttl
+        if max_mb is not None:
+            self.max_bytes = int(max_mb * 1024 * 1024)
+
+    # ------------------------------------------------------------------
+    #  Anahtar çözümleme
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _key(model_name: str | None, device: str | None) -> _Key:
+        model_name = model_name or os.getenv("EMBED_MODEL", DEFAULT_MODEL)
+        device = device or os.getenv("EMBED_DEVICE") or ""
+        return model_name, device
+
+    # ------------------------------------------------------------------
+    #  Ana API
+    # ------------------------------------------------------------------
+    def get(self, model_name: str | None = None, device: str | None = None) -> Any:
+        """Modeli döndürür; yüklü değilse bir kez yükler."""
+        key = self._key(model_name, device)
+        self.unload_idle()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                return entry.model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Aynı model için ikinci bir thread burada ilk yüklemeyi bekler
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    return entry.model
+
+            print(f"🧠 Model yükleniyor: {key[0]} ({key[1] or 'auto'})")
+            with tracing.span("model.load", model=key[0], device=key[1] or "auto"):
+                model = self._loader(key[0], key[1] or None)
+
+            with self._lock:
+                self._entries[key] = _Entry(model, _model_size(model), time.monotonic())
+                self._enforce_budget(keep=key)
+            return model
+
+    def register(self, model_name: str, model: Any, device: str | None = None) -> None:
+        """Hazır bir model nesnesini (ör. sahte/benchmark embedder) kaydeder."""
+        key = self._key(model_name, device)
+        with self._lock:
+            self._entries[key] = _Entry(model, _model_size(model), time.monotonic())
+
+    def warm_up(self, model_names: List[str] | None = None, device: str | None = None) -> None:
+        """Açılışta modelleri önceden yükler (ilk isteğin gecikmesini önler)."""
+        for name in model_names or [None]:
+            self.get(name, device)
+
+    def unload(self, model_name: str | None = None, device: str | None = None) -> bool:
+        key = self._key(model_name, device)
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+        if removed:
+            gc.collect()
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        gc.collect()
+
+    def loaded(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"model": k[0], "device": k[1] or "auto",
+                 "size_mb": round(e.size_bytes / 1024 / 1024, 1),
+                 "idle_s": round(now - e.last_used, 1)}
+                for k, e in self._entries.items()
+            ]
+
+    # ------------------------------------------------------------------
+    #  Boşaltma politikaları
+    # ------------------------------------------------------------------
+    def unload_idle(self) -> List[_Key]:
+        """TTL'i dolmuş modelleri bellekten atar."""
+        if self.ttl <= 0:
+            return []
+        limit = time.monotonic() - self.ttl
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.last_used < limit]
+            for k in stale:
+                del self._entries[k]
+        if stale:
+            for name, dev in stale:
+                print(f"🧹 Boşta kalan model bırakıldı: {name} ({dev or 'auto'})")
+            gc.collect()
+        return stale
+
+    def _enforce_budget(self, keep: _Key) -> None:
+        """Bellek bütçesi aşılırsa LRU sırasıyla model atar (self._lock altında)."""
+        if self.max_bytes <= 0:
+            return
+        total = sum(e.size_bytes for e in self._entries.values())
+        for k, e in sorted(self._entries.items(), key=lambda kv: kv[1].last_used):
+            if total <= self.max_bytes:
+                break
+            if k == keep:
+                continue
+            del self._entries[k]
+            total -= e.size_bytes
+            print(f"🧹 Bellek bütçesi için model bırakıldı: {k[0]} ({k[1] or 'auto'})")
+
+    def start_janitor(self, interval: float = 60.0) -> None:
+        """TTL taramasını arka planda periyodik olarak çalıştırır."""
+        if self.ttl <= 0 or self._janitor is not None:
+            return
+
+        def _loop() -> None:
+            while True:
+                time.sleep(interval)
+                self.unload_idle()
+
+        self._janitor = threading.Thread(target=_loop, name="model-janitor", daemon=True)
+        self._janitor.start()
+
+
+# Süreç genelinde tek örnek
+registry = ModelRegistry.from_env()
+
+
+def get_model(model_name: str | None = None, device: str | None = None) -> Any:
+    """Pipeline modüllerinin kullandığı kısayol."""
+    return registry.get(model_name, device)
@@ -0,0 +1,141 @@
+"""
+passage_merger.py
+─────────────────
+Farklı dataset'lerden gelen, birbiriyle örtüşen chunk'ları prompt'tan önce
+tekilleştirir.
+
+CHUNK_CONFIG pencereleri (genel 5/3, ozel 2/1, mevzuat 6/4) çok örtüşür;
+aynı cümle bir prompt'a birkaç kez girebiliyordu. Üç kategori de
+ChunkStore'daki ortak cümle tablosuna başvurduğundan her chunk bir
+[sentence_start, sentence_end) aralığıdır:
+
+• Örtüşen aralıklar – dataset fark etmeksizin – tek pasajda birleşir ve
+  pasaj metni cümle tablosundan yeniden kurulur; hiçbir cümle iki kez
+  yazılmaz. Yalnızca bitişik aralıklar ayrı kalır.
+• Pasaj, onu oluşturan chunk'lardan girdide ilk gelenin dataset'ine ve
+  sırasına yerleşir. Girdi aynıysa pasaj sırası ve dolayısıyla atıf
+  numaraları da aynıdır; `sources` hangi chunk'ların hangi pasaja
+  gittiğini saklar (cevaptaki [n] → dataset/sıra/sayfa).
+• Cümle aralığı olmayan chunk'lar (eski workspace'ler) olduğu gibi kalır;
+  yalnızca birebir aynı metinler tekilleştirilir.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence
+
+SpanText = Callable[[int, int], str]
+
+
+@dataclass
+class Passage:
+    dataset: str
+    text: str
+    sentence_start: int | None = None
+    sentence_end: int | None = None
+    page_start: int | None = None
+    page_end: int | None = None
+    sources: List[Dict] = field(default_factory=list)
+    order: int = 0                      # ilk kaynak chunk'ın girdideki sırası
+
+    def as_dict(self, index: int) -> Dict:
+        return {
+            "index": index,
+            "dataset": self.dataset,
+            "sentence_start": self.sentence_start,
+            "sentence_end": self.sentence_end,
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "sources": self.sources,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    """Kaba token tahmini (~4 karakter/token)."""
+    return (len(text) + 3) // 4
+
+
+def _source(chunk: dict) -> Dict:
+    keys = ("dataset", "rank", "chunk_index", "score")
+    return {k: chunk[k] for k in keys if chunk.get(k) is not None}
+
+
+def has_span(chunk: dict) -> bool:
+    return isinstance(chunk.get("sentence_start"), int) and isinstance(chunk.get("sentence_end"), int)
+
+
+def text_key(text: str) -> str:
+    """Aralıksız chunk'ların tekilleştirme anahtarı (boşluk/büyük harf farkı yok sayılır)."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _pages(members: Sequence[dict]):
+    starts = [c["page_start"] for c in members if c.get("page_start") is not None]
+    ends = [c["page_end"] for c in members if c.get("page_end") is not None]
+    return (min(starts) if starts else None), (max(ends) if ends else None)
+
+
+def merge_passages(chunks: Sequence[dict], span_text: SpanText | None = None) -> List[Passage]:
+    """
+    chunks    : `text`, `dataset` ve (varsa) `sentence_start/_end`, `rank`,
+                `chunk_index`, `page_start/_end` alanlı chunk listesi;
+                sıra, prompt'taki sıradır
+    span_text : (start, end) → cümle metni; None ise aralıklar birleştirilmez
+    """
+    passages: List[Passage] = []
+
+    # ---- cümle aralığı olanlar: örtüşenleri birleştir --------------------
+    spanned = [(i, c) for i, c in enumerate(chunks) if span_text is not None and has_span(c)]
+    spanned.sort(key=lambda ic: (ic[1]["sentence_start"], ic[1]["sentence_end"]))
+
+    groups: List[List[tuple]] = []
+    group_end = -1
+    for i, c in spanned:
+        if groups and c["sentence_start"] < group_end:
+            groups[-1].append((i, c))
+            group_end = max(group_end, c["sentence_end"])
+        else:
+            groups.append([(i, c)])
+            group_end = c["sentence_end"]
+
+    for group in groups:
+        group.sort(key=lambda ic: ic[0])
+        members = [c for _, c in group]
+        start = min(c["sentence_start"] for c in members)
+        end = max(c["sentence_end"] for c in members)
+        text = members[0]["text"] if len(members) == 1 else span_text(start, end)
+        page_start, page_end = _pages(members)
+        passages.append(Passage(
+            dataset=members[0]["dataset"], text=text,
+            sentence_start=start, sentence_end=end,
+            page_start=page_start, page_end=page_end,
+            sources=[_source(c) for c in members], order=group[0][0],
+        ))
+
+    # ---- aralıksız chunk'lar: yalnızca birebir tekrarları ele -------------
+    seen: Dict[str, Passage] = {}
+    for i, c in enumerate(chunks):
+        if span_text is not None and has_span(c):
+            continue
+        key = text_key(c["text"])
+        if key in seen:
+            seen[key].sources.append(_source(c))
+            continue
+        page_start, page_end = _pages([c])
+        seen[key] = Passage(dataset=c["dataset"], text=c["text"],
+                            page_start=page_start, page_end=page_end,
+                            sources=[_source(c)], order=i)
+        passages.append(seen[key])
+
+    passages.sort(key=lambda p: p.order)
+    return passages
+
+
+def token_savings(chunks: Sequence[dict], passages: Sequence[Passage],
+                  count: Callable[[str], int] = estimate_tokens) -> Dict[str, int]:
+    before = sum(count(c["text"]) for c in chunks)
+    after = sum(count(p.text) for p in passages)
+    return {"chunks": len(chunks), "passages": len(passages),
+            "tokens_before": before, "tokens_after": after, "tokens_saved": before - after}
@@ -1,7 +1,63 @@
 import os
+import json
+import multiprocessing
+import threading
 import pdfplumber
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def pdf_to_txt(pdf_path: str, workspace_dir: str) -> str:
+# Her işçiye verilen sayfa aralığı uzunluğu
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+# İşçi sayısı başına süreç boyunca tek havuz. "spawn": havuz pipeline
+# thread'lerinden açılır; torch/FAISS/embedding thread'leri çalışan bir
+# süreci fork etmek çocuklarda kilitlenmeye yol açabilir. Spawn'ın açılış
+# maliyeti havuz yeniden kullanıldığı için bir kez ödenir. Betiklerden
+# çağırırken `if __name__ == "__main__":` koruması gerekir (spawn ana
+# modülü yeniden içe aktarır).
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _default_workers() -> int:
+    env = int(os.getenv("PDF_WORKERS", "0") or 0)
+    return env if env > 0 else min(4, os.cpu_count() or 1)
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+
+def _discard_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    """Çöken (BrokenProcessPool) havuzu bırakır; sonraki çağrı yenisini açar."""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def _extract_range(pdf_path: str, start: int, end: int) -> list[str]:
+    """[start, end) aralığındaki sayfaların metnini döndürür (0 tabanlı)."""
+    with pdfplumber.open(pdf_path, pages=list(range(start + 1, end + 1))) as pdf:
+        return [p.extract_text() or "" for p in pdf.pages]
+
+
+def pdf_to_txt(pdf_path: str, workspace_dir: str,
+               workers: int | None = None,
+               pages_per_task: int | None = None) -> str:
     """
     Parameters
     ----------
@@ -9,11 +65,19 @@ def pdf_to_txt(pdf_path: str, workspace_dir: str) -> str:
         Kullanıcının yüklediği PDF dosyasının tam yolu
     workspace_dir : str
         workspace/rapor_adi klasörünün tam yolu (ör: "workspace/rapor2023")
+    workers : int | None
+        Paralel süreç sayısı (varsayılan: PDF_WORKERS ya da en fazla 4)
+    pages_per_task : int | None
+        Bir işçiye tek seferde verilen sayfa sayısı (varsayılan: PDF_PAGES_PER_TASK)
 
     Returns
     -------
     str
         Üretilen .txt dosyasının tam yolu
+
+    Sayfa sınırları ``<ad>.pages.json`` dosyasına
+    ``[{"page": 1, "start": 0, "end": 1234}, …]`` biçiminde (karakter
+    ofseti) yazılır.
     """
     if not os.path.isfile(pdf_path):
         raise FileNotFoundError(f"PDF bulunamadı: {pdf_path}")
@@ -21,17 +85,55 @@ def pdf_to_txt(pdf_path: str, workspace_dir: str) -> str:
     out_dir = os.path.join(workspace_dir, "raw_txt")
     os.makedirs(out_dir, exist_ok=True)
 
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    txt_path  = os.path.join(out_dir, base_name + ".txt")
+    base_name  = os.path.splitext(os.path.basename(pdf_path))[0]
+    txt_path   = os.path.join(out_dir, base_name + ".txt")
+    pages_path = os.path.join(out_dir, base_name + ".pages.json")
 
-    print(f"📰 PDF okunuyor → {os.path.basename(pdf_path)}")
+    workers = workers or _default_workers()
+    step    = max(1, pages_per_task or PAGES_PER_TASK)
 
     with pdfplumber.open(pdf_path) as pdf:
-        pages = [p.extract_text() or "" for p in pdf.pages]
-        full_text = "\n".join(pages)
+        n_pages = len(pdf.pages)
+
+    ranges = [(s, min(s + step, n_pages)) for s in range(0, n_pages, step)]
+    workers = max(1, min(workers, len(ranges)))
+
+    print(f"📰 PDF okunuyor → {os.path.basename(pdf_path)} "
+          f"({n_pages} sayfa, {workers} işçi)")
+
+    pages_meta: list[dict] = []
+    offset = 0
+
+    def _write_pages(f, texts: list[str]) -> None:
+        nonlocal offset
+        for text in texts:
+            if pages_meta:                      # sayfalar "\n" ile birleşir
+                f.write("\n")
+                offset += 1
+            f.write(text)
+            pages_meta.append({"page": len(pages_meta) + 1,
+                               "start": offset, "end": offset + len(text)})
+            offset += len(text)
 
     with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(full_text)
+        if workers == 1:
+            for s, e in ranges:
+                _write_pages(f, _extract_range(pdf_path, s, e))
+        else:
+            pool = _pool(workers)
+            try:
+                # map sonuçları sayfa sırasıyla döndürür → dosyaya akış halinde yazılır
+                for texts in pool.map(_extract_range,
+                                      [pdf_path] * len(ranges),
+                                      [s for s, _ in ranges],
+                                      [e for _, e in ranges]):
+                    _write_pages(f, texts)
+            except BrokenProcessPool:
+                _discard_pool(workers, pool)
+                raise
+
+    with open(pages_path, "w", encoding="utf-8") as f:
+        json.dump(pages_meta, f)
 
     print(f"✅ TXT yazıldı → {txt_path}")
     return txt_path
@@ -42,4 +144,4 @@ if __name__ == "__main__":
     report_name = "rapor2023"
     pdf_file    = f"user_uploads/{report_name}.pdf"
     workspace   = f"workspace/{report_name}"
-    pdf_to_txt(pdf_file, workspace)
\ No newline at end of file
+    pdf_to_txt(pdf_file, workspace)
@@ -0,0 +1,198 @@
+"""
+prompt_packer.py
+────────────────
+Prompt'a girecek chunk'ları FAISS skoruna göre, token bütçesini aşmadan
+seçer.
+
+• Token sayımı yerel tokenizer ile yapılır (tiktoken, modelin kodlaması).
+  tiktoken yoksa ya da kodlama dosyası yüklenemezse ~4 karakter/token
+  tahminine düşülür; hangisinin kullanıldığı raporlanır.
+• Bütçe = min(PROMPT_TOKEN_BUDGET, modelin bağlamı − PROMPT_RESERVE_TOKENS).
+  Ayrılan pay modelin cevabı içindir.
+• Paketleme: chunk'lar dataset'ten bağımsız, küresel skora göre sıralanır
+  (iç çarpım / kosinüs; üç dataset aynı modelle gömüldüğünden
+  karşılaştırılabilir). Her chunk denenir; örtüşenler `passage_merger` ile
+  birleştirilmiş hâliyle prompt bütçeye sığıyorsa alınır, sığmıyorsa
+  düşürülür ve sonraki (daha kısa olabilecek) chunk denenir.
+• Maliyet artımlıdır: sabit kısım (boş prompt) bir kez sayılır, her aday
+  için yalnızca dokunduğu pasaj yeniden birleştirilip sayılır (token
+  farkı). Tam prompt en sonda bir kez sayılır; tahmin aşılmışsa en düşük
+  skorlu chunk'lar sığana dek çıkarılır.
+
+Ortam Değişkenleri
+------------------
+LLM_MODEL             : bütçe, tokenizer ve `sender`'ın istek attığı model
+                        (varsayılan gpt-4o-mini)
+PROMPT_TOKEN_BUDGET   : prompt başına üst sınır (varsayılan 8000; 0 → yalnızca bağlam)
+PROMPT_RESERVE_TOKENS : cevaba ayrılan pay (varsayılan 2048)
+
+Model tek yerden okunur: API sürecinde açılışta Settings'ten (`.env` dahil)
+`configure` ile verilir, `current_model()` hem paketleme hem gönderim için
+kullanılır; ortam değişkeni yalnızca CLI / betik varsayılanıdır.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .passage_merger import (Passage, SpanText, estimate_tokens, has_span,
+                             merge_passages, text_key)
+
+try:
+    import tiktoken  # type: ignore
+except ModuleNotFoundError:             # opsiyonel – yoksa karakter tahmini
+    tiktoken = None
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini") or "gpt-4o-mini"
+_model = LLM_MODEL
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000") or 0)
+PROMPT_RESERVE_TOKENS = int(os.getenv("PROMPT_RESERVE_TOKENS", "2048") or 0)
+
+# Bağlam penceresi (token); bilinmeyen modeller için DEFAULT_CONTEXT
+MODEL_CONTEXT = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4.1-nano": 1_047_576,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+}
+DEFAULT_CONTEXT = 16_385
+
+
+def configure(*, model: str | None = None) -> None:
+    """Süreç geneli LLM modelini ayarlar (boş değer → değişmez)."""
+    global _model
+    if model:
+        _model = model
+
+
+def current_model() -> str:
+    return _model
+
+
+# ------------------------------------------------------------------
+#  Token sayımı
+# ------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as exc:            # kodlama dosyası indirilemedi (çevrimdışı) vb.
+        print(f"⚠️  tiktoken kodlaması yüklenemedi ({exc}) → karakter tahmini")
+        return None
+
+
+def tokenizer_name(model: str | None = None) -> str:
+    enc = _encoding(model or _model)
+    return f"tiktoken:{enc.name}" if enc is not None else "chars/4"
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    enc = _encoding(model or _model)
+    if enc is None:
+        return estimate_tokens(text)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def token_budget(model: str | None = None) -> int:
+    context = MODEL_CONTEXT.get(model or _model, DEFAULT_CONTEXT)
+    available = max(0, context - PROMPT_RESERVE_TOKENS)
+    return min(PROMPT_TOKEN_BUDGET, available) if PROMPT_TOKEN_BUDGET > 0 else available
+
+
+def config(model: str | None = None) -> Dict:
+    """Paketleme sonucunu belirleyen ayarlar (aşama parmak izi için)."""
+    model = model or _model
+    return {"model": model, "budget": token_budget(model), "tokenizer": tokenizer_name(model)}
+
+
+# ------------------------------------------------------------------
+#  Paketleme
+# ------------------------------------------------------------------
+def _score(chunk: dict) -> float:
+    score = chunk.get("score")
+    return float(score) if score is not None else float("-inf")
+
+
+def pack(chunks: Sequence[dict], span_text: SpanText | None,
+         render: Callable[[List[Passage]], str], *,
+         passage_text: Callable[[Passage], str] | None = None,
+         model: str | None = None, budget: int | None = None
+         ) -> Tuple[List[Passage], List[dict], List[dict], int]:
+    """
+    chunks       : aday chunk'lar (`score` alanı yoksa en sona, girdi sırasıyla)
+    render       : pasaj listesi → tam prompt metni (bütçe tüm prompt için geçerli)
+    passage_text : bir pasajın prompt'a eklediği metin (numara + metin);
+                   verilmezse ``render([p])`` − ``render([])``
+
+    Dönen: (pasajlar – skor sırasıyla, alınan chunk'lar, düşürülenler,
+            prompt token sayısı)
+    """
+    model = model or _model
+    budget = token_budget(model) if budget is None else budget
+    ranked = sorted(chunks, key=_score, reverse=True)      # sorted kararlıdır
+
+    header = count_tokens(render([]), model)
+    if header > budget:
+        print(f"⚠️  Boş prompt bile bütçeyi aşıyor ({header} > {budget} token)")
+
+    def cost(p: Passage) -> int:
+        if passage_text is not None:
+            return count_tokens(passage_text(p), model)
+        return count_tokens(render([p]), model) - header
+
+    # spans: birleşik cümle aralıkları [start, end, üyeler, token]; örtüşen
+    # aralıklar her zaman tek pasajdır (merge_passages ile aynı kural)
+    spans: List[list] = []
+    seen: set = set()                                   # aralıksız metin anahtarları
+    selected: List[dict] = []
+    dropped: List[dict] = []
+    used = header
+
+    for chunk in ranked:
+        if span_text is not None and has_span(chunk):
+            start, end = chunk["sentence_start"], chunk["sentence_end"]
+            touched = [s for s in spans if s[0] < end and start < s[1]]
+            members = [c for s in touched for c in s[2]] + [chunk]
+            merged = merge_passages(members, span_text)[0]
+            tokens = cost(merged)
+            delta = tokens - sum(s[3] for s in touched)
+            if used + delta > budget:
+                dropped.append(chunk)
+                continue
+            spans = [s for s in spans if not any(s is t for t in touched)]
+            spans.append([merged.sentence_start, merged.sentence_end, members, tokens])
+        else:
+            key = text_key(chunk["text"])
+            delta = 0
+            if key not in seen:                         # birebir tekrar → yalnızca kaynak eklenir
+                delta = cost(Passage(dataset=chunk["dataset"], text=chunk["text"]))
+                if used + delta > budget:
+                    dropped.append(chunk)
+                    continue
+                seen.add(key)
+        selected.append(chunk)
+        used += delta
+
+    # tek tam sayım: ayraçlar / bölüm başlıkları tahmini aştıysa en düşük
+    # skorlu chunk'ları çıkar
+    passages = merge_passages(selected, span_text)
+    used = count_tokens(render(passages), model)
+    while used > budget and selected:
+        dropped.append(selected.pop())
+        passages = merge_passages(selected, span_text)
+        used = count_tokens(render(passages), model)
+
+    position = {id(c): i for i, c in enumerate(ranked)}
+    dropped.sort(key=lambda c: position[id(c)])
+    return passages, selected, dropped, used
@@ -2,46 +2,60 @@
 Belirtilen workspace’teki FAISS indekslerinde arama yapar ve her soru için
 en alakalı top-k chunk’ı üretir.  ask_all() fonksiyonu diğer script’lerden
 çağrılabilir; istersek CLI ile de hâlâ çalıştırabiliriz.
+
+İndeksler ve chunk deposu `serving` üzerinden (mmap, süreç içi önbellek)
+açılır; yalnızca isabet eden chunk'ların cümleleri çözülür.
 """
 
 from __future__ import annotations
-import os, json, faiss, numpy as np
+import os, json, numpy as np
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
 
-# ---------------------------------------------
-#  Ortak model‐yükleyici (.env → EMBED_MODEL)
-# ---------------------------------------------
-def _load_model(model_name: str | None = None) -> SentenceTransformer:
-    if model_name is None:
-        model_name = os.getenv("EMBED_MODEL",
-                               "sentence-transformers/all-MiniLM-L6-v2")
-    return SentenceTransformer(model_name)
+from ..core import metrics, tracing
+from .model_registry import get_model   # süreç genelinde paylaşılan model
+from .embedding_cache import encode_cached
+from .index_factory import search_params
+from .serving import get_index, get_store
 
 
 DATASETS = {
-    "genel":   {"index": "faiss_genel.index",   "meta": "metadata_genel.json"},
-    "mevzuat": {"index": "faiss_mevzuat.index", "meta": "metadata_mevzuat.json"},
-    "ozel":    {"index": "faiss_ozel.index",    "meta": "metadata_ozel.json"},
+    "genel":   {"index": "faiss_genel.index"},
+    "mevzuat": {"index": "faiss_mevzuat.index"},
+    "ozel":    {"index": "faiss_ozel.index"},
 }
 
 
+# Chunk'ın temiz metindeki yeri – genişletme ve kaynak gösterme için
+_LOCATION_KEYS = ("chunk_index", "sentence_start", "sentence_end",
+                  "char_start", "char_end", "page_start", "page_end")
+
+
 # ------------------------------------------------------------------
 #  Ana fonksiyon – pipeline içinden çağırmak için
 # ------------------------------------------------------------------
 def ask_all(workspace_dir: str,
             top_k: int = 10,
-            model_name: str | None = None) -> None:
+            model_name: str | None = None,
+            batch_size: int = 64,
+            nprobe: int | None = None,
+            ef_search: int | None = None) -> None:
     """
     workspace_dir :  workspace/raporXXXX
     top_k         :  her soru için döndürülecek chunk sayısı
     model_name    :  Sentence-Transformers model adı (opsiyonel)
+    batch_size    :  soru embedding'i için encode batch boyutu
+    nprobe        :  IVF indekslerde aranacak hücre sayısı (None → indeksteki değer)
+    ef_search     :  HNSW arama derinliği (None → indeksteki değer)
+
+    Tüm sorular tek seferde bir matris olarak embed edilir; her dataset
+    indeksi bu matrisle **bir kez** aranır.
     """
     faiss_dir = os.path.join(workspace_dir, "faiss")
     topk_dir  = os.path.join(workspace_dir, "top10")
     os.makedirs(topk_dir, exist_ok=True)
 
-    model = _load_model(model_name)
+    model = get_model(model_name)
+    store = get_store(workspace_dir)
 
     print(f"\n🔍  FAISS indeksleri arama için yükleniyor …")
 
@@ -50,37 +64,49 @@ def ask_all(workspace_dir: str,
     with open(soru_path, encoding="utf-8") as f:
         sorular = json.load(f)
 
-    def search_faiss(query: str, faiss_index, k: int):
-        emb = model.encode([query], convert_to_numpy=True,
-                           normalize_embeddings=True)
-        _, idxs = faiss_index.search(emb, k)
-        return idxs[0]
+    if not sorular:
+        print("⚠️  Soru bulunamadı, arama atlanıyor.")
+        return
+
+    qids   = [soru.get("id", i) for i, soru in enumerate(sorular, 1)]
+    qtexts = [soru.get("text") or soru.get("soru") or "" for soru in sorular]
+
+    # 🧠 Tüm sorular tek matris (soru_yordam_embedder'dan önbellekte)
+    with tracing.span("encode_questions", questions=len(qtexts)):
+        query_emb, _ = encode_cached(model, model_name, qtexts, batch_size=batch_size)
+    query_emb = np.ascontiguousarray(query_emb, dtype="float32")
 
-    # 🔄 dataset bazlı döngü
+    # 🔄 dataset bazlı döngü – dataset başına tek search çağrısı
     for ds, files in DATASETS.items():
         print(f"\n🔍  DATASET  →  {ds.upper()}")
         out_dir = os.path.join(topk_dir, ds)
         os.makedirs(out_dir, exist_ok=True)
 
-        index   = faiss.read_index(os.path.join(faiss_dir, files["index"]))
-        with open(os.path.join(faiss_dir, files["meta"]), encoding="utf-8") as f:
-            metadata = json.load(f)
+        index   = get_index(os.path.join(faiss_dir, files["index"]))
+        params  = search_params(index, nprobe=nprobe, ef_search=ef_search)
 
-        for i, soru in enumerate(tqdm(sorular, desc=f"{ds} sorular"), 1):
-            qid = soru.get("id", i)
-            qtext = soru.get("text") or soru.get("soru") or ""
-            top_idxs   = search_faiss(qtext, index, top_k)
+        with metrics.FAISS_SEARCH_SECONDS.time(index=ds), \
+             tracing.span("faiss.search", dataset=ds, queries=len(qids), k=top_k,
+                          vectors=index.ntotal):
+            all_scores, all_idxs = index.search(query_emb, top_k, params=params)
 
+        for qid, top_scores, top_idxs in zip(tqdm(qids, desc=f"{ds} sorular"), all_scores, all_idxs):
             results = []
-            for rank, idx in enumerate(top_idxs, 1):
-                entry = metadata[idx]
+            for rank, (score, idx) in enumerate(zip(top_scores, top_idxs), 1):
+                if idx < 0:                       # indekste k'dan az chunk var
+                    break
+                entry = store.chunk(ds, int(idx))
                 results.append({
                     "rank":           rank,
                     "index":          int(idx),
+                    # kosinüs benzerliği – dataset'ler arası karşılaştırılabilir
+                    "score":          float(score),
                     "chunk_text":     entry["chunk_text"],
                     "source_file":    entry.get("source_file"),
                     "char_len":       int(entry.get("char_len", 0)),
                     "sentence_count": int(entry.get("sentence_count", 0)),
+                    # konum bilgisi (eski workspace'lerde yok)
+                    **{k: entry[k] for k in _LOCATION_KEYS if k in entry},
                 })
 
             # ✅ Kaydet
@@ -88,7 +114,7 @@ def ask_all(workspace_dir: str,
                       "w", encoding="utf-8") as jf:
                 json.dump(results, jf, ensure_ascii=False, indent=2)
 
-            if qid == 1:                          # küçük örnek çıktı
+            if qid == 1 and results:              # küçük örnek çıktı
                 print(f"   • soru{qid}: {results[0]['chunk_text'][:100]}…")
 
     print("\n✅  Tüm sorular için top-k sonuçlar kaydedildi.")
@@ -104,5 +130,8 @@ if __name__ == "__main__":
     ap.add_argument("--k", type=int, default=10, help="top-k")
     ap.add_argument("--model", default=None,
                     help="Sentence-Transformers model adı")
+    ap.add_argument("--nprobe", type=int, default=None, help="IVF nprobe")
+    ap.add_argument("--ef-search", type=int, default=None, help="HNSW efSearch")
     args = ap.parse_args()
-    ask_all(args.workspace, top_k=args.k, model_name=args.model)
\ No newline at end of file
+    ask_all(args.workspace, top_k=args.k, model_name=args.model,
+            nprobe=args.nprobe, ef_search=args.ef_search)
\ No newline at end of file
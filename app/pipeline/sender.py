@@ -7,11 +7,24 @@ API (`send_answers`) sunar ve ayrıca CLI olarak da çalışır.
 
 Görev
 -----
-1. ``<workspace>/PROMPTS/prompt_<id>.json`` dosyalarını okur.
-2. Her prompt’u OpenAI ChatCompletion’a yollar.
-3. Yanıtı ``<workspace>/ANSWERS/answer_<id>.json`` biçiminde kaydeder.
-
-JSON Şeması → `{soru, yordam, cevap}`
+1. ``<workspace>/PROMPTS/prompts.jsonl`` dosyasını (eski workspace'lerde
+   ``prompt_<id>.json`` dosyalarını) okur.
+2. Prompt’ları tek bir asyncio istemcisiyle, en fazla ``concurrency``
+   tanesi aynı anda olacak şekilde OpenAI ChatCompletion’a yollar.
+   429/5xx ve bağlantı hatalarında jitter'lı üstel geri çekilme ile
+   yeniden dener.
+3. Her yanıtı geldiği anda ``<workspace>/ANSWERS/answer_<id>.json``
+   biçiminde kaydeder.
+
+Aynı (messages, model, temperature) üçlüsü daha önce başarıyla
+yanıtlandıysa cevap kalıcı önbellekten (`llm_cache`) gelir; istek atılmaz.
+``resume=True`` ile mevcut başarılı cevabı aynı prompt'a ait olan sorular
+hiç işlenmez, yalnızca eksik/hatalı olanlar yeniden denenir; artık prompt'u
+olmayan eski cevap dosyaları silinir. `pipeline_runner` cevap aşamasını
+her zaman bu kipte çalıştırır (``force`` hariç).
+
+JSON Şeması → `{soru, yordam, cevap, status, prompt_key, error}`
+(``status="error"`` olduğunda ``cevap`` boştur, hata metni ``error`` alanındadır.)
 
 Ana Fonksiyon – `send_answers`
 ------------------------------
@@ -22,19 +35,27 @@ send_answers()  # .env'deki WORKSPACE_ROOT & OPENAI_API_KEY kullanılır
 Parametreler:
 * **workspace**   : `Path | str | None` – Varsa belirtilen yol; yoksa
   `.env` içindeki `WORKSPACE_ROOT`.
-* **model**       : OpenAI modeli (default `'gpt-4o-mini'`).
+* **model**       : OpenAI modeli (default `LLM_MODEL` – prompt bütçesiyle aynı
+  ayar, `prompt_packer.current_model()`).
 * **temperature** : Örnekleme sıcaklığı (default `0.0`).
-* **delay**       : Her isteğin ardından saniye cinsinden bekleme (default `0.3`).
+* **concurrency** : Aynı anda açık istek sayısı (default `LLM_CONCURRENCY` / 8).
+* **timeout**     : İstek başına zaman aşımı, saniye (default `LLM_TIMEOUT` / 60).
+* **max_retries** : 429/5xx/bağlantı hatasında yeniden deneme (default `LLM_MAX_RETRIES` / 5).
+* **delay**       : Her isteğin ardından o slotta beklenecek süre (default `0`).
+* **resume**      : Başarılı cevabı olan soruları atla (default `False`).
+* **on_answer**   : Her cevap yazıldığında `(id, cevap_json)` ile çağrılır.
 * **api_key**     : API anahtarı (CLI parametresi > fonksiyon argümanı >
   environment > `.env`).
 
-Fonksiyon, her başarılı isteğin özetini içeren bir liste döndürür.
+Fonksiyon, soru sırasıyla her isteğin özetini içeren bir liste döndürür;
+hata alan sorular ``status="error"`` ve ``error`` alanıyla raporlanır.
 
 CLI Kullanımı
 -------------
 ```bash
 python sender.py                 # .env'deki WORKSPACE_ROOT kullanılır
 python sender.py ./workspace     # yolu elle belirtin
+python sender.py ./workspace --resume   # yarıda kalan çalıştırmayı sürdür
 ```
 Tüm CLI argümanları `send_answers` fonksiyonuna aynen aktarılır.
 
@@ -46,12 +67,14 @@ Gerekli Paketler
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import os
+import random
 import sys
 import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List
 
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -63,107 +86,276 @@ try:
 except ModuleNotFoundError:
     raise SystemExit("❌  openai paketi yüklü değil. `pip install openai`.")
 
+from ..core import metrics, tracing
+from .llm_cache import get_cache, request_key
+from .prompt_packer import current_model
+
 # ---------------------------------------------------------------------------
 # Ortam değişkenlerini (varsa) yükle
 # ---------------------------------------------------------------------------
 
 load_dotenv()  # proje kökündeki .env dosyasını okur
 
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT     = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+BACKOFF_BASE = 1.0    # saniye
+BACKOFF_CAP  = 30.0
+
 # ---------------------------------------------------------------------------
 # Dahili yardımcılar
 # ---------------------------------------------------------------------------
 
-def _send_prompt(prompt_text: str, model: str, temperature: float) -> str:
-    """Tek bir prompt’u OpenAI ChatCompletion’a gönder, cevabı döndür."""
+def _build_messages(prompt_text: str) -> List[Dict[str, str]]:
+    """Prompt metnini SYSTEM/USER bölümlerine ayırır."""
 
     if "USER:" in prompt_text:
         system_part, user_part = prompt_text.split("USER:", 1)
         system_part = system_part.replace("SYSTEM:", "").strip()
         user_part = user_part.strip()
-        messages = [
+        return [
             {"role": "system", "content": system_part},
             {"role": "user",   "content": user_part},
         ]
-    else:
-        messages = [{"role": "user", "content": prompt_text}]
+    return [{"role": "user", "content": prompt_text}]
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, openai.APIConnectionError):      # timeout dahil
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _retry_after(exc: Exception, attempt: int) -> float:
+    """Sunucu Retry-After verdiyse onu, yoksa full-jitter üstel bekleme."""
+    response = getattr(exc, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        if header is not None:
+            return min(float(header), BACKOFF_CAP)
+    except ValueError:
+        pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def _send_prompt(client: "openai.AsyncOpenAI", messages: List[Dict[str, str]], model: str,
+                       temperature: float, timeout: float, max_retries: int) -> str:
+    """Tek bir isteği gönderir; geçici hatalarda yeniden dener."""
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+                metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+                tracing.set_attrs(prompt_tokens=usage.prompt_tokens,
+                                  completion_tokens=usage.completion_tokens)
+            tracing.set_attrs(attempts=attempt + 1)
+            return response.choices[0].message.content.strip()
+        except Exception as exc:
+            if attempt >= max_retries or not _is_retryable(exc):
+                raise
+            await asyncio.sleep(_retry_after(exc, attempt))
+    raise RuntimeError("unreachable")
+
 
-    response = openai.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-    )
-    return response.choices[0].message.content.strip()
+def _previous_answer(path: Path) -> Dict[str, Any] | None:
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _load_prompts(prompt_dir: Path) -> List[Dict[str, Any]]:
+    """prompts.jsonl (toplu çıktı) varsa onu, yoksa prompt_<id>.json dosyalarını okur."""
+    bulk = prompt_dir / "prompts.jsonl"
+    if bulk.is_file():
+        with bulk.open(encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return sorted(records, key=lambda r: int(r["id"]))
+
+    records = []
+    for pfile in sorted(prompt_dir.glob("prompt_*.json"), key=lambda p: int(p.stem.split("_")[1])):
+        with pfile.open(encoding="utf-8") as f:
+            records.append({"id": int(pfile.stem.split("_")[1]), **json.load(f)})
+    return records
+
+
+def _resolve_workspace(workspace: str | Path | None) -> Path:
+    if workspace is None:
+        workspace = os.getenv("WORKSPACE_ROOT")
+        if workspace is None:
+            raise RuntimeError("workspace parametresi verilmedi ve WORKSPACE_ROOT tanımlı değil")
+    ws = Path(workspace).expanduser().resolve()
+    if not ws.exists():
+        raise FileNotFoundError(f"Workspace bulunamadı: {ws}")
+    return ws
 
 # ---------------------------------------------------------------------------
 # Genel API – pipeline'lar burayı kullanacak
 # ---------------------------------------------------------------------------
 
-def send_answers(
+async def send_answers_async(
     workspace: str | Path | None = None,
     *,
-    model: str = "gpt-4o-mini",
+    model: str | None = None,
     temperature: float = 0.0,
-    delay: float = 0.3,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    max_retries: int | None = None,
+    delay: float = 0.0,
     api_key: str | None = None,
+    resume: bool = False,
+    on_answer: Callable[[int, Dict[str, Any]], None] | None = None,
 ) -> List[Dict[str, Any]]:
-    """PROMPTS klasöründeki tüm prompt'ları işler ve ANSWERS'a yazar.
+    """PROMPTS klasöründeki tüm prompt'ları eşzamanlı işler ve ANSWERS'a yazar.
 
-    Dönen liste: `[{"id": 1, "file": Path, "status": "ok"}, …]`
+    Dönen liste (soru sırasıyla):
+    `[{"id": 1, "file": Path, "status": "ok" | "error", "error": str | None,
+       "source": "api" | "cache" | "resume"}, …]`
     """
 
     # API KEY öncelik sırası: arg > env var > .env
-    openai.api_key = api_key or os.getenv("OPENAI_API_KEY")
-    print(f"[DEBUG] Kullanılan API key: {openai.api_key!r}")
-    if not openai.api_key:
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
         raise RuntimeError("OPENAI_API_KEY bulunamadı (arg/env/.env)")
 
-    # workspace belirle
-    if workspace is None:
-        workspace = os.getenv("WORKSPACE_ROOT")
-        if workspace is None:
-            raise RuntimeError("workspace parametresi verilmedi ve WORKSPACE_ROOT tanımlı değil")
-    ws = Path(workspace).expanduser().resolve()
-    if not ws.exists():
-        raise FileNotFoundError(f"Workspace bulunamadı: {ws}")
+    model       = model or current_model()   # prompt'lar bu modelin bütçesine göre paketlendi
+    concurrency = concurrency or LLM_CONCURRENCY
+    timeout     = timeout if timeout is not None else LLM_TIMEOUT
+    max_retries = max_retries if max_retries is not None else LLM_MAX_RETRIES
 
+    ws = _resolve_workspace(workspace)
     prompt_dir = ws / "PROMPTS"
     answer_dir = ws / "ANSWERS"
     answer_dir.mkdir(parents=True, exist_ok=True)
 
-    prompt_files: List[Path] = sorted(
-        prompt_dir.glob("prompt_*.json"),
-        key=lambda p: int(p.stem.split("_")[1])
-    )
-    if not prompt_files:
-        raise RuntimeError("PROMPTS klasöründe dosya yok; önce prompt üretin.")
+    prompts = _load_prompts(prompt_dir)
+    if not prompts:
+        raise RuntimeError("PROMPTS klasöründe prompt yok; önce prompt üretin.")
 
-    results: List[Dict[str, Any]] = []
+    if resume:
+        # önceki soru setinden kalan, artık prompt'u olmayan cevaplar
+        ids = {int(p["id"]) for p in prompts}
+        for stale in answer_dir.glob("answer_*.json"):
+            qid = stale.stem.split("_")[1]
+            if qid.isdigit() and int(qid) not in ids:
+                stale.unlink()
 
-    for pfile in prompt_files:
-        qid = int(pfile.stem.split("_")[1])
-        with pfile.open(encoding="utf-8") as f:
-            pdata = json.load(f)
+    semaphore = asyncio.Semaphore(concurrency)
+    cache = get_cache()
 
-        try:
-            answer_text = _send_prompt(pdata["prompt"], model, temperature)
-            status = "ok"
-        except Exception as exc:
-            answer_text = str(exc)
-            status = "error"
+    # Tek, havuzlu istemci; yeniden denemeleri kendimiz yönetiyoruz
+    client = openai.AsyncOpenAI(api_key=api_key, max_retries=0, timeout=timeout)
+
+    async def _one(pdata: Dict[str, Any]) -> Dict[str, Any]:
+        qid = int(pdata["id"])
+        messages = _build_messages(pdata["prompt"])
+        key = request_key(messages, model, temperature)
+        out_path = answer_dir / f"answer_{qid}.json"
 
+        # resume: aynı prompt'a ait başarılı cevap zaten var
+        if resume:
+            prev = _previous_answer(out_path)
+            if prev and prev.get("status") == "ok" and prev.get("prompt_key") == key:
+                if on_answer is not None:
+                    on_answer(qid, prev)
+                metrics.LLM_REQUESTS.inc(status="resume")
+                return {"id": qid, "file": out_path, "status": "ok", "error": None, "source": "resume"}
+
+        error = None
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            answer_text, status, source = cached, "ok", "cache"
+            metrics.LLM_REQUESTS.inc(status="cache")
+        else:
+            source = "api"
+            queued = time.perf_counter()
+            async with semaphore:
+                t0 = time.perf_counter()
+                # eşzamanlı istekler üst üste biner → ayrı async iz satırı
+                with tracing.span("llm", track="openai", question_id=qid, model=model,
+                                  queued_ms=round((t0 - queued) * 1000, 1)) as sp:
+                    try:
+                        answer_text = await _send_prompt(client, messages, model,
+                                                         temperature, timeout, max_retries)
+                        status = "ok"
+                    except Exception as exc:
+                        answer_text = ""
+                        error = f"{type(exc).__name__}: {exc}"
+                        status = "error"
+                    sp.set(status=status)
+                metrics.LLM_SECONDS.observe(time.perf_counter() - t0, status=status)
+                metrics.LLM_REQUESTS.inc(status=status)
+                if delay:
+                    await asyncio.sleep(delay)
+            if status == "ok" and cache is not None:
+                cache.put(key, model, answer_text)
+
+        # cevap geldiği anda yazılır
         out_json = {
             "soru": pdata.get("soru"),
             "yordam": pdata.get("yordam"),
             "cevap": answer_text,
+            "status": status,
+            "prompt_key": key,
+            "error": error,
         }
-        out_path = answer_dir / f"answer_{qid}.json"
         with out_path.open("w", encoding="utf-8") as f:
             json.dump(out_json, f, ensure_ascii=False, indent=2)
+        if on_answer is not None:
+            on_answer(qid, out_json)
+
+        print(f"{'✓' if status == 'ok' else '✗'} answer_{qid} ({source})" + (f" – {error}" if error else ""))
+        return {"id": qid, "file": out_path, "status": status, "error": error, "source": source}
+
+    try:
+        # gather sonuçları soru sırasıyla döndürür
+        results = await asyncio.gather(*(_one(p) for p in prompts))
+    finally:
+        await client.close()
+
+    if cache is not None:
+        from_cache = sum(1 for r in results if r["source"] == "cache")
+        print(f"💾  LLM önbelleği: {from_cache}/{len(results)} cevap önbellekten "
+              f"(toplam {cache.stats()})")
+
+    failed = [r["id"] for r in results if r["status"] != "ok"]
+    if failed:
+        print(f"⚠️  {len(failed)} soru hata aldı: {failed}")
+    return list(results)
+
 
-        results.append({"id": qid, "file": out_path, "status": status})
-        time.sleep(delay)
+def send_answers(
+    workspace: str | Path | None = None,
+    *,
+    model: str | None = None,
+    temperature: float = 0.0,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    max_retries: int | None = None,
+    delay: float = 0.0,
+    api_key: str | None = None,
+    resume: bool = False,
+    on_answer: Callable[[int, Dict[str, Any]], None] | None = None,
+) -> List[Dict[str, Any]]:
+    """`send_answers_async` için senkron sarıcı (kendi event loop'unu açar)."""
 
-    return results
+    return asyncio.run(send_answers_async(
+        workspace, model=model, temperature=temperature, concurrency=concurrency,
+        timeout=timeout, max_retries=max_retries, delay=delay, api_key=api_key,
+        resume=resume, on_answer=on_answer,
+    ))
 
 # ---------------------------------------------------------------------------
 # CLI – hala bağımsız çalışabilir, fakat simple wrapper
@@ -173,15 +365,22 @@ def _cli() -> None:
     ap = argparse.ArgumentParser(description="Send PROMPTS to GPT and store ANSWERS.")
     ap.add_argument("workspace", nargs="?", default=None,
                     help="Workspace root; boşsa .env'deki WORKSPACE_ROOT kullanılır")
-    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--model", default=None, help="Boşsa LLM_MODEL (varsayılan gpt-4o-mini)")
     ap.add_argument("--temperature", type=float, default=0.0)
-    ap.add_argument("--delay", type=float, default=0.3)
+    ap.add_argument("--concurrency", type=int, default=None)
+    ap.add_argument("--timeout", type=float, default=None)
+    ap.add_argument("--max-retries", type=int, default=None)
+    ap.add_argument("--delay", type=float, default=0.0)
     ap.add_argument("--api-key", default=None)
+    ap.add_argument("--resume", action="store_true",
+                    help="Başarılı cevabı olan soruları atla, yalnızca eksik/hatalıları gönder")
     args = ap.parse_args()
 
     try:
         send_answers(args.workspace, model=args.model, temperature=args.temperature,
-                     delay=args.delay, api_key=args.api_key)
+                     concurrency=args.concurrency, timeout=args.timeout,
+                     max_retries=args.max_retries, delay=args.delay, api_key=args.api_key,
+                     resume=args.resume)
         print("✅  Görev tamamlandı.")
     except Exception as exc:
         sys.exit(f"❌  {exc}")
@@ -202,9 +401,9 @@ results = send_answers(
     workspace="workspace",
     model="gpt-4o-mini",
     temperature=0.0,
-    delay=0.25
+    concurrency=8,
 )
-print(results)   # [{'id': 1, 'file': PosixPath('...'), 'status': 'ok'}, ...]
+print(results)   # [{'id': 1, 'file': PosixPath('...'), 'status': 'ok', 'error': None}, ...]
 
 
 '''
\ No newline at end of file
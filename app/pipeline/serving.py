@@ -0,0 +1,155 @@
+"""
+serving.py
+──────────
+Salt-okunur sunum modu: FAISS indeksleri ve chunk depoları süreç başına
+bir kez açılır ve istekler arasında paylaşılır.
+
+• İndeksler `IO_FLAG_MMAP_IFC | IO_FLAG_READ_ONLY` ile açılır; vektör
+  kodları (flat, HNSW deposu, IVF listeleri) sürecin özel belleğine
+  kopyalanmaz, işletim sisteminin sayfa önbelleğinden okunur. Aynı raporu
+  arayan tüm worker süreçleri aynı fiziksel sayfaları paylaşır. Bayrağı
+  bilmeyen eski FAISS sürümlerinde ya da hata halinde normal okumaya
+  düşülür. (Eski `IO_FLAG_MMAP` yalnızca OnDisk IVF listeleri içindir.)
+• `ChunkStore` cümle tablosunu mmap + satır ofset indeksiyle okur;
+  yalnızca top-k isabetlerin satırları çözülür.
+• Önbellek anahtarı dosyanın (mtime, boyut) damgasıdır: pipeline raporu
+  yeniden işlerse bir sonraki erişimde yeni sürüm açılır. Yazarlar
+  dosyaları geçici ad + os.replace ile değiştirir (`index_factory.save_index`,
+  `ChunkStoreWriter`); açık eşlemler eski sürümü görmeye devam eder.
+• Önbellek LRU'dur; en fazla SERVING_CACHE_SIZE nesne açık tutulur.
+• Önbellekten çıkarma (`evict`, `clear`, LRU) yalnızca önbelleğin
+  referansını bırakır; nesneyi o an kullanan başka thread'ler olabilir.
+  Kullanılmayan nesnenin eşlemi hemen (referans sayımıyla), süren bir
+  aramanınki arama bitince kapanır. Windows eşlenmiş dosyanın silinmesine
+  ya da üzerine taşınmasına izin vermez; bu yüzden silme/değiştirme
+  `retry_while_mapped` ile kısa süre yeniden denenir.
+
+Paylaşılan indeksler değiştirilmemelidir – arama parametreleri için
+`index_factory.search_params` kullanın.
+
+Ortam Değişkenleri
+------------------
+FAISS_MMAP         : "0" → indeksler belleğe tamamen okunur (varsayılan "1")
+SERVING_CACHE_SIZE : süreçte açık tutulacak en fazla indeks/depo (varsayılan 64)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+
+import faiss
+
+from .chunk_store import MANIFEST, ChunkStore
+
+_mmap = os.getenv("FAISS_MMAP", "1") != "0"
+_max_items = int(os.getenv("SERVING_CACHE_SIZE", "64") or 64)
+RELEASE_TIMEOUT = 10.0      # sn; Windows'ta eşlemin bırakılmasını bekleme süresi
+_mapped_files_locked = os.name == "nt"   # eşlenmiş dosya silinemez / üzerine taşınamaz
+
+_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, str], Tuple[Any, Any]]" = OrderedDict()
+
+
+def configure(*, mmap: bool | None = None, cache_size: int | None = None) -> None:
+    """Süreç ayarlarını değiştirir (ör. FastAPI açılışında Settings'ten)."""
+    global _mmap, _max_items
+    if mmap is not None:
+        _mmap = mmap
+    if cache_size is not None:
+        _max_items = max(1, cache_size)
+    clear()
+
+
+def read_index(path: str) -> faiss.Index:
+    """İndeksi (mümkünse) mmap ile, salt-okunur açar."""
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if _mmap and flag is not None:
+        try:
+            return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as exc:
+            print(f"⚠️  mmap açılamadı ({os.path.basename(path)}): {exc} → normal okuma")
+    return faiss.read_index(path)
+
+
+# ------------------------------------------------------------------
+#  Önbellek
+# ------------------------------------------------------------------
+def _stamp(path: str) -> Tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _cached(kind: str, key: str, stamp_path: str, opener):
+    stamp = _stamp(stamp_path)
+    with _lock:
+        hit = _cache.get((kind, key))
+        if hit is not None and hit[0] == stamp:
+            _cache.move_to_end((kind, key))
+            return hit[1]
+
+    obj = opener()                         # kilit dışında: dosya okuma yavaş olabilir
+    with _lock:
+        _cache[(kind, key)] = (stamp, obj)
+        _cache.move_to_end((kind, key))
+        while len(_cache) > _max_items:
+            _cache.popitem(last=False)
+    return obj
+
+
+def get_index(path: str) -> faiss.Index:
+    """Paylaşılan, salt-okunur indeks; dosya değişmişse yeniden açılır."""
+    path = os.path.abspath(path)
+    return _cached("index", path, path, lambda: read_index(path))
+
+
+def get_store(workspace_dir: str) -> ChunkStore:
+    """Paylaşılan ChunkStore; manifest değişmişse yeniden açılır."""
+    workspace_dir = os.path.abspath(workspace_dir)
+    manifest = os.path.join(workspace_dir, "chunks", MANIFEST)
+    return _cached("store", workspace_dir, manifest, lambda: ChunkStore(workspace_dir))
+
+
+def evict(workspace_dir: str) -> int:
+    """Bir workspace altındaki tüm indeks/depoları önbellekten çıkarır (silmeden önce).
+
+    Nesneler kapatılmaz: eşzamanlı bir arama veya prompt üretimi aynı
+    nesneyi kullanıyor olabilir; eşlem son referansla birlikte kapanır.
+    Dosyaları silen/değiştiren çağıran `retry_while_mapped` kullanmalı.
+    """
+    root = os.path.abspath(workspace_dir)
+    with _lock:
+        keys = [k for k in _cache if k[1] == root or k[1].startswith(root + os.sep)]
+        for k in keys:
+            del _cache[k]
+    return len(keys)
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def retry_while_mapped(fn, timeout: float | None = None):
+    """fn()'i Windows paylaşım ihlalinde (PermissionError) yeniden dener.
+
+    Önbellekten çıkarılmış bir indeks/depoyu süren bir arama hâlâ tutuyorsa
+    dosyası eşlenmiş kalır; arama bitip son referans düşünce silme veya
+    os.replace başarılı olur. Diğer sistemlerde hata hemen yükseltilir.
+    """
+    deadline = time.monotonic() + (RELEASE_TIMEOUT if timeout is None else timeout)
+    delay = 0.05
+    while True:
+        try:
+            return fn()
+        except PermissionError:
+            if not _mapped_files_locked or time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
@@ -6,11 +6,14 @@ SORU-YORDAM listesini .txt dosyasından okuyup embed'ler ve FAISS index + metada
 
 import os, re, json
 import numpy as np
-import faiss
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
 from pathlib import Path
 
+from ..core import tracing
+from .model_registry import get_model   # süreç genelinde paylaşılan model
+from .embedding_cache import encode_cached
+from .index_factory import build_index, save_index
+
 def vectorize_soru_yordam(txt_path: str, workspace_dir: str, model_name: str):
     """
     Parameters
@@ -32,8 +35,7 @@ def vectorize_soru_yordam(txt_path: str, workspace_dir: str, model_name: str):
     out_dir = os.path.join(workspace_dir, "faiss")
     os.makedirs(out_dir, exist_ok=True)
 
-    print(f"🧠 Model yükleniyor: {model_name}")
-    model = SentenceTransformer(model_name)
+    model = get_model(model_name)
 
     with open(txt_path, "r", encoding="utf-8") as f:
         raw = f.read().strip()
@@ -75,15 +77,14 @@ def vectorize_soru_yordam(txt_path: str, workspace_dir: str, model_name: str):
 
 
     print(f"🔎 {len(entries)} soru-yordam çifti bulundu.")
+    tracing.set_attrs(questions=len(entries))
 
     texts = [e["text"] for e in entries]
-    embeddings = model.encode(texts, show_progress_bar=True, convert_to_numpy=True, normalize_embeddings=True)
+    embeddings, _ = encode_cached(model, model_name, texts)
 
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(embeddings)
+    index = build_index(embeddings)
 
-    faiss.write_index(index, os.path.join(out_dir, "faiss_soru_yordam.index"))
+    save_index(index, os.path.join(out_dir, "faiss_soru_yordam.index"))
     with open(os.path.join(out_dir, "metadata_soru_yordam.json"), "w", encoding="utf-8") as f:
         json.dump(entries, f, ensure_ascii=False, indent=2)
 
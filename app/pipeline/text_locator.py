@@ -0,0 +1,125 @@
+"""
+text_locator.py
+───────────────
+Bir rapor metninde chunk'ın (yaklaşık) yerini bulan, rapor başına bir kez
+kurulan indeks.
+
+• Metin bir kez küçük harfe çevrilip boşlukları sadeleştirilir
+  (`expand_top10_chunks.normalize` ile aynı) ve her normalize karakterin
+  ham metindeki konumu saklanır.
+• Kelime 3'lülerinden (shingle) ters indeks kurulur.
+• Sorgu: önce birebir `str.find`; olmazsa chunk'ın shingle'ları aday
+  başlangıç noktalarına oy verir. En çok oy alan birkaç aday – oy farkı
+  açıksa yalnızca lider – SequenceMatcher ile doğrulanır (aynı 0.7 eşiği,
+  `min_ratio`); zayıf adaylar önce `quick_ratio()` ile elenir. Tüm
+  shingle'ları aynı hizada olan lider doğrulanmadan kabul edilir.
+
+Eski yöntem metnin her 100 karakterlik adımında SequenceMatcher
+çalıştırıyordu; burada yalnızca birkaç aday karşılaştırılır.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+SHINGLE = 3             # kelime sayısı
+MAX_POSTINGS = 64       # bundan sık geçen shingle'lar ayırt edici değil
+MAX_CANDIDATES = 3      # doğrulanacak en fazla aday
+WINDOW_PAD = 100        # eski yöntemle aynı pencere payı
+MIN_RATIO = 0.7
+
+_TOKEN = re.compile(r"\S+")
+
+
+class TextLocator:
+    def __init__(self, full_text: str):
+        self.full_text = full_text
+        self.norm, self._raw_pos = self._normalize_with_map(full_text)
+
+        self._token_starts = array("i")
+        index: Dict[int, List[int]] = defaultdict(list)
+        tokens = []
+        for m in _TOKEN.finditer(self.norm):
+            self._token_starts.append(m.start())
+            tokens.append(m.group())
+        for i in range(len(tokens) - SHINGLE + 1):
+            index[hash(" ".join(tokens[i:i + SHINGLE]))].append(i)
+        self._index = {k: v for k, v in index.items() if len(v) <= MAX_POSTINGS}
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _normalize_with_map(text: str) -> Tuple[str, array]:
+        """normalize() ile aynı çıktı + her normalize karakterin ham ofseti."""
+        chars: List[str] = []
+        pos = array("i")
+        pending_space = -1
+        for i, c in enumerate(text):
+            if c.isspace():
+                if chars and pending_space < 0:
+                    pending_space = i
+                continue
+            if pending_space >= 0:
+                chars.append(" ")
+                pos.append(pending_space)
+                pending_space = -1
+            lc = c.lower()              # 'İ' → 'i̇' gibi uzunluk değişebilir
+            chars.append(lc)
+            for _ in lc:
+                pos.append(i)
+        return "".join(chars), pos
+
+    def _token_start(self, token: int) -> int:
+        """Aday token konumunun normalize metindeki karakter ofseti (kırpılmış)."""
+        return self._token_starts[min(max(token, 0), len(self._token_starts) - 1)]
+
+    def _raw_span(self, norm_start: int, norm_len: int) -> Tuple[int, int]:
+        end = min(norm_start + norm_len, len(self.norm)) - 1
+        return self._raw_pos[norm_start], self._raw_pos[max(end, norm_start)] + 1
+
+    # ------------------------------------------------------------------
+    def locate(self, chunk_text: str, min_ratio: float = MIN_RATIO) -> Tuple[int, int] | None:
+        """Chunk'ın ham metindeki [başlangıç, bitiş) aralığı; bulunamazsa None."""
+        norm_chunk = re.sub(r"\s+", " ", chunk_text.lower()).strip()
+        if not norm_chunk or not self.norm:
+            return None
+
+        idx = self.norm.find(norm_chunk)
+        if idx != -1:
+            return self._raw_span(idx, len(norm_chunk))
+
+        # shingle oylaması – aday = eşleşen token konumu - chunk içindeki konum
+        tokens = norm_chunk.split(" ")
+        votes: Counter = Counter()
+        for j in range(len(tokens) - SHINGLE + 1):
+            for pos in self._index.get(hash(" ".join(tokens[j:j + SHINGLE])), ()):
+                votes[pos - j] += 1
+        if not votes:
+            return None
+
+        ranked = votes.most_common(MAX_CANDIDATES)
+        lead, lead_votes = ranked[0]
+        n_shingles = max(1, len(tokens) - SHINGLE + 1)
+        if lead_votes == n_shingles:        # her shingle aynı hizada → token dizisi birebir
+            return self._raw_span(self._token_start(lead), len(norm_chunk))
+
+        # eski fallback ile aynı yön: a = chunk, b = pencere (autojunk b'ye uygulanır)
+        matcher = SequenceMatcher(None, norm_chunk, "")
+        best, best_idx = 0.0, -1
+        for cand, n in ranked:
+            if n * 2 < lead_votes:          # lider adayın yarısından az oy → ele
+                break
+            start = self._token_start(cand)
+            matcher.set_seq2(self.norm[start:start + len(norm_chunk) + WINDOW_PAD])
+            if matcher.quick_ratio() <= max(best, min_ratio - 1e-9):
+                continue
+            ratio = matcher.ratio()
+            if ratio > best:
+                best, best_idx = ratio, start
+
+        if best < min_ratio:
+            return None
+        return self._raw_span(best_idx, len(norm_chunk))
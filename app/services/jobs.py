@@ -0,0 +1,117 @@
+"""
+jobs.py
+───────
+run_pipeline çağrılarını sınırlı bir worker havuzunda çalıştırır ve
+ilerlemeyi `state` deposuna yazar.
+
+Event loop hiçbir zaman pipeline'ı beklemez; HTTP katmanı yalnızca iş
+kimliği alır (`submit`) veya dönen Future'ı `asyncio.wrap_future` ile
+bekler.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from . import state
+from .pipeline_runner import run_pipeline
+from ..core import metrics
+from ..core.config import get_settings
+
+st = get_settings()
+
+_executor = ThreadPoolExecutor(max_workers=st.job_workers, thread_name_prefix="pipeline")
+_pending = 0            # kuyrukta bekleyen + çalışan
+_running = 0
+_pending_lock = threading.Lock()
+
+
+class QueueFullError(RuntimeError):
+    """Kuyrukta bekleyen iş sayısı sınırı aşıldı."""
+
+
+def pending() -> int:
+    return _pending
+
+
+def running() -> int:
+    return _running
+
+
+metrics.JOBS_QUEUED.set_function(lambda: _pending - _running)
+metrics.JOBS_IN_FLIGHT.set_function(running)
+
+
+def _run_job(job_id: str, pdf_path: Path, questions_path: Path, report_id: str,
+             on_stage: Callable[[str], None] | None,
+             on_answer: Callable[[int, Dict[str, Any]], None] | None,
+             trace: bool | None) -> Path:
+    global _pending, _running
+    with _pending_lock:
+        _running += 1
+    state.update(job_id, status="processing")
+
+    def _stage(stage: str) -> None:
+        state.update(job_id, stage=stage)
+        if on_stage is not None:
+            on_stage(stage)
+
+    failed: list[int] = []
+
+    def _answer(qid: int, answer: Dict[str, Any]) -> None:
+        if answer.get("status", "ok") != "ok":
+            failed.append(qid)
+        if on_answer is not None:
+            on_answer(qid, answer)
+
+    try:
+        ws = run_pipeline(
+            pdf_path=pdf_path,
+            questions_path=questions_path,
+            report_id=report_id,
+            send_to_gpt=True,
+            on_stage=_stage,
+            on_answer=_answer,
+            trace=trace,
+        )
+        # Cevabı alınamayan soru varsa iş başarılı sayılmaz (cevaplar yine okunabilir)
+        if failed:
+            state.update(job_id, status="failed", stage="done",
+                         error=f"{len(failed)} soru için LLM çağrısı başarısız: {sorted(failed)}")
+            metrics.JOBS_FINISHED.inc(status="failed")
+        else:
+            state.update(job_id, status="completed", stage="done")
+            metrics.JOBS_FINISHED.inc(status="completed")
+        return ws
+    except Exception as exc:
+        state.update(job_id, status="failed", error=str(exc))
+        metrics.JOBS_FINISHED.inc(status="failed")
+        raise
+    finally:
+        with _pending_lock:
+            _pending -= 1
+            _running -= 1
+
+
+def submit(pdf_path: Path, questions_path: Path, report_id: str, *,
+           on_stage: Callable[[str], None] | None = None,
+           on_answer: Callable[[int, Dict[str, Any]], None] | None = None,
+           trace: bool | None = None) -> tuple[str, Future]:
+    """Pipeline'ı kuyruğa ekler; (job_id, Future) döndürür.
+
+    on_stage / on_answer pipeline thread'inden çağrılır. trace=True iz
+    kaydını PIPELINE_TRACE'ten bağımsız olarak açar.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= st.job_queue_max:
+            raise QueueFullError(f"Kuyruk dolu ({_pending} iş bekliyor)")
+        _pending += 1
+
+    job_id = state.new_job(report_id=report_id)
+    future = _executor.submit(_run_job, job_id, pdf_path, questions_path, report_id,
+                              on_stage, on_answer, trace)
+    return job_id, future
@@ -11,12 +11,19 @@ Aşamalar
 3. CID temizliği (`cid_cleaner`)
 4. Chunk oluşturma (`chunk_creator`)
 5. Chunk embed + FAISS (`faiss_creator`)
+   (GLOBAL_INDEX=1 ise rapor ayrıca global indekse eklenir – `global_index`)
 6. Soru‑yordam embed + FAISS (`soru_yordam_embedder`)
 7. Her soru için top‑k chunk bul (`search_faiss_top_chunks`)
-8. Chunk’ları genişlet (`expand_top10_chunks`)
+8. Chunk’ları genişlet (`expand_top10_chunks`) – cümle ofsetleriyle tam
+   cümlelere; prompt'lar genişlemiş aralıklardan birleştirilerek kurulur
+   (`passage_merger`)
 9. Prompt üret (`gpt_prompt_builder`)
 10. (Opsiyonel) GPT’ye gönder, cevapları kaydet (`sender`)
 
+Her çalıştırma aşama ve soru başına iç içe span'lerle `<workspace>/trace.json`
+dosyasına Chrome trace biçiminde yazılır (`app.core.tracing`;
+PIPELINE_TRACE=0 ile kapatılır).
+
 Ortam Değişkenleri (.env)
 -------------------------
 OPENAI_API_KEY, WORKSPACE_ROOT, EMBED_MODEL, TOPK vb. değerler otomatik
@@ -25,23 +32,30 @@ okunur (python‑dotenv).
 
 from __future__ import annotations
 
+import json
 import os
 import uuid
 import argparse
 from pathlib import Path
+from typing import Any, Callable, Dict
 from dotenv import load_dotenv
 
 # ➊  Pipeline adımlarını içe aktar
 from app.pipeline.init_workspace import init_workspace
 from app.pipeline.pdf_to_text import pdf_to_txt
-from app.pipeline.cid_cleaner import clean_txt
-from app.pipeline.chunk_creator import create_chunks
+from app.pipeline.cid_cleaner import clean_txt, CID_MAP
+from app.pipeline.index_factory import current_spec
+from app.pipeline.chunk_creator import create_chunks, CHUNK_CONFIG
 from app.pipeline.faiss_creator import create_faiss_for_chunks
+from app.pipeline import global_index, serving
 from app.pipeline.soru_yordam_embedder import vectorize_soru_yordam
 from app.pipeline.search_faiss_top_chunks import ask_all
-from app.pipeline.expand_top10_chunks import expand_chunk
-from app.pipeline.gpt_prompt_builder import generate_all_prompts
+from app.pipeline.expand_top10_chunks import expand_chunk, EXPANSION_SIZE
+from app.pipeline.gpt_prompt_builder import generate_all_prompts, PROMPT_TEMPLATE_VERSION
+from app.pipeline import prompt_packer
 from app.pipeline.sender import send_answers
+from app.services.stage_cache import StageCache, file_hash, fingerprint
+from app.core import metrics, tracing
 
 
 # --------------------------------------------------
@@ -50,6 +64,38 @@ from app.pipeline.sender import send_answers
 
 load_dotenv()  # proje kökündeki .env okunur
 
+# Bir aşamanın çıktı biçimi değiştiğinde numarasını artırın; eski
+# workspace'lerdeki kayıtlı çıktılar böylece geçersiz sayılır.
+STAGE_VERSIONS = {
+    "pdf_to_txt": 1,
+    "clean_txt": 2,
+    "create_chunks": 3,
+    "create_faiss": 2,
+    "vectorize_questions": 1,
+    "search": 3,
+    "expand_chunks": 4,
+    "generate_prompts": 1,
+    "send_answers": 1,
+}
+
+# --------------------------------------------------
+#  İz (trace) öznitelikleri
+# --------------------------------------------------
+
+def _page_count(pages_path: Path) -> int | None:
+    try:
+        return len(json.loads(pages_path.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return None
+
+
+def _answer_summary(results) -> Dict[str, int]:
+    summary: Dict[str, int] = {}
+    for r in results:
+        for key in (r["status"], r["source"]):
+            summary[key] = summary.get(key, 0) + 1
+    return summary
+
 # --------------------------------------------------
 #  Ana çalışma fonksiyonu
 # --------------------------------------------------
@@ -61,50 +107,154 @@ def run_pipeline(
     report_id: str | None = None,
     send_to_gpt: bool = True,
     embed_model: str | None = None,
+    llm_model: str | None = None,
     top_k: int | None = None,
+    on_stage: Callable[[str], None] | None = None,
+    on_answer: Callable[[int, Dict[str, Any]], None] | None = None,
+    force: bool = False,
+    trace: bool | None = None,
 ) -> Path:
-    """Tüm adımları sırayla çalıştırır ve workspace yolunu döndürür."""
+    """Tüm adımları sırayla çalıştırır ve workspace yolunu döndürür.
+
+    llm_model : prompt bütçesi ve cevap isteği için model (None → LLM_MODEL)
+    on_stage  : her aşama başlarken aşama adıyla çağrılır (iş durumu için)
+    on_answer : her GPT cevabı yazıldığında (id, cevap_json) ile çağrılır
+    force    : parmak izlerini yok sayıp tüm aşamaları yeniden çalıştırır
+    trace     : `<workspace>/trace.json` yazılsın mı (None → PIPELINE_TRACE, varsayılan açık)
+
+    Her aşamanın girdi parmak izi `<workspace>/.stages.json` içinde tutulur;
+    parmak izi ve çıktıları değişmemiş aşamalar atlanır.
+    """
 
     # ---- Ayarlar (.env + parametre) ----------------
     workspace_root = Path(os.getenv("WORKSPACE_ROOT", "workspace")).expanduser()
     embed_model = embed_model or os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # aynı model hem prompt bütçesini hem isteği belirler
+    llm_model = llm_model or prompt_packer.current_model()
     top_k = top_k or int(os.getenv("TOPK", "10"))
+    if trace is None:
+        trace = os.getenv("PIPELINE_TRACE", "1").lower() not in ("0", "false", "no", "")
 
     # ---- Workspace -------------------------------
     report_id = report_id or Path(pdf_path).stem or f"r_{uuid.uuid4().hex[:6]}"
     workspace_dir = workspace_root / report_id
     workspace_dir.mkdir(parents=True, exist_ok=True)
 
-    # 1. klasör yapısı
-    init_workspace(report_id, str(workspace_root))
-
-    # 2. PDF → TXT
-    txt_path = pdf_to_txt(str(pdf_path), str(workspace_dir))
-
-    # 3. CID fix
-    clean_path = clean_txt(txt_path, str(workspace_dir))
-
-    # 4. Chunk oluştur
-    create_chunks(clean_path, str(workspace_dir))
-
-    # 5. Chunk embed → FAISS
-    create_faiss_for_chunks(str(workspace_dir), embed_model)
-
-    # 6. Soru‑yordam embed → FAISS
-    vectorize_soru_yordam(str(questions_path), str(workspace_dir), embed_model)
-
-    # 7. Top‑k chunk bul
-    ask_all(str(workspace_dir), top_k=top_k, model_name=embed_model)
-
-    # 8. Chunk genişlet
-    #expand_chunk(str(workspace_dir))
-
-    # 9. Prompt üret
-    generate_all_prompts(workspace_dir)
-
-    # 10. Cevap al (isteğe bağlı)
-    if send_to_gpt:
-        send_answers(workspace_dir)
+    cache = StageCache(workspace_dir)
+
+    # Önbelleğin referanslarını bırak: boştaki eşlemler hemen kapanır. Süren bir
+    # aramanın tuttuğu eşlem onunla kapanır; Windows'ta o ana kadar dosyanın
+    # yerine yenisi taşınamaz, yazarlar `serving.retry_while_mapped` ile bekler.
+    # Diğer süreçler yeni sürümü dosya damgasından görür.
+    serving.evict(str(workspace_dir))
+
+    def run_stage(name, fp, outputs, fn, *, record_if=lambda _: True, describe=None,
+                  keep_outputs=False):
+        if on_stage is not None:
+            on_stage(name)
+        with tracing.span(name) as sp:
+            fp = fingerprint(name, STAGE_VERSIONS[name], fp)
+            if not force and cache.is_fresh(name, fp, outputs):
+                print(f"⏭️  {name} atlandı (girdiler değişmedi)")
+                metrics.STAGE_SKIPPED.inc(stage=name)
+                sp.set(skipped=True)
+                return None
+            cache.invalidate(name)
+            if force or not keep_outputs:
+                cache.clear_outputs(outputs)
+            with metrics.STAGE_SECONDS.time(stage=name):
+                result = fn()
+            if describe is not None:
+                sp.set(**describe(result))
+            if record_if(result):
+                cache.record(name, fp, outputs)
+            return result
+
+    with tracing.record(workspace_dir / tracing.TRACE_FILE, "run_pipeline", enabled=trace,
+                        report_id=report_id, embed_model=embed_model, llm_model=llm_model, top_k=top_k,
+                        force=force, send_to_gpt=send_to_gpt):
+        # ---- Girdi parmak izleri ----------------------
+        base_name   = Path(pdf_path).stem
+        txt_path    = workspace_dir / "raw_txt" / f"{base_name}.txt"
+        clean_path  = workspace_dir / "clean_txt" / f"{base_name}.txt"
+        faiss_dir   = workspace_dir / "faiss"
+
+        with tracing.span("fingerprint"):
+            fp_pdf  = file_hash(pdf_path)
+        fp_clean    = fingerprint(fp_pdf, CID_MAP)
+        fp_chunks   = fingerprint(fp_clean, CHUNK_CONFIG)
+        index_spec  = current_spec()
+        # nprobe / ef_search yalnızca aramayı etkiler → indeksler yeniden kurulmaz
+        fp_faiss    = fingerprint(fp_chunks, embed_model, index_spec.build_dict())
+        fp_q        = fingerprint(file_hash(questions_path), embed_model, index_spec.build_dict())
+        fp_search   = fingerprint(fp_faiss, fp_q, top_k, index_spec.search_dict())
+        fp_expand   = fingerprint(fp_search, EXPANSION_SIZE)
+        fp_prompts  = fingerprint(fp_expand, PROMPT_TEMPLATE_VERSION, prompt_packer.config(llm_model))
+        fp_answers  = fingerprint(fp_prompts, llm_model)
+
+        # 1. klasör yapısı
+        if on_stage is not None:
+            on_stage("init_workspace")
+        with metrics.STAGE_SECONDS.time(stage="init_workspace"), tracing.span("init_workspace"):
+            init_workspace(report_id, str(workspace_root))
+
+        # 2. PDF → TXT
+        run_stage("pdf_to_txt", fp_pdf,
+                  [txt_path, txt_path.with_suffix(".pages.json")],
+                  lambda: pdf_to_txt(str(pdf_path), str(workspace_dir)),
+                  describe=lambda _: {"pages": _page_count(txt_path.with_suffix(".pages.json")),
+                                      "bytes": txt_path.stat().st_size})
+
+        # 3. CID fix
+        run_stage("clean_txt", fp_clean, [clean_path, clean_path.with_suffix(".pages.json")],
+                  lambda: clean_txt(str(txt_path), str(workspace_dir)),
+                  describe=lambda _: {"bytes": clean_path.stat().st_size})
+
+        # 4. Chunk oluştur
+        run_stage("create_chunks", fp_chunks, [workspace_dir / "chunks"],
+                  lambda: create_chunks(str(clean_path), str(workspace_dir)))
+
+        # 5. Chunk embed → FAISS
+        run_stage("create_faiss", fp_faiss,
+                  [faiss_dir / f"faiss_{ds}.index" for ds in ("genel", "ozel", "mevzuat")],
+                  lambda: create_faiss_for_chunks(str(workspace_dir), embed_model))
+
+        # 5b. Raporlar arası global indeks (parmak izi aynıysa atlanır)
+        if global_index.enabled():
+            if on_stage is not None:
+                on_stage("global_index")
+            with metrics.STAGE_SECONDS.time(stage="global_index"), tracing.span("global_index"):
+                global_index.get_global_index().add_report(
+                    str(workspace_dir), report_id, model_name=embed_model, fingerprint=fp_faiss)
+
+        # 6. Soru‑yordam embed → FAISS
+        run_stage("vectorize_questions", fp_q,
+                  [faiss_dir / "faiss_soru_yordam.index", faiss_dir / "metadata_soru_yordam.json"],
+                  lambda: vectorize_soru_yordam(str(questions_path), str(workspace_dir), embed_model))
+
+        # 7. Top‑k chunk bul
+        run_stage("search", fp_search, [workspace_dir / "top10"],
+                  lambda: ask_all(str(workspace_dir), top_k=top_k, model_name=embed_model,
+                                  nprobe=index_spec.nprobe, ef_search=index_spec.ef_search))
+
+        # 8. Chunk genişlet (cümle ofsetleriyle – neredeyse bedava)
+        run_stage("expand_chunks", fp_expand, [workspace_dir / "expanded"],
+                  lambda: expand_chunk(str(workspace_dir), top_k=top_k))
+
+        # 9. Prompt üret
+        run_stage("generate_prompts", fp_prompts, [workspace_dir / "PROMPTS"],
+                  lambda: generate_all_prompts(workspace_dir, top_k=top_k, model=llm_model))
+
+        # 10. Cevap al (isteğe bağlı) – yalnızca tüm cevaplar başarılıysa kaydedilir.
+        #     ANSWERS silinmez: yarıda kalan/hatalı çalıştırmadan sonra aynı
+        #     prompt'a ait başarılı cevaplar atlanır (resume), yalnızca
+        #     eksik/hatalı olanlar gönderilir.
+        if send_to_gpt:
+            run_stage("send_answers", fp_answers, [workspace_dir / "ANSWERS"],
+                      lambda: send_answers(workspace_dir, model=llm_model, on_answer=on_answer,
+                                           resume=not force),
+                      record_if=lambda res: all(r["status"] == "ok" for r in res),
+                      describe=_answer_summary, keep_outputs=True)
 
     print("🎉 Pipeline tamamlandı →", workspace_dir)
     return workspace_dir
@@ -120,7 +270,10 @@ def _cli() -> None:
     p.add_argument("--id", dest="report_id", default=None, help="Rapor kimliği (klasör adı)")
     p.add_argument("--no-gpt", action="store_true", help="GPT'ye göndermeden dur")
     p.add_argument("--model", dest="embed_model", default=None, help="Sentence‑Transformers modeli")
+    p.add_argument("--llm-model", dest="llm_model", default=None,
+                   help="Prompt bütçesi ve cevap için OpenAI modeli (varsayılan LLM_MODEL)")
     p.add_argument("--topk", dest="top_k", type=int, default=None, help="Top‑k chunk sayısı")
+    p.add_argument("--force", action="store_true", help="Önbelleği yok say, tüm aşamaları çalıştır")
     args = p.parse_args()
 
     run_pipeline(
@@ -129,8 +282,9 @@ def _cli() -> None:
         report_id=args.report_id,
         send_to_gpt=not args.no_gpt,
         embed_model=args.embed_model,
+        llm_model=args.llm_model,
         top_k=args.top_k,
-
+        force=args.force,
     )
 
 
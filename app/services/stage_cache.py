@@ -0,0 +1,106 @@
+"""
+stage_cache.py
+──────────────
+run_pipeline aşamaları için girdi parmak izi (fingerprint) kaydı.
+
+Her aşama tamamlandığında `<workspace>/.stages.json` dosyasına
+    {aşama: {"fingerprint": …, "outputs": [[yol, boyut, mtime_ns], …]}}
+yazılır. Bir sonraki çalıştırmada parmak izi **ve** çıktıların imzası
+aynıysa aşama atlanır.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, List
+
+STATE_FILE = ".stages.json"
+
+
+def file_hash(path: str | Path, block: int = 1 << 20) -> str:
+    """Dosyanın sha256 özeti (büyük PDF'ler için parça parça okunur)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(block):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(*parts: Any) -> str:
+    """JSON'a çevrilebilen parçalardan kararlı bir özet üretir."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    def __init__(self, workspace_dir: str | Path):
+        self.root = Path(workspace_dir)
+        self.path = self.root / STATE_FILE
+        try:
+            self._data: dict = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._data = {}
+
+    # ------------------------------------------------------------------
+    #  Çıktı imzası
+    # ------------------------------------------------------------------
+    def _files(self, outputs: Iterable[str | Path]) -> List[Path] | None:
+        files: List[Path] = []
+        for out in outputs:
+            p = Path(out)
+            if p.is_dir():
+                files.extend(sorted(f for f in p.rglob("*") if f.is_file()))
+            elif p.is_file():
+                files.append(p)
+            else:
+                return None                         # beklenen çıktı yok
+        return files
+
+    def _signature(self, outputs: Iterable[str | Path]) -> List[list] | None:
+        files = self._files(outputs)
+        if files is None:
+            return None
+        sig = []
+        for f in files:
+            stat = f.stat()
+            sig.append([os.path.relpath(f, self.root), stat.st_size, stat.st_mtime_ns])
+        return sig
+
+    # ------------------------------------------------------------------
+    #  API
+    # ------------------------------------------------------------------
+    def is_fresh(self, stage: str, fp: str, outputs: Iterable[str | Path]) -> bool:
+        rec = self._data.get(stage)
+        if not rec or rec.get("fingerprint") != fp:
+            return False
+        sig = self._signature(outputs)
+        return bool(sig) and sig == rec.get("outputs")
+
+    def record(self, stage: str, fp: str, outputs: Iterable[str | Path]) -> None:
+        self._data[stage] = {"fingerprint": fp, "outputs": self._signature(outputs) or []}
+        self._save()
+
+    def invalidate(self, stage: str) -> None:
+        if self._data.pop(stage, None) is not None:
+            self._save()
+
+    def clear_outputs(self, outputs: Iterable[str | Path]) -> None:
+        """Klasör çıktılarındaki eski dosyaları siler (klasörler kalır).
+
+        Önceki çalıştırmadan kalan fazla dosyalar (ör. artık olmayan bir
+        sorunun prompt'u) bir sonraki aşamaya sızmasın diye.
+        """
+        for out in outputs:
+            p = Path(out)
+            if p.is_dir():
+                for f in p.rglob("*"):
+                    if f.is_file():
+                        f.unlink()
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -4,16 +4,35 @@ import uuid, threading, time
 _jobs: dict[str, dict] = {}
 _lock = threading.Lock()
 
-def new_job() -> str:
+JOB_TTL = 24 * 3600   # biten işler bu süreden sonra bellekten atılır
+
+def new_job(**fields) -> str:
     jid = uuid.uuid4().hex
+    now = time.time()
     with _lock:
-        _jobs[jid] = {"status": "processing", "created": time.time()}
+        _prune(now)
+        _jobs[jid] = {"status": "queued", "stage": None, "created": now, "updated": now, **fields}
     return jid
 
 def update(jid: str, **fields):
     with _lock:
         if jid in _jobs:
-            _jobs[jid].update(fields)
+            _jobs[jid].update(fields, updated=time.time())
 
 def get(jid: str) -> dict | None:
-    return _jobs.get(jid)
+    with _lock:
+        job = _jobs.get(jid)
+        return dict(job) if job is not None else None
+
+def active_for(report_id: str) -> bool:
+    """Rapor için kuyrukta bekleyen veya çalışan iş var mı?"""
+    with _lock:
+        return any(j.get("report_id") == report_id and j["status"] in ("queued", "processing")
+                   for j in _jobs.values())
+
+def _prune(now: float) -> None:
+    # _lock altında çağrılır
+    stale = [jid for jid, j in _jobs.items()
+             if j["status"] in ("completed", "failed") and now - j["updated"] > JOB_TTL]
+    for jid in stale:
+        del _jobs[jid]
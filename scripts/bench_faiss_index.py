@@ -0,0 +1,142 @@
+# FAISS indeks tiplerinin karşılaştırması: recall@k (Flat'e göre), sorgu
+# gecikmesi, kurulum süresi ve indeks boyutu.
+#
+# Kullanım:
+#   python scripts/bench_faiss_index.py workspace/rapor2023            # mevcut flat indekslerden
+#   python scripts/bench_faiss_index.py --synthetic 200000 --dim 384   # çok yıllık arşiv simülasyonu
+#
+# Workspace verilirse faiss_*.index dosyalarındaki vektörler birleştirilip
+# kullanılır (Flat indeksler vektörleri aynen saklar). Sorgular, veritabanından
+# örneklenen vektörlere gürültü eklenip normalize edilerek üretilir.
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.pipeline.index_factory import IndexSpec, build_index, set_search_params  # noqa: E402
+from bench_stats import percentile                                                 # noqa: E402
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.ascontiguousarray(x, dtype="float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def load_workspace_vectors(workspace: str) -> np.ndarray:
+    parts = []
+    for path in sorted(glob.glob(os.path.join(workspace, "faiss", "faiss_*.index"))):
+        if path.endswith("soru_yordam.index"):
+            continue
+        index = faiss.read_index(path)
+        parts.append(index.reconstruct_n(0, index.ntotal))
+    if not parts:
+        raise SystemExit(f"❌ {workspace}/faiss altında indeks yok")
+    return _normalize(np.vstack(parts))
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Kümeli veri – gerçek embedding dağılımına düzgün rastgeleden daha yakın."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    labels = rng.integers(0, clusters, n)
+    return _normalize(centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype("float32"))
+
+
+def make_queries(db: np.ndarray, n: int, noise: float, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = db[rng.choice(len(db), min(n, len(db)), replace=False)]
+    return _normalize(base + noise * rng.standard_normal(base.shape).astype("float32"))
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return int(faiss.serialize_index(index).size)
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    """Sorgular tek tek aranır (API'deki tek soru gecikmesi); ms listesi döner."""
+    times, ids = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, i = index.search(q[None, :], k)
+        times.append((time.perf_counter() - t0) * 1000)
+        ids.append(i[0])
+    return np.vstack(ids), times
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)]))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("workspace", nargs="?", default=None)
+    ap.add_argument("--synthetic", type=int, default=0, help="sentetik vektör sayısı")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--noise", type=float, default=0.3)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--types", default="flat,hnsw,ivf_flat,ivf_pq")
+    ap.add_argument("--nprobe", default="1,4,8,16,32")
+    ap.add_argument("--ef-search", default="16,32,64,128")
+    ap.add_argument("--threads", type=int, default=1,
+                    help="arama sırasında FAISS OpenMP thread sayısı (kurulum tüm çekirdekler)")
+    args = ap.parse_args()
+
+    build_threads = faiss.omp_get_max_threads()
+
+    if args.synthetic:
+        db = synthetic_vectors(args.synthetic, args.dim)
+        source = f"sentetik {args.synthetic:,}×{args.dim}"
+    else:
+        db = load_workspace_vectors(args.workspace or "workspace/rapor2023")
+        source = f"{args.workspace or 'workspace/rapor2023'} ({len(db):,}×{db.shape[1]})"
+    queries = make_queries(db, args.queries, args.noise)
+    k = min(args.k, len(db))
+    print(f"📊 Veri: {source} | {len(queries)} sorgu | k={k}\n")
+
+    flat = build_index(db, IndexSpec(type="flat"))
+    _, truth = flat.search(queries, k)
+
+    header = f"{'tip':<10} {'param':<14} {'recall@k':>9} {'ort ms':>9} {'p95 ms':>9} {'kurulum s':>10} {'boyut MB':>9}"
+    print(header)
+    print("─" * len(header))
+
+    for kind in [t.strip() for t in args.types.split(",") if t.strip()]:
+        faiss.omp_set_num_threads(build_threads)
+        t0 = time.perf_counter()
+        index = build_index(db, IndexSpec(type=kind))
+        build_s = time.perf_counter() - t0
+        faiss.omp_set_num_threads(args.threads)
+        size_mb = index_bytes(index) / 1024 / 1024
+
+        if kind.startswith("ivf"):
+            sweep = [("nprobe", int(v)) for v in args.nprobe.split(",")]
+        elif kind == "hnsw":
+            sweep = [("efSearch", int(v)) for v in args.ef_search.split(",")]
+        else:
+            sweep = [("-", None)]
+
+        for name, value in sweep:
+            if name == "nprobe":
+                set_search_params(index, nprobe=value)
+            elif name == "efSearch":
+                set_search_params(index, ef_search=value)
+            found, times = timed_search(index, queries, k)
+            param = "-" if value is None else f"{name}={value}"
+            print(f"{kind:<10} {param:<14} {recall_at_k(truth, found):>9.3f} "
+                  f"{statistics.mean(times):>9.3f} {percentile(times, 95):>9.3f} "
+                  f"{build_s:>10.2f} {size_mb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# TextLocator ile eski SequenceMatcher kayan pencere yönteminin karşılaştırması
+#
+# Kullanım:
+#   python scripts/bench_locator.py [workspace/rapor2023] [--samples 20] [--noise 0.02]
+#
+# Chunk'lar rapordaki metinle birebir eşleşirse iki yöntem de str.find ile
+# biter; asıl fark bulanık (fuzzy) yolda ortaya çıkar. Bu yüzden varsayılan
+# olarak yalnızca temiz metinde birebir bulunamayan gerçek chunk'lar ölçülür.
+# --noise > 0 verilirse tüm chunk'lardan örneklenip karakterlerin bir kısmı
+# rastgele bozulur (PDF/CID gürültüsünü taklit eder).
+#
+# TextLocator satırında sorgu süresi ayrıca "doğrulama" (adayların
+# SequenceMatcher ile karşılaştırılması) ve geri kalan (normalize + shingle
+# oylaması) olarak bölünür; --target-ms hedefiyle aradaki fark yazdırılır.
+#
+# Not: eski yöntem sorgu başına saniyeler sürebilir; --samples küçük tutun.
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.pipeline import text_locator                    # noqa: E402
+from app.pipeline.chunk_store import ChunkStore          # noqa: E402
+from app.pipeline.text_locator import TextLocator        # noqa: E402
+from bench_stats import percentile                       # noqa: E402
+
+
+class TimedMatcher(SequenceMatcher):
+    """TextLocator'ın aday doğrulamasında harcanan süreyi toplar."""
+
+    seconds = 0.0
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(self, *args)
+        finally:
+            TimedMatcher.seconds += time.perf_counter() - t0
+
+    def set_seq2(self, b):                  # b2j tablosu burada kurulur
+        return self._timed(SequenceMatcher.set_seq2, b)
+
+    def quick_ratio(self):
+        return self._timed(SequenceMatcher.quick_ratio)
+
+    def ratio(self):
+        return self._timed(SequenceMatcher.ratio)
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def legacy_locate(chunk_text: str, norm_full: str) -> int:
+    """expand_top10_chunks'taki eski fallback (normalize ofset döndürür)."""
+    norm_chunk = normalize(chunk_text)
+    idx = norm_full.find(norm_chunk)
+    if idx != -1:
+        return idx
+    best, best_idx = 0, -1
+    for i in range(0, len(norm_full) - len(norm_chunk), 100):
+        win = norm_full[i:i + len(norm_chunk) + 100]
+        ratio = SequenceMatcher(None, norm_chunk, win).ratio()
+        if ratio > best:
+            best, best_idx = ratio, i
+    return best_idx if best >= 0.7 else -1
+
+
+def perturb(text: str, noise: float, rng: random.Random) -> str:
+    chars = list(text)
+    for i in range(len(chars)):
+        if not chars[i].isspace() and rng.random() < noise:
+            chars[i] = rng.choice("abcçdefgğhıijklmnoöprsştuüvyz")
+    return "".join(chars)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("workspace", nargs="?", default="workspace/rapor2023")
+    ap.add_argument("--samples", type=int, default=20)
+    ap.add_argument("--noise", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--target-ms", type=float, default=1.0, help="TextLocator sorgu hedefi (p95)")
+    args = ap.parse_args()
+
+    store = ChunkStore(args.workspace)
+    chunks = [c for cat in ("genel", "mevzuat", "ozel") for c in store.iter_chunks(cat)]
+    source = store.source_file or chunks[0]["source_file"]
+    with open(os.path.join(args.workspace, "clean_txt", source), encoding="utf-8") as f:
+        full_text = f.read()
+
+    # --- kurulum ---------------------------------------------------------
+    t0 = time.perf_counter()
+    norm_full = normalize(full_text)
+    legacy_build = time.perf_counter() - t0
+
+    rng = random.Random(args.seed)
+    if args.noise > 0:
+        pool = chunks
+    else:
+        pool = [c for c in chunks if norm_full.find(normalize(c["chunk_text"])) == -1]
+    sample = rng.sample(pool, min(args.samples, len(pool)))
+    queries = [perturb(c["chunk_text"], args.noise, rng) for c in sample]
+    print(f"📄 {source}: {len(full_text):,} karakter, {len(chunks)} chunk "
+          f"({len(pool)} aday), {len(queries)} sorgu (gürültü %{args.noise * 100:.0f})")
+    if not queries:
+        print("⚠️ Bulanık eşleşme gerektiren chunk yok; --noise ile deneyin.")
+        return
+
+    t0 = time.perf_counter()
+    locator = TextLocator(full_text)
+    locator_build = time.perf_counter() - t0
+
+    # --- sorgular ----------------------------------------------------------
+    legacy_times, locator_times, verify_times = [], [], []
+    text_locator.SequenceMatcher = TimedMatcher
+    legacy_found = locator_found = agree = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        li = legacy_locate(q, norm_full)
+        legacy_times.append(time.perf_counter() - t0)
+
+        TimedMatcher.seconds = 0.0
+        t0 = time.perf_counter()
+        span = locator.locate(q)
+        locator_times.append(time.perf_counter() - t0)
+        verify_times.append(TimedMatcher.seconds)
+
+        legacy_found += li != -1
+        locator_found += span is not None
+        if li != -1 and span is not None:
+            # eski yöntem normalize ofset döndürür; ham ofsete çevir
+            agree += abs(locator._raw_pos[li] - span[0]) <= 100
+
+    def _row(name, build, times, found):
+        ms = [t * 1000 for t in times]
+        print(f"{name:<14} kurulum {build * 1000:8.1f} ms | sorgu ort {statistics.mean(ms):9.3f} ms"
+              f"  p95 {percentile(ms, 95):9.3f} ms | bulunan {found}/{len(times)}")
+
+    print()
+    _row("sliding-window", legacy_build, legacy_times, legacy_found)
+    _row("TextLocator", locator_build, locator_times, locator_found)
+    verify_ms = [t * 1000 for t in verify_times]
+    rest_ms = [(t - v) * 1000 for t, v in zip(locator_times, verify_times)]
+    print(f"{'  doğrulama':<14} {'':>19} | sorgu ort {statistics.mean(verify_ms):9.3f} ms"
+          f"  p95 {percentile(verify_ms, 95):9.3f} ms | SequenceMatcher")
+    print(f"{'  oylama+diğer':<14} {'':>19} | sorgu ort {statistics.mean(rest_ms):9.3f} ms"
+          f"  p95 {percentile(rest_ms, 95):9.3f} ms |")
+
+    locator_p95 = percentile([t * 1000 for t in locator_times], 95)
+    gap = locator_p95 - args.target_ms
+    if gap > 0:
+        print(f"\n🎯 Hedef p95 < {args.target_ms:g} ms: karşılanmadı (+{gap:.3f} ms); "
+              f"doğrulama p95 {percentile(verify_ms, 95):.3f} ms")
+    else:
+        print(f"\n🎯 Hedef p95 < {args.target_ms:g} ms: karşılandı ({locator_p95:.3f} ms)")
+    print(f"🔎 İki yöntemin de bulduğu sorgularda ±100 karakter uyum: {agree}")
+    print(f"⚡ Hızlanma (sorgu ortalaması): "
+          f"{statistics.mean(legacy_times) / statistics.mean(locator_times):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
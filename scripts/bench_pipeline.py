@@ -0,0 +1,355 @@
+# Pipeline aşamalarının tekrarlanabilir benchmark'ı: sentetik rapor PDF'leri
+# üretir, her aşamayı ayrı ayrı ölçer (süre, hız, tepe bellek) ve kayıtlı
+# bir referans (baseline) JSON'la karşılaştırıp gerilemeleri işaretler.
+#
+# Kullanım:
+#   python scripts/bench_pipeline.py                              # 20 ve 100 sayfa, sahte embedder
+#   python scripts/bench_pipeline.py --pages 50 200 --repeat 5
+#   python scripts/bench_pipeline.py --baseline                   # kayıtlı referansla; gerileme → çıkış kodu 1
+#   python scripts/bench_pipeline.py --baseline başka_ref.json
+#   python scripts/bench_pipeline.py --save-baseline scripts/bench_baseline.json
+#   python scripts/bench_pipeline.py --embedder sentence-transformers/all-MiniLM-L6-v2
+#
+# Rapor ve sorular synthetic_report.py ile üretilir (numaralı başlıklar,
+# CID fontla yazılmış metin); aynı --seed aynı PDF'i ve soruları verir.
+#
+# Ölçülen aşamalar: pdf_to_txt, clean_txt, create_chunks,
+# create_faiss_for_chunks, vectorize_soru_yordam, ask_all, expand_chunk,
+# generate_all_prompts. Süre, --repeat çalıştırmanın medyanıdır; tepe bellek
+# (tracemalloc – Python + numpy ayırmaları, FAISS'in C++ belleği hariç) ayrı
+# bir çalıştırmada ölçülür ki izleme yükü süreleri bozmasın.
+#
+# Süreç tepe RSS'i (meta.max_rss_mb) yalnızca `resource` modülü olan
+# sistemlerde (Linux/macOS) raporlanır; Windows'ta None yazılır.
+#
+# Referans: scripts/bench_baseline.json, varsayılan ayarlarla (hash embedder,
+# 20/100 sayfa, --repeat 3) üretilip depoya eklenmiştir; hangi makinede
+# ölçüldüğü meta alanındadır (platform, machine, processor, cpu_count).
+# Süreler makineye bağlıdır: başka bir makinede önce aynı komutla
+# --save-baseline çalıştırıp kendi referansınızla karşılaştırın. Kod
+# değişikliği beklenen bir hızlanma/yavaşlama getiriyorsa referansı
+# aynı commit'te yeniden üretin.
+#
+# Varsayılan embedder deterministik "hash" embedder'dır (model indirmez,
+# makineden bağımsız); model_registry'ye kaydedilir, pipeline kodu
+# değişmeden onu kullanır. Embedding önbelleği ölçüm boyunca kapatılır.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource                       # yalnızca Unix
+except ImportError:                       # Windows
+    resource = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["EMBED_CACHE"] = "0"           # her tekrar gerçekten encode etsin
+
+from app.pipeline.chunk_store import ChunkStore                          # noqa: E402
+from app.pipeline.cid_cleaner import clean_txt                           # noqa: E402
+from app.pipeline.chunk_creator import create_chunks                     # noqa: E402
+from app.pipeline.expand_top10_chunks import expand_chunk                # noqa: E402
+from app.pipeline.faiss_creator import DATASETS, create_faiss_for_chunks  # noqa: E402
+from app.pipeline.gpt_prompt_builder import generate_all_prompts         # noqa: E402
+from app.pipeline.index_factory import current_spec                      # noqa: E402
+from app.pipeline.model_registry import registry                         # noqa: E402
+from app.pipeline.pdf_to_text import pdf_to_txt                          # noqa: E402
+from app.pipeline.search_faiss_top_chunks import ask_all                 # noqa: E402
+from app.pipeline.soru_yordam_embedder import vectorize_soru_yordam      # noqa: E402
+from synthetic_report import make_pdf, questions, report_pages           # noqa: E402
+
+FAKE_MODEL = "bench/hash-embedder"
+DEFAULT_BASELINE = Path(__file__).with_name("bench_baseline.json")
+STAGES = ["pdf_to_txt", "clean_txt", "create_chunks", "create_faiss_for_chunks",
+          "vectorize_soru_yordam", "ask_all", "expand_chunk", "generate_all_prompts"]
+
+
+# ------------------------------------------------------------------
+#  Deterministik sahte embedder
+# ------------------------------------------------------------------
+class HashEmbedder:
+    """Kelime özetlerini (crc32) işaretli olarak `dim` kovaya dağıtır.
+
+    SentenceTransformer.encode imzasını taklit eder; aynı metin her
+    makinede aynı vektörü verir, ortak kelimeli metinler benzer çıkar.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True,
+               normalize_embeddings=True, show_progress_bar=False, **_):
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                h = zlib.crc32(word.encode("utf-8"))
+                out[i, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            out /= norms
+        return out
+
+
+# ------------------------------------------------------------------
+#  Ölçüm
+# ------------------------------------------------------------------
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def run_once(pdf_path: Path, q_path: Path, ws: Path, args, trace_memory: bool) -> dict:
+    """Tüm aşamaları temiz bir workspace'te sırayla çalıştırır."""
+    if ws.exists():
+        shutil.rmtree(ws)
+    ws.mkdir(parents=True)
+    raw = ws / "raw_txt" / f"{pdf_path.stem}.txt"
+    clean = ws / "clean_txt" / f"{pdf_path.stem}.txt"
+
+    steps = [
+        ("pdf_to_txt", lambda: pdf_to_txt(str(pdf_path), str(ws), workers=args.pdf_workers)),
+        ("clean_txt", lambda: clean_txt(str(raw), str(ws))),
+        ("create_chunks", lambda: create_chunks(str(clean), str(ws))),
+        ("create_faiss_for_chunks", lambda: create_faiss_for_chunks(str(ws), args.embedder)),
+        ("vectorize_soru_yordam", lambda: vectorize_soru_yordam(str(q_path), str(ws), args.embedder)),
+        ("ask_all", lambda: ask_all(str(ws), top_k=args.top_k, model_name=args.embedder)),
+        ("expand_chunk", lambda: expand_chunk(str(ws), top_k=args.top_k)),
+        ("generate_all_prompts", lambda: generate_all_prompts(ws, top_k=args.top_k)),
+    ]
+    out = {}
+    for name, fn in steps:
+        if trace_memory:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        with _quiet(not args.verbose):
+            fn()
+        elapsed = time.perf_counter() - t0
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        out[name] = {"seconds": elapsed, "peak_bytes": peak}
+    return out
+
+
+def _max_rss_mb() -> float | None:
+    """Sürecin tepe RSS'i (MB); `resource` yoksa (Windows) None."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS bayt döndürür
+    return round(rss / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+
+def _processor() -> str:
+    """CPU modeli; Linux'ta platform.processor() çoğu zaman boş döner."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def work_units(ws: Path, pdf_path: Path, n_pages: int, n_questions: int) -> dict:
+    """Aşama başına hız birimi ve miktarı."""
+    raw = ws / "raw_txt" / f"{pdf_path.stem}.txt"
+    store = ChunkStore(str(ws))
+    chunks = sum(store.count(ds) for ds in DATASETS)
+    sentences = len(store.offsets)
+    store.close()
+    cids = raw.read_text(encoding="utf-8").count("(cid:")
+    return {
+        "pdf_to_txt": (n_pages, "pages"),
+        "clean_txt": (raw.stat().st_size / 1e6, "MB"),
+        "create_chunks": (sentences, "sentences"),
+        "create_faiss_for_chunks": (chunks, "chunks"),
+        "vectorize_soru_yordam": (n_questions, "questions"),
+        "ask_all": (n_questions, "questions"),
+        "expand_chunk": (n_questions, "questions"),
+        "generate_all_prompts": (n_questions, "questions"),
+        "_counts": {"sentences": sentences, "chunks": chunks, "cid_tokens": cids},
+    }
+
+
+def bench_size(n_pages: int, workdir: Path, args) -> dict:
+    pdf_path = workdir / f"bench_{n_pages}p.pdf"
+    q_path = workdir / f"bench_{n_pages}p_questions.json"
+    make_pdf(pdf_path, report_pages(n_pages, args.seed), args.seed, args.cid_ratio)
+    q_path.write_text(json.dumps(questions(args.questions, args.seed), ensure_ascii=False), encoding="utf-8")
+    ws = workdir / f"ws_{n_pages}p"
+
+    runs = [run_once(pdf_path, q_path, ws, args, trace_memory=False) for _ in range(args.repeat)]
+    memory = None if args.no_memory else run_once(pdf_path, q_path, ws, args, trace_memory=True)
+    units = work_units(ws, pdf_path, n_pages, args.questions)
+
+    stages = {}
+    for name in STAGES:
+        times = [r[name]["seconds"] for r in runs]
+        median = statistics.median(times)
+        amount, unit = units[name]
+        stages[name] = {
+            "seconds": round(median, 4),
+            "min_seconds": round(min(times), 4),
+            "throughput": round(amount / median, 2) if median > 0 else None,
+            "unit": f"{unit}/s",
+            "peak_mb": round(memory[name]["peak_bytes"] / 2**20, 2) if memory else None,
+        }
+    total = sum(s["seconds"] for s in stages.values())
+    return {"pdf_bytes": pdf_path.stat().st_size, **units["_counts"],
+            "total_seconds": round(total, 4), "stages": stages}
+
+
+# ------------------------------------------------------------------
+#  Referans karşılaştırma
+# ------------------------------------------------------------------
+def compare(current: dict, baseline: dict, args) -> list:
+    """Gerileyen (sayfa, aşama, ölçü) satırları."""
+    regressions = []
+    print(f"\n{'sayfa':>6} {'aşama':<24} {'süre':>9} {'ref':>9} {'Δ%':>7} {'bellek':>9} {'ref':>9}")
+    for pages, cur in current["results"].items():
+        base = baseline.get("results", {}).get(pages)
+        if base is None:
+            print(f"{pages:>6} (referansta yok)")
+            continue
+        for name, c in cur["stages"].items():
+            b = base["stages"].get(name)
+            if b is None:
+                continue
+            delta = (c["seconds"] - b["seconds"]) / b["seconds"] * 100 if b["seconds"] else 0.0
+            slow = (c["seconds"] > b["seconds"] * (1 + args.tolerance)
+                    and c["seconds"] - b["seconds"] > args.min_delta)
+            mem_up = (c["peak_mb"] is not None and b.get("peak_mb") is not None
+                      and c["peak_mb"] > b["peak_mb"] * (1 + args.mem_tolerance)
+                      and c["peak_mb"] - b["peak_mb"] > 1.0)
+            flag = " ⚠️ süre" if slow else ""
+            flag += " ⚠️ bellek" if mem_up else ""
+            mem = f"{c['peak_mb']:.1f}MB" if c["peak_mb"] is not None else "-"
+            bmem = f"{b['peak_mb']:.1f}MB" if b.get("peak_mb") is not None else "-"
+            print(f"{pages:>6} {name:<24} {c['seconds']:>8.3f}s {b['seconds']:>8.3f}s {delta:>+6.0f}% "
+                  f"{mem:>9} {bmem:>9}{flag}")
+            if slow:
+                regressions.append((pages, name, "seconds", b["seconds"], c["seconds"]))
+            if mem_up:
+                regressions.append((pages, name, "peak_mb", b["peak_mb"], c["peak_mb"]))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sentetik raporlarla pipeline aşama benchmark'ı")
+    ap.add_argument("--pages", type=int, nargs="+", default=[20, 100], help="sentetik rapor sayfa sayıları")
+    ap.add_argument("--questions", type=int, default=40, help="soru sayısı")
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=3, help="süre için tekrar (medyan)")
+    ap.add_argument("--seed", type=int, default=2023)
+    ap.add_argument("--cid-ratio", type=float, default=0.5,
+                    help="CID fontla yazılan ş/ğ/şt/lı oranı")
+    ap.add_argument("--embedder", default="hash",
+                    help="'hash' (deterministik sahte) veya Sentence-Transformers model adı")
+    ap.add_argument("--dim", type=int, default=384, help="hash embedder boyutu")
+    ap.add_argument("--pdf-workers", type=int, default=1,
+                    help="pdf_to_txt süreç sayısı (1 → tekrarlanabilir, alt süreç belleği yok)")
+    ap.add_argument("--no-memory", action="store_true", help="tracemalloc çalıştırmasını atla")
+    ap.add_argument("--workdir", default=None, help="çalışma klasörü (varsayılan: geçici, sonunda silinir)")
+    ap.add_argument("--output", default=None, help="sonuç JSON'unu bu dosyaya yaz")
+    ap.add_argument("--baseline", nargs="?", const=str(DEFAULT_BASELINE), default=None,
+                    help=f"karşılaştırılacak referans JSON (değersiz: {DEFAULT_BASELINE.name})")
+    ap.add_argument("--save-baseline", default=None, help="sonucu referans olarak kaydet")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="süre gerileme eşiği (oran)")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="mutlak süre eşiği (sn) – gürültüye karşı")
+    ap.add_argument("--mem-tolerance", type=float, default=0.20, help="bellek gerileme eşiği (oran)")
+    ap.add_argument("--verbose", action="store_true", help="pipeline çıktısını gizleme")
+    args = ap.parse_args()
+
+    if args.embedder == "hash":
+        args.embedder = FAKE_MODEL
+        registry.register(FAKE_MODEL, HashEmbedder(args.dim))
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    result = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": _processor(),
+            "cpu_count": os.cpu_count(),
+            "embedder": args.embedder,
+            "dim": args.dim if args.embedder == FAKE_MODEL else None,
+            "index": current_spec().as_dict(),
+            "questions": args.questions,
+            "top_k": args.top_k,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "cid_ratio": args.cid_ratio,
+            "pdf_workers": args.pdf_workers,
+        },
+        "results": {},
+    }
+    try:
+        for n_pages in args.pages:
+            print(f"\n📄 {n_pages} sayfa …")
+            res = bench_size(n_pages, workdir, args)
+            result["results"][str(n_pages)] = res
+            print(f"   {res['sentences']} cümle, {res['chunks']} chunk, {res['cid_tokens']} CID belirteci")
+            for name, s in res["stages"].items():
+                mem = f"{s['peak_mb']:8.1f} MB" if s["peak_mb"] is not None else ""
+                print(f"   {name:<24} {s['seconds']:8.3f}s  {s['throughput'] or 0:>12,.1f} {s['unit']:<14}{mem}")
+            print(f"   {'toplam':<24} {res['total_seconds']:8.3f}s")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result["meta"]["max_rss_mb"] = _max_rss_mb()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 Referans kaydedildi → {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        base_meta = baseline.get("meta", {})
+        if base_meta.get("embedder") != result["meta"]["embedder"]:
+            print("⚠️  Referans farklı bir embedder ile ölçülmüş; karşılaştırma anlamsız olabilir")
+        if any(base_meta.get(k) != result["meta"][k] for k in ("processor", "cpu_count")):
+            print(f"⚠️  Referans başka bir makinede ölçülmüş ({base_meta.get('processor')}, "
+                  f"{base_meta.get('cpu_count')} CPU); süreleri kendi --save-baseline "
+                  f"referansınızla karşılaştırın")
+        regressions = compare(result, baseline, args)
+        if regressions:
+            print(f"\n❌ {len(regressions)} gerileme:")
+            for pages, name, metric, old, new in regressions:
+                print(f"   {pages} sayfa / {name}: {metric} {old} → {new}")
+            sys.exit(1)
+        print("\n✅ Gerileme yok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# Benchmark / yük testi betiklerinin ortak yüzdelik hesabı.
+# bench_faiss_index.py, bench_locator.py, load_test.py ve mock_llm_server.py
+# aynı tanımı kullanır ki raporlardaki p50/p95/p99 karşılaştırılabilir olsun.
+
+
+def percentile(values, p: float):
+    """Doğrusal aralıklı yüzdelik (numpy 'linear' ile aynı); boş girdi → None."""
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
@@ -0,0 +1,186 @@
+# /v1/process uçtan uca yük testi: N eşzamanlı yükleme, gecikme
+# yüzdelikleri (p50/p95/p99), verim ve hata oranları.
+#
+# Kullanım (gerçek OpenAI yerine sahte sunucu ile):
+#   python scripts/mock_llm_server.py --port 9100 --latency-ms 800 --rate-limit-rate 0.05 &
+#   OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=mock uvicorn app.main:app --port 8000 &
+#   python scripts/load_test.py --requests 24 --concurrency 6 --pages 10 \
+#          --mock-url http://127.0.0.1:9100 --output load.json
+#
+# Her istek kendi sentetik raporunu yükler (synthetic_report.py, istek başına
+# farklı seed ve dosya adı). Aynı PDF tekrar tekrar gönderilseydi aşama,
+# embedding ve LLM önbellekleri ölçümü anlamsızlaştırırdı. Gerçek bir
+# rapor --pdf ile verilebilir; o durumda yalnızca dosya adı benzersizleşir
+# (içerik aynı olduğu için embedding/LLM önbelleği isabet eder).
+#
+# --mock-url verilirse sahte sunucunun /stats sayaçları test başında
+# sıfırlanır ve sonunda LLM tarafı (istek, 429/500, token) raporlanır.
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_stats import percentile                     # noqa: E402
+from synthetic_report import questions, write_report   # noqa: E402
+
+
+def prepare_inputs(args, workdir: Path):
+    """İstek başına (dosya adı, pdf baytları, soru JSON'u)."""
+    inputs = []
+    q_json = json.dumps([{"soru": q["soru"], "yordam": q["yordam"]}
+                         for q in questions(args.questions, args.seed)], ensure_ascii=False)
+    if args.pdf:
+        data = Path(args.pdf).read_bytes()
+        stem = Path(args.pdf).stem
+        return [(f"{stem}_lt{args.seed}_{i}.pdf", data, q_json) for i in range(args.requests)]
+
+    print(f"📄 {args.requests} sentetik rapor üretiliyor ({args.pages} sayfa) …")
+    for i in range(args.requests):
+        path = write_report(workdir / f"loadtest_{args.seed}_{i}.pdf", args.pages, seed=args.seed * 1000 + i)
+        inputs.append((path.name, path.read_bytes(), q_json))
+    return inputs
+
+
+async def run(args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="load_test_") as tmp:
+        inputs = prepare_inputs(args, Path(tmp))
+
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+        mock = httpx.AsyncClient(base_url=args.mock_url, timeout=10.0) if args.mock_url else None
+        if mock is not None:
+            await mock.post("/stats/reset")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in inputs:
+            queue.put_nowait(item)
+        records = []
+
+        async def worker():
+            while True:
+                try:
+                    name, data, q_json = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                t0 = time.perf_counter()
+                record = {"file": name}
+                try:
+                    resp = await client.post(
+                        args.endpoint,
+                        data={"questions": q_json},
+                        files={"pdf_file": (name, data, "application/pdf")},
+                    )
+                    record["status"] = resp.status_code
+                    if resp.status_code == 200:
+                        body = resp.json()
+                        record["answers"] = body.get("count", 0)
+                        statuses = [r.get("status") for r in body.get("results", [])]
+                        record["not_found"] = statuses.count("answer_notfound")
+                        record["failed_answers"] = statuses.count("answer_failed")
+                    else:
+                        record["error"] = resp.text[:200]
+                except httpx.HTTPError as exc:
+                    record["status"] = type(exc).__name__
+                    record["error"] = str(exc)[:200]
+                record["seconds"] = time.perf_counter() - t0
+                records.append(record)
+                mark = "✓" if record["status"] == 200 else "✗"
+                print(f"{mark} {name}  {record['status']}  {record['seconds']:.2f}s")
+
+        print(f"🚀 {len(inputs)} istek, {args.concurrency} eşzamanlı → {args.url}{args.endpoint}")
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - started
+
+        mock_stats = None
+        if mock is not None:
+            mock_stats = (await mock.get("/stats")).json()
+            await mock.aclose()
+
+    ok = [r for r in records if r["status"] == 200]
+    latencies = [r["seconds"] for r in ok]
+    by_status = {}
+    for r in records:
+        by_status[str(r["status"])] = by_status.get(str(r["status"]), 0) + 1
+    answered = sum(r.get("answers", 0) for r in ok)
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "wall_seconds": round(wall, 3),
+        "requests": len(records),
+        "succeeded": len(ok),
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else None,
+        "by_status": by_status,
+        "throughput": {
+            "requests_per_s": round(len(ok) / wall, 3) if wall else None,
+            "answers_per_s": round(answered / wall, 3) if wall else None,
+        },
+        "latency_s": {
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "mean": _round(statistics.fmean(latencies)) if latencies else None,
+            "max": _round(max(latencies)) if latencies else None,
+        },
+        "not_found_answers": sum(r.get("not_found", 0) for r in ok),
+        "failed_answers": sum(r.get("failed_answers", 0) for r in ok),
+        "llm": mock_stats,
+        "records": records,
+    }
+
+
+def _round(x):
+    return round(x, 3) if x is not None else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="/v1/process yük testi")
+    ap.add_argument("--url", default="http://127.0.0.1:8000", help="API kök adresi")
+    ap.add_argument("--endpoint", default="/v1/process")
+    ap.add_argument("--requests", type=int, default=20, help="toplam istek (rapor) sayısı")
+    ap.add_argument("--concurrency", type=int, default=4, help="aynı anda açık istek")
+    ap.add_argument("--pages", type=int, default=10, help="sentetik rapor sayfa sayısı")
+    ap.add_argument("--questions", type=int, default=10, help="rapor başına soru")
+    ap.add_argument("--pdf", default=None, help="sentetik yerine bu PDF'i gönder")
+    ap.add_argument("--seed", type=int, default=int(time.time()) % 100_000,
+                    help="rapor/dosya adı tohumu (varsayılan: zamana göre → önbellek isabeti yok)")
+    ap.add_argument("--timeout", type=float, default=900.0, help="istek başına zaman aşımı (sn)")
+    ap.add_argument("--mock-url", default=None, help="mock_llm_server kök adresi (/stats için)")
+    ap.add_argument("--output", default=None, help="sonuç JSON dosyası")
+    args = ap.parse_args()
+
+    result = asyncio.run(run(args))
+
+    lat = result["latency_s"]
+    print(f"\n📊 {result['succeeded']}/{result['requests']} başarılı "
+          f"(hata oranı %{(result['error_rate'] or 0) * 100:.1f}) – durumlar: {result['by_status']}")
+    print(f"   süre {result['wall_seconds']:.1f}s  |  {result['throughput']['requests_per_s']} istek/sn, "
+          f"{result['throughput']['answers_per_s']} cevap/sn")
+    if result["failed_answers"]:
+        print(f"   ⚠️  {result['failed_answers']} cevap LLM hatası nedeniyle üretilemedi")
+    print(f"   gecikme p50 {lat['p50']}s  p95 {lat['p95']}s  p99 {lat['p99']}s  (maks {lat['max']}s)")
+    if result["llm"]:
+        llm = result["llm"]
+        print(f"   LLM: {llm['requests']} istek {llm['by_status']}, "
+              f"{llm['prompt_tokens']} prompt + {llm['completion_tokens']} tamamlama token'ı, "
+              f"en fazla {llm['max_in_flight']} eşzamanlı, p95 {llm['latency_ms']['p95']} ms")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 {args.output}")
+    sys.exit(0 if result["succeeded"] == result["requests"] else 1)
+
+
+if __name__ == "__main__":
+    main()
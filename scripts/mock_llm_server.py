@@ -0,0 +1,272 @@
+# OpenAI uyumlu yerel sahte LLM sunucusu (POST /v1/chat/completions).
+# sender.py'yi gerçek API'ye gitmeden eşzamanlılık / hata / yük altında
+# denemek için.
+#
+# Kullanım:
+#   python scripts/mock_llm_server.py --port 9100 --latency lognormal --latency-ms 900 \
+#          --error-rate 0.02 --rate-limit-rate 0.05 --rpm 600
+#   OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=mock uvicorn app.main:app
+#
+# openai SDK'sı OPENAI_BASE_URL'i kendiliğinden okur; hem app/pipeline/sender.py
+# hem app/services/sender.py ek ayar olmadan bu sunucuya gider.
+#
+# Gecikme = dağılımdan örnek + tamamlama token'ı başına --ms-per-token.
+#   fixed      : tam --latency-ms
+#   uniform    : [latency-ms − jitter, latency-ms + jitter]
+#   normal     : ortalama latency-ms, std jitter (0'da kırpılır)
+#   lognormal  : medyan latency-ms, --sigma (uzun kuyruk – gerçek API'ye en yakın)
+#   exponential: ortalama latency-ms
+#
+# Hata enjeksiyonu: --error-rate oranında 500, --rate-limit-rate oranında 429
+# (Retry-After başlığıyla). --rpm > 0 ise dakika başına istek sınırı aşıldığında
+# da 429 döner (kayan pencere).
+#
+# Token hesabı: prompt token'ları prompt_packer.count_tokens ile (tiktoken
+# varsa gerçek kodlama) sayılır ve yanıtın `usage` alanında döner.
+# GET /stats sayaçları ve gecikme yüzdeliklerini verir; POST /stats/reset sıfırlar.
+#
+# Akış (stream=true) desteklenmez; 400 döner.
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.pipeline.prompt_packer import count_tokens   # noqa: E402
+from bench_stats import percentile                     # noqa: E402
+
+ANSWER_SENTENCES = [
+    "Yordamda belirtilen kriterler rapordaki ilgili bölümler üzerinden değerlendirilmiştir.",
+    "Ar-Ge merkezinin bu başlıktaki faaliyetleri büyük ölçüde karşılanmaktadır {ref}.",
+    "Personel ve proje bilgileri tutarlı biçimde raporlanmıştır {ref}.",
+    "Bazı göstergeler için sayısal hedef verilmediğinden değerlendirme sınırlı kalmıştır.",
+    "Eksik husus olarak dönemsel karşılaştırma tablosunun eklenmesi önerilir {ref}.",
+    "İşbirliği ve fikri mülkiyet çıktıları ayrıca belgelenmelidir.",
+]
+
+
+class MockConfig:
+    def __init__(self, args):
+        self.latency = args.latency
+        self.latency_ms = args.latency_ms
+        self.jitter_ms = args.jitter_ms
+        self.sigma = args.sigma
+        self.ms_per_token = args.ms_per_token
+        self.completion_tokens = args.completion_tokens
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.retry_after = args.retry_after
+        self.rpm = args.rpm
+        self.not_found_rate = args.not_found_rate
+        self.rng = random.Random(args.seed)
+
+    def sample_latency(self) -> float:
+        """Saniye cinsinden taban gecikme."""
+        mean, rng = self.latency_ms, self.rng
+        if self.latency == "fixed":
+            ms = mean
+        elif self.latency == "uniform":
+            ms = rng.uniform(mean - self.jitter_ms, mean + self.jitter_ms)
+        elif self.latency == "normal":
+            ms = rng.gauss(mean, self.jitter_ms)
+        elif self.latency == "lognormal":
+            ms = rng.lognormvariate(0.0, self.sigma) * mean
+        else:                                   # exponential
+            ms = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        return max(0.0, ms) / 1000
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.requests = 0
+            self.by_status = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.latencies = deque(maxlen=100_000)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            lat = list(self.latencies)
+            elapsed = max(time.time() - self.started, 1e-9)
+
+            def pct(p):
+                return round(percentile(lat, p) * 1000, 1) if lat else None
+
+            return {
+                "uptime_s": round(elapsed, 1),
+                "requests": self.requests,
+                "by_status": dict(self.by_status),
+                "requests_per_s": round(self.requests / elapsed, 2),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99),
+                               "mean": round(statistics.fmean(lat) * 1000, 1) if lat else None},
+            }
+
+
+def _error(status: int, message: str, err_type: str, headers=None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": err_type, "param": None, "code": None}},
+                        status_code=status, headers=headers)
+
+
+def _answer(prompt: str, cfg: MockConfig, rng: random.Random) -> str:
+    """Prompt'tan deterministik, atıflı Türkçe cevap."""
+    seed = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8], 16)
+    local = random.Random(seed)
+    if cfg.not_found_rate and rng.random() < cfg.not_found_rate:
+        return "Bilgi bulunamadı."
+    parts, tokens = [], 0
+    while tokens < cfg.completion_tokens:
+        sentence = local.choice(ANSWER_SENTENCES).format(ref=f"[{local.randint(1, 12)}]")
+        parts.append(sentence)
+        tokens += count_tokens(sentence)
+    return " ".join(parts)
+
+
+def create_app(cfg: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI", version="0.1.0")
+    stats = Stats()
+    window = deque()                            # --rpm için son 60 sn'deki istek zamanları
+    window_lock = threading.Lock()
+
+    def _over_rpm() -> bool:
+        if cfg.rpm <= 0:
+            return False
+        now = time.monotonic()
+        with window_lock:
+            while window and now - window[0] > 60:
+                window.popleft()
+            if len(window) >= cfg.rpm:
+                return True
+            window.append(now)
+            return False
+
+    def _count(status: int):
+        with stats.lock:
+            stats.requests += 1
+            stats.by_status[str(status)] = stats.by_status.get(str(status), 0) + 1
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "mock"}
+                                            for m in ("gpt-4o-mini", "gpt-4o")]}
+
+    @app.get("/stats")
+    def get_stats():
+        return stats.snapshot()
+
+    @app.post("/stats/reset")
+    def reset_stats():
+        stats.reset()
+        return {"status": "ok"}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            _count(400)
+            return _error(400, "stream=true is not supported by the mock server", "invalid_request_error")
+        messages = body.get("messages") or []
+        model = body.get("model", "gpt-4o-mini")
+
+        if _over_rpm():
+            _count(429)
+            return _error(429, f"Rate limit reached: {cfg.rpm} RPM", "rate_limit_exceeded",
+                          {"retry-after": str(cfg.retry_after)})
+        roll = cfg.rng.random()
+        if roll < cfg.rate_limit_rate:
+            _count(429)
+            return _error(429, "Rate limit reached (injected)", "rate_limit_exceeded",
+                          {"retry-after": str(cfg.retry_after)})
+
+        prompt_text = "\n".join(str(m.get("content", "")) for m in messages)
+        prompt_tokens = count_tokens(prompt_text, model) + 4 * len(messages)
+        content = _answer(prompt_text, cfg, cfg.rng)
+        completion_tokens = count_tokens(content, model)
+
+        with stats.lock:
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        t0 = time.perf_counter()
+        try:
+            await asyncio.sleep(cfg.sample_latency() + completion_tokens * cfg.ms_per_token / 1000)
+        finally:
+            with stats.lock:
+                stats.in_flight -= 1
+                stats.latencies.append(time.perf_counter() - t0)
+
+        # 500'ler gecikmeden sonra – gerçek API'de de bekletip düşer
+        if roll < cfg.rate_limit_rate + cfg.error_rate:
+            _count(500)
+            return _error(500, "The server had an error while processing your request (injected)",
+                          "server_error")
+
+        _count(200)
+        with stats.lock:
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+        return {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "logprobs": None, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OpenAI uyumlu sahte LLM sunucusu")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--latency", default="lognormal",
+                    choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    ap.add_argument("--latency-ms", type=float, default=800, help="ortalama/medyan gecikme (ms)")
+    ap.add_argument("--jitter-ms", type=float, default=200, help="uniform/normal yayılımı (ms)")
+    ap.add_argument("--sigma", type=float, default=0.5, help="lognormal sigma")
+    ap.add_argument("--ms-per-token", type=float, default=0.0, help="tamamlama token'ı başına ek gecikme")
+    ap.add_argument("--completion-tokens", type=int, default=120, help="yaklaşık cevap uzunluğu (token)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="500 oranı")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="enjekte 429 oranı")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="429'da Retry-After (sn)")
+    ap.add_argument("--rpm", type=int, default=0, help="dakika başına istek sınırı (0 → yok)")
+    ap.add_argument("--not-found-rate", type=float, default=0.0, help="'Bilgi bulunamadı.' oranı")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    cfg = MockConfig(args)
+    print(f"🤖 Mock LLM → http://{args.host}:{args.port}/v1  "
+          f"(gecikme {args.latency} {args.latency_ms:.0f} ms, 500 %{args.error_rate * 100:.1f}, "
+          f"429 %{args.rate_limit_rate * 100:.1f}, rpm {args.rpm or '∞'})")
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# Sentetik Türkçe Ar-Ge faaliyet raporu (PDF) ve soru-yordam listesi üretir.
+# bench_pipeline.py ve load_test.py tarafından kullanılır; harici bağımlılık
+# gerektirmez.
+#
+# Kullanım:
+#   python scripts/synthetic_report.py rapor.pdf --pages 40 [--seed 7] [--questions q.json]
+#
+# Rapor: numaralı bölüm başlıkları (1. GİRİŞ, 2.3 …), sayfa üst bilgisi ve
+# şablonlardan kurulan paragraflar. Metnin bir kısmı ToUnicode'suz bir
+# Type0/Identity-H fontla yazılır; pdfplumber bunları gerçek raporlardaki
+# gibi "(cid:109)" olarak çıkarır ve clean_txt CID_MAP ile geri çevirir.
+# Aynı seed aynı PDF'i ve soruları üretir.
+
+import argparse
+import json
+import random
+import zlib
+from pathlib import Path
+
+
+# ------------------------------------------------------------------
+#  Sentetik rapor metni
+# ------------------------------------------------------------------
+SECTIONS = [
+    ("GİRİŞ", ["Ar-Ge Merkezinin Amacı", "Kapsam ve Yöntem"]),
+    ("AR-GE MERKEZİNİN YAPISI", ["Organizasyon Şeması", "Fiziki Altyapı", "Bilgi Güvenliği"]),
+    ("PERSONEL", ["Tam Zaman Eşdeğer Personel", "Eğitim Faaliyetleri", "Doktoralı Araştırmacılar"]),
+    ("PROJELER", ["Devam Eden Projeler", "Tamamlanan Projeler", "Proje Yönetim Süreci"]),
+    ("FİKRİ MÜLKİYET", ["Patent Başvuruları", "Tescilli Tasarımlar"]),
+    ("İŞBİRLİKLERİ", ["Üniversite İşbirlikleri", "Uluslararası Programlar"]),
+    ("MALİ BİLGİLER", ["Ar-Ge Harcamaları", "Teşvik ve Destekler"]),
+    ("SONUÇ VE DEĞERLENDİRME", ["Hedeflerin Gerçekleşme Durumu", "Gelecek Dönem Planları"]),
+]
+SUBJECTS = ["Ar-Ge merkezimiz", "Proje ekibimiz", "Şirketimiz", "Araştırmacılarımız",
+            "Teknik birimimiz", "Mühendislik grubumuz", "Yönetim kurulumuz", "Merkez müdürlüğü"]
+OBJECTS = ["yazılım geliştirme süreçlerini", "prototip üretim altyapısını", "ölçüm ve test düzeneklerini",
+           "patent başvuru stratejisini", "üniversite işbirliklerini", "personel eğitim planını",
+           "yeni ürün geliştirme çalışmalarını", "bilgi güvenliği politikasını",
+           "malzeme karakterizasyon yöntemlerini", "proje bütçe takibini"]
+VERBS = ["başarıyla tamamlamıştır", "yeniden yapılandırmıştır", "genişletmeyi planlamaktadır",
+         "düzenli olarak değerlendirmektedir", "önemli ölçüde iyileştirmiştir",
+         "TÜBİTAK desteğiyle yürütmektedir", "dönem içinde raporlamıştır"]
+DETAILS = ["bu çalışma kapsamında {n} adet iş paketi oluşturulmuştur",
+           "toplam bütçe {n} bin TL olarak gerçekleşmiştir",
+           "{n} tam zaman eşdeğer araştırmacı görev almıştır",
+           "sonuçlar {n} sayfalık teknik raporda özetlenmiştir",
+           "ölçümlerde yüzde {n} oranında verim artışı sağlanmıştır",
+           "{n} kişilik ekip dışarıdan danışmanlık almıştır"]
+LINE_CHARS = 92
+LINES_PER_PAGE = 62
+
+
+def _sentence(rng: random.Random) -> str:
+    s = f"{rng.choice(SUBJECTS)} {rng.choice(OBJECTS)} {rng.choice(VERBS)}"
+    if rng.random() < 0.6:
+        s += "; " + rng.choice(DETAILS).format(n=rng.randint(2, 480))
+    return s + "."
+
+
+def _wrap(text: str, width: int = LINE_CHARS):
+    line = ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            yield line
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        yield line
+
+
+def report_pages(n_pages: int, seed: int):
+    """Sayfa başına satır listeleri (numaralı başlıklar + paragraflar)."""
+    rng = random.Random(seed)
+    headings = []
+    for i, (title, subs) in enumerate(SECTIONS, 1):
+        headings.append(f"{i}. {title}")
+        headings += [f"{i}.{j} {sub}" for j, sub in enumerate(subs, 1)]
+
+    pages, page, h = [], [], 0
+    while len(pages) < n_pages:
+        if not page:
+            page = [f"ABC Teknoloji A.Ş. Ar-Ge Merkezi – 2023 Yılı Faaliyet Raporu – Sayfa {len(pages) + 1}", ""]
+        if rng.random() < 0.25:
+            page += ["", headings[h % len(headings)]]
+            h += 1
+        paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(3, 7)))
+        page += list(_wrap(paragraph))
+        if len(page) >= LINES_PER_PAGE:
+            pages.append(page[:LINES_PER_PAGE])
+            page = page[LINES_PER_PAGE:]
+            if page:
+                page = [f"ABC Teknoloji A.Ş. Ar-Ge Merkezi – 2023 Yılı Faaliyet Raporu – Sayfa {len(pages) + 1}", ""] + page
+    return pages
+
+
+def questions(n: int, seed: int):
+    rng = random.Random(seed + 1)
+    out = []
+    for i in range(n):
+        title, subs = SECTIONS[i % len(SECTIONS)]
+        sub = rng.choice(subs)
+        out.append({
+            "id": i + 1,
+            "soru": f"Ar-Ge merkezinin {sub.lower()} konusundaki faaliyetleri yeterli midir?",
+            "yordam": f"{title.title()} bölümünde {rng.choice(OBJECTS)} ve ilgili göstergeler incelenir.",
+        })
+    return out
+
+
+# ------------------------------------------------------------------
+#  Sentetik PDF (harici bağımlılık yok)
+# ------------------------------------------------------------------
+# F1: Helvetica + WinAnsi; Türkçe harfler /Differences ile 128–133'e.
+# F2: ToUnicode'suz Type0/Identity-H → pdfplumber "(cid:N)" üretir.
+_TR_CODES = {"ı": 0x80, "İ": 0x81, "ş": 0x82, "Ş": 0x83, "ğ": 0x84, "Ğ": 0x85}
+_TR_GLYPHS = b"/dotlessi /Idotaccent /scedilla /Scedilla /gbreve /Gbreve"
+_CID_LIGATURES = [("şt", 62), ("lı", 88), ("ş", 109), ("ğ", 110)]   # cid_cleaner.CID_MAP ile uyumlu
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = bytearray()
+    for ch in text:
+        raw += bytes([_TR_CODES[ch]]) if ch in _TR_CODES else ch.encode("cp1252", "replace")
+    return b"(" + bytes(raw).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _line_ops(line: str, rng: random.Random, cid_ratio: float) -> bytes:
+    ops, buf, i = [], "", 0
+    while i < len(line):
+        for lig, code in _CID_LIGATURES:
+            if line.startswith(lig, i) and rng.random() < cid_ratio:
+                if buf:
+                    ops.append(_pdf_string(buf) + b" Tj")
+                    buf = ""
+                ops.append(b"/F2 10 Tf <%04x> Tj /F1 10 Tf" % code)
+                i += len(lig)
+                break
+        else:
+            buf += line[i]
+            i += 1
+    if buf:
+        ops.append(_pdf_string(buf) + b" Tj")
+    return b" ".join(ops) + b" T*"
+
+
+def make_pdf(path: Path, pages, seed: int, cid_ratio: float) -> None:
+    rng = random.Random(seed + 2)
+    objs = []
+
+    def add(obj: bytes) -> int:
+        objs.append(obj)
+        return len(objs)
+
+    f1 = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding << /Type /Encoding "
+             b"/BaseEncoding /WinAnsiEncoding /Differences [128 " + _TR_GLYPHS + b"] >> >>")
+    fd = add(b"<< /Type /FontDescriptor /FontName /BNCHMK+Ligatures /Flags 4 /FontBBox [0 -200 1000 800] "
+             b"/ItalicAngle 0 /Ascent 800 /Descent -200 /CapHeight 700 /StemV 80 >>")
+    cidfont = add(b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /BNCHMK+Ligatures /CIDSystemInfo "
+                  b"<< /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> /FontDescriptor %d 0 R "
+                  b"/DW 556 >>" % fd)
+    f2 = add(b"<< /Type /Font /Subtype /Type0 /BaseFont /BNCHMK+Ligatures /Encoding /Identity-H "
+             b"/DescendantFonts [%d 0 R] >>" % cidfont)
+
+    parent = len(objs) + 2 * len(pages) + 1
+    kids = []
+    for lines in pages:
+        body = (b"BT /F1 10 Tf 12.5 TL 40 805 Td "
+                + b"\n".join(_line_ops(line, rng, cid_ratio) for line in lines) + b" ET")
+        data = zlib.compress(body)
+        content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font "
+                        b"<< /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>" % (parent, f1, f2, content)))
+    assert add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids)
+               + b"] /Count %d >>" % len(kids)) == parent
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % parent)
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, catalog, xref)
+    path.write_bytes(bytes(out))
+
+
+def write_report(pdf_path, n_pages: int, seed: int = 2023, cid_ratio: float = 0.5) -> Path:
+    pdf_path = Path(pdf_path)
+    make_pdf(pdf_path, report_pages(n_pages, seed), seed, cid_ratio)
+    return pdf_path
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sentetik Ar-Ge raporu PDF'i üret")
+    ap.add_argument("pdf", help="çıktı PDF yolu")
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=2023)
+    ap.add_argument("--cid-ratio", type=float, default=0.5)
+    ap.add_argument("--questions", default=None, help="soru-yordam JSON'unu da yaz")
+    ap.add_argument("--n-questions", type=int, default=40)
+    args = ap.parse_args()
+
+    write_report(args.pdf, args.pages, args.seed, args.cid_ratio)
+    print(f"✅ {args.pdf} ({args.pages} sayfa)")
+    if args.questions:
+        Path(args.questions).write_text(
+            json.dumps(questions(args.n_questions, args.seed), ensure_ascii=False, indent=2),
+            encoding="utf-8")
+        print(f"✅ {args.questions} ({args.n_questions} soru)")
@@ -0,0 +1,20 @@
+# Testler için ortak ayarlar
+# Settings zorunlu alanları (.env olmadan) ve IndexSpec fixture'ı;
+# paylaşılan yardımcı fonksiyonlar tests/helpers.py'de
+
+import os
+
+import pytest
+
+os.environ.setdefault("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from app.pipeline import index_factory   # noqa: E402
+
+
+@pytest.fixture
+def index_spec(monkeypatch):
+    """Süreç geneli IndexSpec'i test boyunca değiştirir (test sonunda geri alınır)."""
+    def _set(**fields):
+        monkeypatch.setattr(index_factory, "_spec", index_factory.IndexSpec(**fields))
+    return _set
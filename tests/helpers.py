@@ -0,0 +1,49 @@
+# Testler arası paylaşılan yardımcılar: sahte FAISS raporları ve cümle
+# tablosundan chunk üreten fonksiyonlar (passage_merger / prompt_packer)
+
+import os
+
+import faiss
+import numpy as np
+
+DIM = 16
+SENTENCES = [f"s{i}" for i in range(40)]        # cümle başına bir kelime (= 1 "token")
+
+
+def unit_vectors(n: int, seed: int) -> np.ndarray:
+    x = np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def write_report(workspace_dir, sizes: dict, seed: int) -> dict:
+    """workspace/faiss/faiss_<kategori>.index dosyalarını yazar; {kategori: vektörler}."""
+    faiss_dir = os.path.join(workspace_dir, "faiss")
+    os.makedirs(faiss_dir, exist_ok=True)
+    vectors = {}
+    for offset, (category, n) in enumerate(sizes.items()):
+        vecs = unit_vectors(n, seed * 10 + offset)
+        index = faiss.IndexFlatIP(DIM)
+        index.add(vecs)
+        faiss.write_index(index, os.path.join(faiss_dir, f"faiss_{category}.index"))
+        vectors[category] = vecs
+    return vectors
+
+
+def span_text(start: int, end: int) -> str:
+    """ChunkStore.span_text yerine: [start, end) cümleleri."""
+    return " ".join(SENTENCES[start:end])
+
+
+def chunk(start: int, end: int, dataset: str = "genel", *, rank=1,
+          score: float | None = None, pages: tuple | None = None) -> dict:
+    """Cümle aralıklı top-k chunk'ı (`_filter_chunks` çıktısı biçiminde)."""
+    c = {"dataset": dataset, "text": span_text(start, end), "rank": rank, "score": score,
+         "chunk_index": start, "sentence_start": start, "sentence_end": end}
+    if pages:
+        c["page_start"], c["page_end"] = pages
+    return c
+
+
+def legacy_chunk(text: str, dataset: str = "genel", *, rank=1, score: float | None = None) -> dict:
+    """Eski workspace chunk'ı: cümle aralığı yok."""
+    return {"dataset": dataset, "text": text, "rank": rank, "score": score}
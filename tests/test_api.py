@@ -1,2 +1,177 @@
 # pytest ile basit entegrasyon testleri
-# Basit client.post("/v1/process") testi; CI/CD kurulunca faydalı olur
\ No newline at end of file
+# Basit client.post("/v1/process") testi; CI/CD kurulunca faydalı olur
+#
+# DELETE /v1/reports/{id}: 400 (geçersiz kimlik), 409 (aktif iş),
+# 404 (yok), 200 (dosyalar + global indeks kayıtları silinir; x silinirken
+# x_y'nin dosyalarına dokunulmaz).
+# POST /v1/search: global indeks kapalıysa 503, _global/ oluşturulmaz.
+
+import json
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import endpoints
+from app.main import app
+from app.pipeline import global_index
+from app.pipeline.global_index import GlobalIndex
+from app.services import state
+
+from .helpers import write_report
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # endpoint'ler workspace/ ve user_uploads/ yollarını çalışma dizinine göre çözer
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(global_index, "_enabled", False)
+    return TestClient(app)        # `with` yok → açılışta model yüklenmez
+
+
+@pytest.fixture
+def gindex(tmp_path, monkeypatch, index_spec):
+    index_spec(type="flat")
+    gi = GlobalIndex(str(tmp_path / "workspace" / "_global"), n_shards=2, compact_ratio=100.0)
+    monkeypatch.setattr(global_index, "_global", gi)
+    monkeypatch.setattr(global_index, "_enabled", True)
+    yield gi
+    gi._pool.shutdown()
+    gi._compactor.shutdown()
+
+
+def _make_report(tmp_path, report_id: str) -> None:
+    (tmp_path / "workspace" / report_id / "ANSWERS").mkdir(parents=True)
+    uploads = tmp_path / "user_uploads"
+    uploads.mkdir(exist_ok=True)
+    (uploads / f"{report_id}.pdf").write_bytes(b"%PDF-1.4")
+    (uploads / f"questions_{report_id}_123.json").write_text("[]")
+
+
+def test_job_answers_read_from_workspace_root(client, tmp_path, monkeypatch):
+    # cevaplar WORKSPACE_ROOT altından okunur (varsayılan "workspace" değil)
+    monkeypatch.setattr(endpoints.st, "workspace_root", str(tmp_path / "custom_ws"))
+    answers = tmp_path / "custom_ws" / "ans" / "ANSWERS"
+    answers.mkdir(parents=True)
+    (answers / "answer_1.json").write_text(json.dumps(
+        {"soru": "S1", "cevap": "Evet.", "status": "ok"}), encoding="utf-8")
+
+    job_id = state.new_job(report_id="ans")
+    state.update(job_id, status="completed", stage="done")
+    body = client.get(f"/v1/jobs/{job_id}").json()
+    assert body["count"] == 1
+    assert body["results"][0] == {"question": "S1", "answer": "Evet.",
+                                  "status": "answer_found", "error": None}
+
+
+@pytest.mark.parametrize("report_id", ["_global", "%2E%2E", "a%5Cb"])
+def test_delete_rejects_invalid_ids(client, report_id):
+    # _global: global indeks klasörü; ".." ve "a\b": workspace kökünden kaçar
+    assert client.delete(f"/v1/reports/{report_id}").status_code == 400
+
+
+def test_delete_unknown_report_is_404(client):
+    resp = client.delete("/v1/reports/missing")
+    assert resp.status_code == 404
+
+
+def test_delete_with_active_job_is_409(client, tmp_path):
+    _make_report(tmp_path, "busy")
+    job_id = state.new_job(report_id="busy")
+    try:
+        for status in ("queued", "processing"):
+            state.update(job_id, status=status)
+            assert client.delete("/v1/reports/busy").status_code == 409
+        assert (tmp_path / "workspace" / "busy").is_dir()
+        assert (tmp_path / "user_uploads" / "busy.pdf").is_file()
+
+        state.update(job_id, status="completed")
+        assert client.delete("/v1/reports/busy").status_code == 200
+    finally:
+        state.update(job_id, status="completed")
+
+
+def test_delete_removes_files(client, tmp_path):
+    _make_report(tmp_path, "r1")
+    _make_report(tmp_path, "r10")               # ön ek çakışması: dokunulmamalı
+
+    resp = client.delete("/v1/reports/r1")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["status"] == "completed" and body["removed_vectors"] == 0
+    assert len(body["removed_files"]) == 3
+    assert not (tmp_path / "workspace" / "r1").exists()
+    assert not (tmp_path / "user_uploads" / "r1.pdf").exists()
+    assert not (tmp_path / "user_uploads" / "questions_r1_123.json").exists()
+    assert (tmp_path / "workspace" / "r10").is_dir()
+    assert (tmp_path / "user_uploads" / "questions_r10_123.json").is_file()
+
+    assert client.delete("/v1/reports/r1").status_code == 404
+
+
+def test_delete_keeps_reports_sharing_an_underscore_prefix(client, tmp_path):
+    # "x" silinirken "x_y"nin soru dosyası (questions_x_y_<ns>.json) kalmalı
+    _make_report(tmp_path, "x")
+    _make_report(tmp_path, "x_y")
+
+    resp = client.delete("/v1/reports/x")
+    assert resp.status_code == 200
+    assert len(resp.json()["removed_files"]) == 3
+    assert not (tmp_path / "user_uploads" / "questions_x_123.json").exists()
+    assert (tmp_path / "user_uploads" / "questions_x_y_123.json").is_file()
+    assert (tmp_path / "user_uploads" / "x_y.pdf").is_file()
+    assert (tmp_path / "workspace" / "x_y").is_dir()
+
+
+def test_search_with_global_index_disabled_is_503(client, tmp_path):
+    resp = client.post("/v1/search", json={"question": "Soru?"})
+    assert resp.status_code == 503
+    assert "disabled" in resp.json()["detail"]
+    assert not (tmp_path / "workspace" / "_global").exists()
+
+
+def test_delete_tombstones_global_index_vectors(client, tmp_path, gindex):
+    _make_report(tmp_path, "g1")
+    vectors = write_report(tmp_path / "workspace" / "g1", {"genel": 3, "ozel": 2, "mevzuat": 1}, seed=7)
+    gindex.add_report(str(tmp_path / "workspace" / "g1"), "g1", model_name="m", fingerprint="f")
+
+    resp = client.delete("/v1/reports/g1")
+    assert resp.status_code == 200
+    assert resp.json()["removed_vectors"] == 6
+    assert gindex.reports() == []
+    assert gindex.search(vectors["genel"][:1], 5)[0] == []
+    assert sum(s["tombstones"] for s in gindex.stats()) == 6
+
+    # yalnızca indekste kalmış rapor da silinebilir (dosyalar yok → yine 200)
+    write_report(tmp_path / "orphan", {"genel": 2}, seed=8)
+    gindex.add_report(str(tmp_path / "orphan"), "orphan", model_name="m", fingerprint="f")
+    resp = client.delete("/v1/reports/orphan")
+    assert resp.status_code == 200 and resp.json() == {
+        "report_id": "orphan", "status": "completed", "removed_vectors": 2, "removed_files": []}
+
+
+def test_delete_waits_for_in_flight_mapping(client, tmp_path, monkeypatch):
+    # Windows: süren bir aramanın eşlemi kapanana dek silme PermissionError verir
+    from app.pipeline import serving
+    monkeypatch.setattr(serving, "_mapped_files_locked", True)
+    real_rmtree = shutil.rmtree
+    busy = {"left": 2, "calls": 0}
+
+    def rmtree(path, *args, **kwargs):
+        busy["calls"] += 1
+        if busy["left"]:
+            busy["left"] -= 1
+            raise PermissionError(32, "The process cannot access the file", str(path))
+        return real_rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(shutil, "rmtree", rmtree)
+    _make_report(tmp_path, "w1")
+    assert client.delete("/v1/reports/w1").status_code == 200
+    assert busy["calls"] == 3
+    assert not (tmp_path / "workspace" / "w1").exists()
+
+    # eşlem süre dolana kadar bırakılmazsa silme başarısız
+    _make_report(tmp_path, "w2")
+    monkeypatch.setattr(serving, "RELEASE_TIMEOUT", 0.0)
+    busy["left"] = 10**6
+    assert client.delete("/v1/reports/w2").status_code == 500
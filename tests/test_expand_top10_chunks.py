@@ -0,0 +1,71 @@
+# expand_top10_chunks: cümle aralıklı chunk'lar EXPANSION_SIZE kadar tam
+# cümlelere genişler; prompt builder expanded/ çıktısını okur
+
+import json
+
+import pytest
+
+from app.pipeline import gpt_prompt_builder, serving
+from app.pipeline.chunk_store import ChunkStore
+from app.pipeline.expand_top10_chunks import EXPANSION_SIZE, expand_chunk, expand_span
+
+# 10 karakterlik cümleler, aralarında bir boşluk: cümle i → [11i, 11i + 10)
+STARTS = [11 * i for i in range(10)]
+ENDS = [s + 10 for s in STARTS]
+
+
+@pytest.mark.parametrize("span,extra,expected", [
+    ((4, 6), 0, (4, 6)),        # genişletme yok
+    ((4, 6), 1, (4, 6)),        # yalnızca boşluğa değiyor
+    ((4, 6), 2, (3, 7)),        # komşu cümlelere bir karakter değiyor
+    ((4, 6), 12, (3, 7)),
+    ((4, 6), 13, (2, 8)),
+    ((0, 2), 500, (0, 10)),     # metnin sınırlarında kırpılır
+])
+def test_expand_span(span, extra, expected):
+    assert expand_span(STARTS, ENDS, *span, extra) == expected
+
+
+def test_expand_chunk_writes_expanded_spans(tmp_path):
+    ws = tmp_path / "r1"
+    sentences = [f"Cümle {i:03d}." for i in range(200)]        # 10 karakter
+    offsets = [(11 * i, 11 * i + 10) for i in range(200)]
+    store = ChunkStore.write(str(ws), "r1.txt", sentences, {"genel": [(100, 105)]},
+                             {"genel": {}}, offsets=offsets)
+    (ws / "top10" / "genel").mkdir(parents=True)
+    (ws / "top10" / "genel" / "soru1_top5.json").write_text(
+        json.dumps([{"rank": 1, "score": 0.9, **store.chunk("genel", 0)}]), encoding="utf-8")
+    (ws / "top10" / "genel" / "soru1_top10.json").write_text("[]", encoding="utf-8")
+
+    serving.evict(str(ws))
+    expand_chunk(str(ws), top_k=5)
+
+    out = json.loads((ws / "expanded" / "genel" / "soru1_top5.json").read_text(encoding="utf-8"))
+    # [1100 − 750, 1154 + 750) = [350, 1904) → cümle 31 (…351) … 173 (1903…)
+    assert EXPANSION_SIZE["genel"] == 750
+    start, end = 31, 174
+    assert (out[0]["expanded_sentence_start"], out[0]["expanded_sentence_end"]) == (start, end)
+    assert out[0]["expanded_text"] == " ".join(sentences[start:end])
+    assert not (ws / "expanded" / "genel" / "soru1_top10.json").exists()     # eski k
+
+
+def test_expanded_pages_follow_the_widened_span(tmp_path):
+    ws = tmp_path / "r1"
+    sentences = [f"Cümle {i:03d}." for i in range(200)]
+    offsets = [(11 * i, 11 * i + 10) for i in range(200)]
+    # sayfa 2 cümle 91'de (1001) başlar: chunk tek sayfada, genişleme iki sayfada
+    store = ChunkStore.write(str(ws), "r1.txt", sentences, {"genel": [(100, 105)]},
+                             {"genel": {}}, offsets=offsets, page_starts=[0, 1001])
+    retrieved = {"rank": 1, "score": 0.9, **store.chunk("genel", 0)}
+    assert (retrieved["page_start"], retrieved["page_end"]) == (2, 2)
+    (ws / "top10" / "genel").mkdir(parents=True)
+    (ws / "top10" / "genel" / "soru1_top5.json").write_text(
+        json.dumps([retrieved]), encoding="utf-8")
+
+    serving.evict(str(ws))
+    expand_chunk(str(ws), top_k=5)
+
+    out = json.loads((ws / "expanded" / "genel" / "soru1_top5.json").read_text(encoding="utf-8"))
+    assert (out[0]["expanded_page_start"], out[0]["expanded_page_end"]) == (1, 2)
+    [chunk] = gpt_prompt_builder._load_chunks("genel", 1, ws, 5)
+    assert (chunk["page_start"], chunk["page_end"]) == (1, 2)
@@ -0,0 +1,198 @@
+# Global indeks: ekleme → silme (mezar taşı) → filtreli / filtresiz arama → sıkıştırma
+# Flat shard'lar remove_ids ile, HNSW shard'lar yeniden kurularak sıkıştırılır.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+import pytest
+
+from app.pipeline.global_index import GlobalIndex
+
+from .helpers import write_report
+
+SIZES_A = {"genel": 6, "ozel": 4, "mevzuat": 3}
+SIZES_B = {"genel": 5, "ozel": 2, "mevzuat": 4}
+
+
+@pytest.fixture(params=["flat", "hnsw"])
+def gindex(request, tmp_path, index_spec):
+    index_spec(type=request.param)
+    # tek shard: silinen ve kalan rapor aynı FAISS indeksinde; oran eşiği
+    # yüksek → arka planda sıkıştırma yok, compact() elle çağrılır
+    gi = GlobalIndex(str(tmp_path / "_global"), n_shards=1, compact_ratio=100.0)
+    a = write_report(tmp_path / "A", SIZES_A, seed=1)
+    b = write_report(tmp_path / "B", SIZES_B, seed=2)
+    assert gi.add_report(str(tmp_path / "A"), "A", model_name="m", fingerprint="fa") == 13
+    assert gi.add_report(str(tmp_path / "B"), "B", model_name="m", fingerprint="fb") == 11
+    yield request.param, gi, a, b
+    gi._pool.shutdown()
+    gi._compactor.shutdown()
+
+
+def _top(gi, vec, k=1, **filters):
+    return gi.search(vec[None, :], k, **filters)[0]
+
+
+def _assert_b_intact(gi, b):
+    """B'nin her vektörü kendi (kategori, chunk) kaydına çözülmeli."""
+    for category, vecs in b.items():
+        for i, vec in enumerate(vecs):
+            hit = _top(gi, vec)[0]
+            assert (hit["report_id"], hit["category"], hit["chunk_index"]) == ("B", category, i)
+            assert hit["score"] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_search_before_delete(gindex):
+    _, gi, a, b = gindex
+    hit = _top(gi, a["ozel"][2])[0]
+    assert (hit["report_id"], hit["category"], hit["chunk_index"]) == ("A", "ozel", 2)
+    _assert_b_intact(gi, b)
+
+
+def test_same_fingerprint_is_skipped(gindex, tmp_path):
+    _, gi, _, _ = gindex
+    assert gi.add_report(str(tmp_path / "A"), "A", model_name="m", fingerprint="fa") == 0
+    assert gi.stats()[0]["tombstones"] == 0
+
+
+def test_delete_excludes_report_from_all_searches(gindex):
+    _, gi, a, b = gindex
+    assert gi.delete_report("A") == 13
+    assert gi.delete_report("A") == 0                       # ikinci silme: yok
+    assert [r["report_id"] for r in gi.reports()] == ["B"]
+    assert gi.stats() == [{"shard": 0, "vectors": 24, "tombstones": 13}]
+
+    # filtresiz: mezar taşları IDSelectorNot ile dışlanır
+    for vecs in a.values():
+        for vec in vecs:
+            assert all(h["report_id"] == "B" for h in _top(gi, vec, k=24))
+    # filtreli: kimlikler yan depodan gelir, A artık orada yok
+    assert _top(gi, a["genel"][0], k=5, report_ids=["A"]) == []
+    hits = _top(gi, a["genel"][0], k=24, categories=["mevzuat"])
+    assert len(hits) == 4 and {h["report_id"] for h in hits} == {"B"}
+    assert {h["category"] for h in hits} == {"mevzuat"}
+    _assert_b_intact(gi, b)
+
+
+def test_compact_removes_tombstoned_vectors(gindex):
+    kind, gi, a, b = gindex
+    gi.delete_report("A")
+    assert gi.compact() == 13
+    assert gi.stats() == [{"shard": 0, "vectors": 11, "tombstones": 0}]
+    assert gi.compact() == 0
+
+    shard = gi._shard(0)
+    inner = faiss.downcast_index(shard.index)
+    assert isinstance(inner, faiss.IndexHNSWFlat if kind == "hnsw" else faiss.IndexFlatIP)
+    # kalan kimlikler B'nin yan depodaki kimlikleriyle birebir aynı
+    ids = np.sort(faiss.vector_to_array(shard.id_map))
+    stored = [r[0] for r in gi._conn.execute("SELECT id FROM vectors ORDER BY id")]
+    assert ids.tolist() == stored
+
+    _assert_b_intact(gi, b)
+    assert all(h["report_id"] == "B" for h in _top(gi, a["genel"][1], k=11))
+
+
+def test_compacted_shard_is_persisted(gindex, tmp_path):
+    _, gi, _, b = gindex
+    gi.delete_report("A")
+    gi.compact()
+    reopened = GlobalIndex(str(tmp_path / "_global"), n_shards=1, compact_ratio=100.0)
+    try:
+        assert reopened.stats() == [{"shard": 0, "vectors": 11, "tombstones": 0}]
+        _assert_b_intact(reopened, b)
+    finally:
+        reopened._pool.shutdown()
+        reopened._compactor.shutdown()
+
+
+def test_readd_changed_report_tombstones_old_vectors(gindex, tmp_path):
+    _, gi, a, _ = gindex
+    new_a = write_report(tmp_path / "A2", {"genel": 2, "ozel": 0, "mevzuat": 1}, seed=3)
+    assert gi.add_report(str(tmp_path / "A2"), "A", model_name="m", fingerprint="fa2") == 3
+    assert gi.stats()[0]["tombstones"] == 13
+
+    old_hits = _top(gi, a["genel"][0], k=30, report_ids=["A"])
+    assert len(old_hits) == 3
+    hit = _top(gi, new_a["mevzuat"][0])[0]
+    assert (hit["report_id"], hit["category"], hit["chunk_index"]) == ("A", "mevzuat", 0)
+
+    gi.compact()
+    assert gi.stats()[0]["vectors"] == 14
+    hit = _top(gi, new_a["genel"][1])[0]
+    assert (hit["report_id"], hit["category"], hit["chunk_index"]) == ("A", "genel", 1)
+
+
+def test_crash_before_shard_save_is_repaired_on_next_add(gindex, tmp_path, monkeypatch):
+    _, gi, _, b = gindex
+    c = write_report(tmp_path / "C", {"genel": 3}, seed=4)
+
+    def crash(shard):
+        raise OSError("disk dolu")
+
+    monkeypatch.setattr(gi, "_save_shard", crash)
+    with pytest.raises(OSError):
+        gi.add_report(str(tmp_path / "C"), "C", model_name="m", fingerprint="fc")
+    monkeypatch.undo()
+
+    # yeni süreç: diskteki shard C'yi içermez, yan depo kimlikleri harcanmış
+    reopened = GlobalIndex(str(tmp_path / "_global"), n_shards=1, compact_ratio=100.0)
+    try:
+        assert reopened.fingerprint_of("C") is None
+        assert reopened.add_report(str(tmp_path / "C"), "C", model_name="m", fingerprint="fc") == 3
+        assert reopened.fingerprint_of("C") == "fc"
+        hit = _top(reopened, c["genel"][2])[0]
+        assert (hit["report_id"], hit["category"], hit["chunk_index"]) == ("C", "genel", 2)
+        _assert_b_intact(reopened, b)
+    finally:
+        reopened._pool.shutdown()
+        reopened._compactor.shutdown()
+
+
+def test_model_mismatch_is_rejected(gindex, tmp_path):
+    _, gi, _, _ = gindex
+    with pytest.raises(ValueError):
+        gi.add_report(str(tmp_path / "B"), "C", model_name="other", fingerprint="fc")
+
+
+def test_searches_share_the_lock_writers_wait(gindex, tmp_path):
+    _, gi, a, _ = gindex
+    write_report(tmp_path / "C", {"genel": 2}, seed=4)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with gi._rw.read():                     # süren bir arama
+            hit = pool.submit(_top, gi, a["genel"][0]).result(timeout=5)
+            assert hit[0]["report_id"] == "A"
+            add = pool.submit(gi.add_report, str(tmp_path / "C"), "C", model_name="m")
+            time.sleep(0.2)
+            assert not add.done()               # yazar okuyucunun bitmesini bekler
+        assert add.result(timeout=5) == 2
+
+
+def test_second_process_sees_and_keeps_other_writes(gindex, tmp_path):
+    # iki örnek = iki worker süreci: ayrı SQLite bağlantısı, ayrı shard kopyası
+    _, gi, a, b = gindex
+    other = GlobalIndex(str(tmp_path / "_global"), n_shards=1, compact_ratio=100.0)
+    try:
+        assert _top(other, a["genel"][0])[0]["report_id"] == "A"    # shard önbelleğe alındı
+        c = write_report(tmp_path / "C", {"genel": 3}, seed=5)
+        assert gi.add_report(str(tmp_path / "C"), "C", model_name="m") == 3
+
+        # diğer süreç yeni dosyayı görür ve kendi eski kopyasıyla üzerine yazmaz
+        assert _top(other, c["genel"][2])[0]["report_id"] == "C"
+        d = write_report(tmp_path / "D", {"genel": 2}, seed=6)
+        assert other.add_report(str(tmp_path / "D"), "D", model_name="m") == 2
+        assert gi.stats()[0]["vectors"] == 29
+        assert _top(gi, c["genel"][0])[0]["report_id"] == "C"
+        assert _top(gi, d["genel"][1])[0]["report_id"] == "D"
+
+        # silme (mezar taşı) ve sıkıştırma da diğer sürece yansır
+        other.delete_report("B")
+        assert all(h["report_id"] != "B" for h in _top(gi, b["genel"][0], k=29))
+        gi.compact()
+        assert other.stats() == [{"shard": 0, "vectors": 18, "tombstones": 0}]
+        assert _top(other, d["genel"][0])[0]["report_id"] == "D"
+    finally:
+        other._pool.shutdown()
+        other._compactor.shutdown()
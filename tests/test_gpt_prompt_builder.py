@@ -0,0 +1,72 @@
+# gpt_prompt_builder: yalnızca güncel top-k dosyaları okunur
+# (top10/ çalıştırmalar arasında temizlenmez; eski k'nin dosyaları kalabilir),
+# expanded/ kopyası top10/'dan eski değilse genişletilmiş metin/aralık kullanılır
+
+import json
+import os
+
+import pytest
+
+from app.pipeline import gpt_prompt_builder as builder
+
+
+def _write_topk(base, dataset, qid, k, texts):
+    path = base / dataset / f"soru{qid}_top{k}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps([{"chunk_text": t, "score": 0.5, "rank": r}
+                                for r, t in enumerate(texts, 1)]), encoding="utf-8")
+
+
+@pytest.fixture
+def top10(tmp_path):
+    base = tmp_path / "top10"
+    stale = "Eski çalıştırmanın chunk metni, artık geçerli değil."
+    fresh = "Güncel çalıştırmanın chunk metni, prompt'a bu girmeli."
+    for ds in ("genel", "ozel"):
+        _write_topk(base, ds, 1, 10, [stale] * 10)      # sıralamada top5'ten önce
+        _write_topk(base, ds, 1, 5, [fresh] * 5)
+    _write_topk(base, "genel", 2, 10, [stale])          # yalnızca eski k
+    return tmp_path, stale, fresh
+
+
+def test_load_all_chunks_reads_only_current_k(top10):
+    base, _, fresh = top10
+    by_question = builder._load_all_chunks(base, 5)
+    assert set(by_question) == {1}
+    assert [(c["dataset"], c["text"]) for c in by_question[1]] == \
+        [("genel", fresh)] * 5 + [("ozel", fresh)] * 5
+
+
+@pytest.mark.parametrize("k,expected", [(5, "fresh"), (10, "stale"), (3, None)])
+def test_load_chunks_opens_exact_file(top10, k, expected):
+    base, stale, fresh = top10
+    chunks = builder._load_chunks("genel", 1, base, k)
+    texts = {c["text"] for c in chunks}
+    assert texts == ({"fresh": {fresh}, "stale": {stale}}[expected] if expected else set())
+
+
+def _expand(workspace, dataset, qid, k, text, span):
+    path = workspace / "expanded" / dataset / f"soru{qid}_top{k}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw = json.loads((workspace / "top10" / dataset / path.name).read_text(encoding="utf-8"))
+    for item in raw:
+        item.update(expanded_text=text, expanded_sentence_start=span[0],
+                    expanded_sentence_end=span[1])
+    path.write_text(json.dumps(raw), encoding="utf-8")
+    return path
+
+
+def test_expanded_copy_supplies_text_and_span(top10):
+    base, _, _ = top10
+    _expand(base, "genel", 1, 5, "Genişletilmiş bağlam metni.", (3, 9))
+    chunks = builder._load_chunks("genel", 1, base, 5)
+    assert {(c["text"], c["sentence_start"], c["sentence_end"]) for c in chunks} == \
+        {("Genişletilmiş bağlam metni.", 3, 9)}
+
+
+def test_expanded_copy_older_than_search_is_ignored(top10):
+    base, _, fresh = top10
+    path = _expand(base, "genel", 1, 5, "Eski genişletme.", (0, 1))
+    retrieved = base / "top10" / "genel" / path.name
+    os.utime(path, (retrieved.stat().st_mtime - 10,) * 2)
+    assert {c["text"] for c in builder._load_all_chunks(base, 5)[1]} == {fresh}
@@ -0,0 +1,102 @@
+# passage_merger.merge_passages: örtüşen / bitişik / aralıksız (eski) chunk'lar,
+# birebir tekrarlar ve atıf sırasının kararlılığı
+
+import pytest
+
+from app.pipeline.passage_merger import merge_passages, token_savings
+
+from .helpers import chunk, legacy_chunk, span_text
+
+
+def summary(passages):
+    """(dataset, aralık, kaynaklar) – atıf sırasıyla."""
+    return [(p.dataset, p.sentence_start, p.sentence_end,
+             [(s["dataset"], s["rank"]) for s in p.sources]) for p in passages]
+
+
+CASES = {
+    "overlap_across_datasets": (
+        [chunk(0, 5), chunk(3, 6, "ozel")],
+        [("genel", 0, 6, [("genel", 1), ("ozel", 1)])],
+    ),
+    "adjacent_stay_separate": (
+        [chunk(0, 3), chunk(3, 5, "ozel")],
+        [("genel", 0, 3, [("genel", 1)]), ("ozel", 3, 5, [("ozel", 1)])],
+    ),
+    "chain_of_overlaps": (
+        [chunk(4, 7, "mevzuat"), chunk(0, 3), chunk(2, 5, "ozel")],
+        [("mevzuat", 0, 7, [("mevzuat", 1), ("genel", 1), ("ozel", 1)])],
+    ),
+    "contained_span": (
+        [chunk(0, 6), chunk(2, 3, "ozel")],
+        [("genel", 0, 6, [("genel", 1), ("ozel", 1)])],
+    ),
+    "identical_spans": (
+        [chunk(8, 10, "ozel", rank=2), chunk(8, 10, rank=1)],
+        [("ozel", 8, 10, [("ozel", 2), ("genel", 1)])],
+    ),
+    "first_member_sets_position": (
+        [chunk(10, 12, "ozel"), chunk(0, 2), chunk(11, 14, "mevzuat", rank=3)],
+        [("ozel", 10, 14, [("ozel", 1), ("mevzuat", 3)]), ("genel", 0, 2, [("genel", 1)])],
+    ),
+    "legacy_exact_duplicates": (
+        [legacy_chunk("Aynı  metin."), legacy_chunk("aynı metin. ", "ozel", rank=4),
+         legacy_chunk("Başka metin.", "mevzuat")],
+        [("genel", None, None, [("genel", 1), ("ozel", 4)]),
+         ("mevzuat", None, None, [("mevzuat", 1)])],
+    ),
+    "legacy_and_spanned_keep_input_order": (
+        [legacy_chunk("Eski chunk.", "mevzuat"), chunk(0, 2),
+         legacy_chunk("Eski chunk.", "ozel", rank=2), chunk(1, 4, "ozel", rank=2)],
+        [("mevzuat", None, None, [("mevzuat", 1), ("ozel", 2)]),
+         ("genel", 0, 4, [("genel", 1), ("ozel", 2)])],
+    ),
+}
+
+
+@pytest.mark.parametrize("chunks,expected", CASES.values(), ids=CASES.keys())
+def test_merge_passages(chunks, expected):
+    passages = merge_passages(chunks, span_text)
+    assert summary(passages) == expected
+
+    for p in passages:
+        if p.sentence_start is not None:
+            # birleşik metin cümle tablosundan; hiçbir cümle iki kez yazılmaz
+            assert p.text == span_text(p.sentence_start, p.sentence_end)
+    # kaynaklar girdiyi tam bir kez kapsar
+    assert sum(len(p.sources) for p in passages) == len(chunks)
+
+    # numaralama kararlı: aynı girdi (kopyası) → aynı atıflar, 1..n
+    numbered = [p.as_dict(i) for i, p in enumerate(passages, 1)]
+    again = merge_passages([dict(c) for c in chunks], span_text)
+    assert [p.as_dict(i) for i, p in enumerate(again, 1)] == numbered
+    assert [d["index"] for d in numbered] == list(range(1, len(expected) + 1))
+
+
+def test_without_span_text_only_exact_text_is_deduplicated():
+    chunks = [chunk(0, 5), chunk(3, 6, "ozel"), chunk(0, 5, "mevzuat")]
+    passages = merge_passages(chunks, None)
+    assert [(p.dataset, p.sentence_start, len(p.sources)) for p in passages] == [
+        ("genel", None, 2), ("ozel", None, 1)]
+    assert passages[0].text == span_text(0, 5)
+
+
+def test_pages_cover_all_members():
+    chunks = [chunk(0, 4, pages=(2, 3)), chunk(3, 8, "ozel", pages=(3, 5)), chunk(5, 6, "mevzuat")]
+    [p] = merge_passages(chunks, span_text)
+    assert (p.page_start, p.page_end) == (2, 5)
+
+
+def test_single_member_keeps_its_own_text():
+    c = chunk(0, 3)
+    c["text"] = "Orijinal chunk metni."
+    [p] = merge_passages([c], span_text)
+    assert p.text == "Orijinal chunk metni."
+
+
+def test_token_savings_counts_overlap_once():
+    chunks = [chunk(0, 5), chunk(3, 6, "ozel")]
+    stats = token_savings(chunks, merge_passages(chunks, span_text), lambda t: len(t.split()))
+    # 5 + 3 cümle → birleşik 6 cümle (cümle başına 1 kelime)
+    assert stats == {"chunks": 2, "passages": 1, "tokens_before": 8,
+                     "tokens_after": 6, "tokens_saved": 2}
@@ -0,0 +1,128 @@
+# prompt_packer.pack: skora göre bütçeye sığdırma, örtüşmelerin birleşik
+# maliyeti ve bütçe düşürmelerinden sonra atıf numaralarının kararlılığı
+
+import pytest
+
+from app.pipeline import prompt_packer
+from app.pipeline.passage_merger import merge_passages
+
+from .helpers import chunk, span_text
+
+
+def render(passages):
+    """Başlık 2 token + pasaj başına numara (1 token) ve metin."""
+    return "SORU: x " + " ".join(f"[{i}] {p.text}" for i, p in enumerate(passages, 1))
+
+
+def numbered(passages):
+    return [p.as_dict(i) for i, p in enumerate(passages, 1)]
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # tiktoken kurulu olsun olmasın aynı sayım: boşlukla ayrılmış kelime
+    monkeypatch.setattr(prompt_packer, "count_tokens", lambda text, model=None: len(text.split()))
+
+
+CASES = {
+    "all_fit": (
+        [chunk(0, 3, rank="a", score=0.9), chunk(10, 12, rank="b", score=0.8)], 100,
+        ["a", "b"], [], [(0, 3), (10, 12)],
+    ),
+    "lower_score_first_in_input": (
+        [chunk(10, 12, rank="b", score=0.5), chunk(0, 3, rank="a", score=0.9)], 100,
+        ["a", "b"], [], [(0, 3), (10, 12)],
+    ),
+    "too_big_is_skipped_smaller_still_fits": (
+        # 2 + (1+3) = 6; büyük chunk +11 → 17 > 12; küçük +3 → 9
+        [chunk(0, 3, rank="a", score=0.9), chunk(10, 20, rank="big", score=0.8),
+         chunk(30, 32, rank="c", score=0.7)], 12,
+        ["a", "c"], ["big"], [(0, 3), (30, 32)],
+    ),
+    "overlap_costs_only_new_sentences": (
+        # a: 2 + (1+5) = 8; b ayrı pasaj olsa +7 → 15 > 10, birleşince yalnızca +2 → 10
+        [chunk(0, 5, rank="a", score=0.9), chunk(1, 7, "ozel", rank="b", score=0.8)], 10,
+        ["a", "b"], [], [(0, 7)],
+    ),
+    "scoreless_go_last_in_input_order": (
+        [chunk(20, 21, rank="n1"), chunk(0, 2, rank="a", score=0.1), chunk(25, 26, rank="n2")], 100,
+        ["a", "n1", "n2"], [], [(0, 2), (20, 21), (25, 26)],
+    ),
+    "nothing_fits": (
+        [chunk(0, 10, rank="a", score=0.9), chunk(10, 20, rank="b", score=0.8)], 5,
+        [], ["a", "b"], [],
+    ),
+}
+
+
+@pytest.mark.parametrize("chunks,budget,kept,dropped,spans", CASES.values(), ids=CASES.keys())
+def test_pack(chunks, budget, kept, dropped, spans):
+    passages, selected, rejected, used = prompt_packer.pack(chunks, span_text, render, budget=budget)
+    assert [c["rank"] for c in selected] == kept
+    assert [c["rank"] for c in rejected] == dropped
+    assert [(p.sentence_start, p.sentence_end) for p in passages] == spans
+    assert used == len(render(passages).split())
+    assert used <= budget or not passages
+
+    # aynı girdi → aynı numaralar
+    again, _, _, _ = prompt_packer.pack([dict(c) for c in chunks], span_text, render, budget=budget)
+    assert numbered(again) == numbered(passages)
+    # düşürülen chunk'lar hiç yokmuş gibi: yalnızca alınanlardan kurulan numaralama
+    assert numbered(merge_passages(selected, span_text)) == numbered(passages)
+
+
+def test_dropped_chunk_does_not_shift_later_citations():
+    chunks = [chunk(0, 2, rank="a", score=0.9), chunk(5, 30, rank="big", score=0.8),
+              chunk(32, 34, rank="c", score=0.7)]
+    passages, _, rejected, _ = prompt_packer.pack(chunks, span_text, render, budget=12)
+    assert [c["rank"] for c in rejected] == ["big"]
+    assert [(i, s["rank"]) for i, p in enumerate(passages, 1) for s in p.sources] == [(1, "a"), (2, "c")]
+
+
+def test_token_budget_respects_context_and_reserve(monkeypatch):
+    monkeypatch.setattr(prompt_packer, "PROMPT_TOKEN_BUDGET", 8000)
+    monkeypatch.setattr(prompt_packer, "PROMPT_RESERVE_TOKENS", 2048)
+    assert prompt_packer.token_budget("gpt-4o-mini") == 8000
+    assert prompt_packer.token_budget("gpt-4") == 8192 - 2048
+    monkeypatch.setattr(prompt_packer, "PROMPT_TOKEN_BUDGET", 0)
+    assert prompt_packer.token_budget("unknown-model") == prompt_packer.DEFAULT_CONTEXT - 2048
+
+
+def test_configured_model_sets_default_budget(monkeypatch):
+    # sender de aynı current_model()'i kullanır → bütçe ve istek modeli ayrışmaz
+    monkeypatch.setattr(prompt_packer, "_model", prompt_packer.current_model())
+    monkeypatch.setattr(prompt_packer, "PROMPT_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(prompt_packer, "PROMPT_RESERVE_TOKENS", 2048)
+    prompt_packer.configure(model="gpt-4")
+    assert prompt_packer.current_model() == "gpt-4"
+    assert prompt_packer.token_budget() == 8192 - 2048
+    assert prompt_packer.config()["model"] == "gpt-4"
+    prompt_packer.configure(model="")                   # boş → değişmez
+    assert prompt_packer.current_model() == "gpt-4"
+
+
+def test_full_prompt_rendered_once():
+    # adaylar pasaj başına farkla sayılır; tam prompt yalnızca sonda kurulur
+    calls = []
+
+    def counting_render(passages):
+        calls.append(len(passages))
+        return render(passages)
+
+    chunks = [chunk(i * 3, i * 3 + 2, rank=i, score=1 - i / 10) for i in range(8)]
+    passages, selected, _, used = prompt_packer.pack(
+        chunks, span_text, counting_render, budget=100,
+        passage_text=lambda p: f"[0] {p.text}")
+    assert len(selected) == 8 and used == len(render(passages).split())
+    assert calls == [0, 8]
+
+
+def test_underestimated_passages_are_trimmed_by_score():
+    # passage_text numarayı saymıyor → tahmin 2+2+2=6, gerçek 2+3+3=8 > 7
+    chunks = [chunk(0, 2, rank="a", score=0.9), chunk(10, 12, rank="b", score=0.8),
+              chunk(20, 30, rank="big", score=0.7)]
+    passages, selected, rejected, used = prompt_packer.pack(
+        chunks, span_text, render, budget=7, passage_text=lambda p: p.text)
+    assert [c["rank"] for c in selected] == ["a"]
+    assert [c["rank"] for c in rejected] == ["b", "big"]
+    assert used == 5
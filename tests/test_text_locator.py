@@ -0,0 +1,69 @@
+# TextLocator: birebir eşleşme ve shingle adaylarının SequenceMatcher
+# doğrulaması
+
+import random
+
+from app.pipeline import text_locator
+from app.pipeline.text_locator import TextLocator
+
+# geniş alfabe: SequenceMatcher'ın autojunk'ı pencerede sık geçen her
+# karakteri çöp sayar; birkaç harflik sözlükte doğrulama hiç tutmazdı
+_ALPHABET = [chr(0x4E00 + i) for i in range(400)]
+_rng = random.Random(0)
+WORDS = ["".join(_rng.choice(_ALPHABET) for _ in range(_rng.randint(3, 6))) for _ in range(500)]
+
+
+def _text(seed: int, n: int) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+class CountingMatcher(text_locator.SequenceMatcher):
+    ratios = 0
+
+    def ratio(self):
+        CountingMatcher.ratios += 1
+        return super().ratio()
+
+
+def _locator(monkeypatch):
+    monkeypatch.setattr(text_locator, "SequenceMatcher", CountingMatcher)
+    CountingMatcher.ratios = 0
+    return TextLocator(_text(1, 3000))
+
+
+def test_exact_match_maps_to_raw_offsets():
+    text = "Başlık\n\n  Birinci   cümle. Diğer cümle."
+    loc = TextLocator(text)
+    start, end = loc.locate("birinci cümle. diğer")
+    assert text[start:end] == "Birinci   cümle. Diğer"
+
+
+def test_few_typos_are_located(monkeypatch):
+    loc = _locator(monkeypatch)
+    words = loc.full_text.split(" ")
+    chunk = words[1000:1060]
+    chunk[10] = chunk[30] = chunk[50] = "bozuk"           # 60 kelime, 3 hatalı
+    span = loc.locate(" ".join(chunk))
+    assert span is not None and loc.full_text[span[0]:].startswith(words[1000])
+    assert CountingMatcher.ratios >= 1
+
+
+def test_partly_garbage_chunk_below_ratio_is_rejected(monkeypatch):
+    loc = _locator(monkeypatch)
+    words = loc.full_text.split(" ")
+    rng = random.Random(7)
+    garbage = ["".join(rng.choice("qxzjwv") for _ in range(5)) for _ in range(30)]
+    chunk = " ".join(words[1500:1520] + garbage)          # 20 gerçek + 30 alakasız
+    assert loc.locate(chunk) is None
+    assert loc.locate(chunk, min_ratio=0.25) is not None  # eşik çağırandan gelir
+
+
+def test_low_overlap_is_verified(monkeypatch):
+    loc = _locator(monkeypatch)
+    words = loc.full_text.split(" ")
+    # her sekizinci kelime bozuk → hiçbir aday tüm shingle'larla hizalı değil
+    chunk = [w if i % 8 else "bozuk" for i, w in enumerate(words[2000:2040])]
+    span = loc.locate(" ".join(chunk))
+    assert span is not None and loc.full_text[span[0]:].startswith(words[2000])
+    assert CountingMatcher.ratios >= 1